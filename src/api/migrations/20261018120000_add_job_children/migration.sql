@@ -0,0 +1,12 @@
+-- AlterTable
+ALTER TABLE "Job" ADD COLUMN     "parentJobId" INTEGER,
+ADD COLUMN     "videoId" TEXT,
+ADD COLUMN     "childCount" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "childrenFinished" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "childrenFailed" INTEGER NOT NULL DEFAULT 0;
+
+-- CreateIndex
+CREATE INDEX "Job_parentJobId_idx" ON "Job"("parentJobId");
+
+-- AddForeignKey
+ALTER TABLE "Job" ADD CONSTRAINT "Job_parentJobId_fkey" FOREIGN KEY ("parentJobId") REFERENCES "Job"("id") ON DELETE SET NULL ON UPDATE CASCADE;
@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Job_userId_videoId_idx" ON "Job"("userId", "videoId");
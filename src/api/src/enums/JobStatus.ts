@@ -3,4 +3,7 @@ export enum JobStatus {
     pending = 'pending',
     failed = 'failed',
     inProgress = 'in_progress',
+    transcribing = 'transcribing',
+    expanded = 'expanded',
+    transformed = 'transformed',
   }
\ No newline at end of file
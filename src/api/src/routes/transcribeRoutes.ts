@@ -1,6 +1,7 @@
 import { Router, Request, Response, NextFunction } from 'express';
 import multer from 'multer';
 import { TranscriptionServiceType } from '../enums/TranscriptionServiceType';
+import { TranscriptionTransformation } from '../enums/TranscriptionTransformations';
 import logger from '../utils/logger';
 import { uploadToBlobStorage } from '../services/fileStorage';
 import { TranscriptionMessage, TranscriptionRequest, TranscriptionResponse } from '../services/interfaces/transcription';
@@ -42,8 +43,20 @@ const isValidUrl = (url: string): boolean => {
   const youtubeRegex = /^(https?:\/\/)?(www\.youtube\.com|youtube\.com|youtu\.?be)\/(watch\?v=|embed\/|v\/|.+\?v=|live\/|shorts\/)?([a-zA-Z0-9_-]{11})$/;
   const googleDriveRegex = /^(https?:\/\/)?(drive\.google\.com|docs\.google\.com)\/(file\/d\/|present\/d\/|uc\?(export=download&)?id=)([a-zA-Z0-9_-]+)(\/view)?$/;
   const vimeoRegex = /^(https?:\/\/)?(www\.)?vimeo\.com\/(\d+)(\/[a-zA-Z0-9_-]+)?(\?.*)?$/;
+  // playlists and channels are expanded by the translator into a job per video
+  const youtubeCollectionRegex = /^https:\/\/(www\.|m\.)?youtube\.com\/(playlist\?(.*&)?list=[a-zA-Z0-9_-]+|(channel\/|c\/|user\/|@)[^\/?#]+(\/[a-z]+)?\/?$)/;
+  const vimeoCollectionRegex = /^https:\/\/(www\.)?vimeo\.com\/((showcase|album)\/\d+|channels\/[^\/?#]+)\/?(\?.*)?$/;
   
-  return youtubeRegex.test(url) || googleDriveRegex.test(url) || vimeoRegex.test(url);
+  return youtubeRegex.test(url) || googleDriveRegex.test(url) || vimeoRegex.test(url) || youtubeCollectionRegex.test(url) || vimeoCollectionRegex.test(url);
+};
+
+// several transformations can run off one transcript, JSON bodies send an array and multipart forms a comma separated list
+const parseTransforms = (transforms: unknown): TranscriptionTransformation[] | undefined => {
+  if (transforms === undefined || transforms === null || transforms === '') {
+    return undefined;
+  }
+  const values = Array.isArray(transforms) ? transforms : String(transforms).split(',');
+  return values.map(value => String(value).trim()).filter(value => value.length > 0) as TranscriptionTransformation[];
 };
 
 export const getJobStatusFromStorage = async (jobId: string) => {
@@ -63,16 +76,22 @@ export const getJobStatusFromStorage = async (jobId: string) => {
 const handleLinkTranscription = async (req: Request, res: Response, next: NextFunction) => {
   try {
     const { url, transform, transcriptionType } = req.body;
+    const transforms = parseTransforms(req.body.transforms);
     const user = req.user as any;
 
     if (!isValidUrl(url)) {
-      return res.status(400).json({ error: 'Invalid URL. It needs to be a valid YouTube, Vimeo, or Google Drive URL' });
+      return res.status(400).json({ error: 'Invalid URL. It needs to be a valid YouTube, Vimeo, or Google Drive URL, or a YouTube or Vimeo playlist or channel' });
+    }
+
+    if (transforms?.length === 0) {
+      return res.status(400).json({ error: 'Invalid transforms' });
     }
 
     const transcriptionMessage: TranscriptionMessage = {
       jobId: uuidv4(),
       transcriptionType,
-      transform,
+      transform: transform ?? transforms?.[0],
+      transforms,
       isFile: false,
       content: url,
       userId: user?.qid || '0' 
@@ -95,6 +114,7 @@ const handleLinkTranscription = async (req: Request, res: Response, next: NextFu
 const handleFileTranscription = async (req: Request, res: Response, next: NextFunction) => {
   const file = req.file;
   const { transcriptionType, transform } = req.body;
+  const transforms = parseTransforms(req.body.transforms);
   const user = req.user as any;
 
   try {
@@ -102,6 +122,10 @@ const handleFileTranscription = async (req: Request, res: Response, next: NextFu
       return res.status(400).json({ error: 'Invalid transcription type' });
     }
 
+    if (transforms?.length === 0) {
+      return res.status(400).json({ error: 'Invalid transforms' });
+    }
+
     if (!file) {
       return res.status(400).json({ error: 'No file uploaded' });
     }
@@ -112,7 +136,8 @@ const handleFileTranscription = async (req: Request, res: Response, next: NextFu
     const transcriptionMessage: TranscriptionMessage = {
       jobId,
       transcriptionType,
-      transform,
+      transform: transform ?? transforms?.[0],
+      transforms,
       isFile: true,
       content: blobName,
       mimeType: file.mimetype,
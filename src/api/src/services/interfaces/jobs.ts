@@ -5,7 +5,10 @@ export interface JobMessage {
     jobId: string;
     transcriptionType: TranscriptionServiceType;
     transform: TranscriptionTransformation;
+    transforms?: TranscriptionTransformation[];
     isFile: boolean;
     content: string;
     userId: string;
+    parentJobId?: string;
+    videoId?: string;
   }
\ No newline at end of file
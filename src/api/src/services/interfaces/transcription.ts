@@ -6,17 +6,21 @@ export interface TranscriptionRequest {
   filePath?: string;
   transcriptionType: TranscriptionServiceType;
   transform: TranscriptionTransformation;
+  transforms?: TranscriptionTransformation[];
 }
 
 export interface TranscriptionMessage {
   jobId: string;
   transcriptionType: TranscriptionServiceType;
   transform: TranscriptionTransformation;
+  transforms?: TranscriptionTransformation[];
   isFile: boolean;
   content: string;
   userId: string;
   mimeType?: string;
   fileName?: string;
+  parentJobId?: string;
+  videoId?: string;
 }
 
 export interface TranscriptionResponse {
@@ -8,12 +8,7 @@ const queueName = process.env.TRANSCRIPTION_QUEUE_NAME!;
 const queueNameDemo = process.env.TRANSCRIPTION_QUEUE_NAME_DEMO!;
 const deadLetterExchange = process.env.DEAD_LETTER_EXCHANGE!;
 
-export async function createJob(toSend: TranscriptionMessage) {
-    const connection = await amqp.connect(connectionString);
-    const channel = await connection.createChannel();
-    const isDemo = toSend.userId === '0';
-    const selectedQueueName = isDemo ? queueNameDemo : queueName;
-
+async function assertQueue(channel: amqp.Channel, selectedQueueName: string) {
     // Declare the dead-letter exchange
     await channel.assertExchange(deadLetterExchange, 'direct', { durable: true });
 
@@ -31,22 +26,49 @@ export async function createJob(toSend: TranscriptionMessage) {
             'x-dead-letter-routing-key': `${selectedQueueName}-dlq`
         }
     });
+}
 
-    const message = {
-        jobId: toSend.jobId,
-        transcriptionType: toSend.transcriptionType,
-        transform: toSend.transform,
-        isFile: toSend.isFile,
-        content: toSend.content,
-        userId: toSend.userId
-    } as JobMessage;
-
-    channel.sendToQueue(selectedQueueName, Buffer.from(JSON.stringify(message)), {
-        contentType: 'application/json',
-        persistent: true
-    });
+export async function createJob(toSend: TranscriptionMessage) {
+    await createJobs([toSend]);
+}
+
+// A playlist's children are queued over one connection
+export async function createJobs(toSend: TranscriptionMessage[]) {
+    if (!toSend.length) {
+        return;
+    }
+
+    const connection = await amqp.connect(connectionString);
+    const channel = await connection.createChannel();
+    const asserted = new Set<string>();
+
+    for (const job of toSend) {
+        const isDemo = job.userId === '0';
+        const selectedQueueName = isDemo ? queueNameDemo : queueName;
+        if (!asserted.has(selectedQueueName)) {
+            await assertQueue(channel, selectedQueueName);
+            asserted.add(selectedQueueName);
+        }
+
+        const message = {
+            jobId: job.jobId,
+            transcriptionType: job.transcriptionType,
+            transform: job.transform,
+            transforms: job.transforms,
+            isFile: job.isFile,
+            content: job.content,
+            userId: job.userId,
+            parentJobId: job.parentJobId,
+            videoId: job.videoId
+        } as JobMessage;
+
+        channel.sendToQueue(selectedQueueName, Buffer.from(JSON.stringify(message)), {
+            contentType: 'application/json',
+            persistent: true
+        });
 
-    logger.debug(`Job sent to RabbitMQ: ${message.jobId}`);
+        logger.debug(`Job sent to RabbitMQ: ${message.jobId}`);
+    }
 
     await channel.close();
     await connection.close();
@@ -6,6 +6,26 @@ export interface TranscriptionUpdate {
     duration?: number;
     blobUrl?: string;
     transcript?: string;
+    transform?: string;
     transformed?: string;
     description?: string;
+    segmentIndex?: number;
+    segmentCount?: number;
+    startMs?: number;
+    endMs?: number;
+    text?: string;
+    final?: boolean;
+    childCount?: number;
+    children?: ChildJob[];
+    userId?: string;
+    transcriptionType?: string;
+    transforms?: string[];
+}
+
+export interface ChildJob {
+    jobId: string;
+    videoId: string;
+    title: string;
+    url: string;
+    duration: number;
 }
\ No newline at end of file
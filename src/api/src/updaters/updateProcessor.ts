@@ -1,9 +1,13 @@
 import { RabbitMQListener } from '../services/rabbitMqListener';
 import dotenv from 'dotenv';
-import { Prisma, PrismaClient } from '@prisma/client';
+import { Job, Prisma, PrismaClient } from '@prisma/client';
 import { TranscriptionUpdate } from './TranscriptionUpdate';
 import logger from '../utils/logger';
 import { JobStatus } from '../enums/JobStatus';
+import { TranscriptionServiceType } from '../enums/TranscriptionServiceType';
+import { TranscriptionTransformation } from '../enums/TranscriptionTransformations';
+import { TranscriptionMessage } from '../services/interfaces/transcription';
+import { createJobs } from '../services/job';
 
 dotenv.config();
 
@@ -13,6 +17,131 @@ const INITIAL_RETRY_DELAY = 1000; // 1 second
 const prisma = new PrismaClient();
 const listener = new RabbitMQListener();
 
+// A playlist or channel job is done once every job it expanded into is, it only fails if all of them did
+async function updateParentProgress(prisma: Prisma.TransactionClient, parentJobId: number | null) {
+    if (parentJobId === null) {
+        return;
+    }
+
+    // Counted from the children's rows, so a redelivered result isn't counted twice
+    const [finished, failed] = await Promise.all([
+        prisma.job.count({ where: { parentJobId, status: JobStatus.finished } }),
+        prisma.job.count({ where: { parentJobId, status: JobStatus.failed } }),
+    ]);
+    const parent = await prisma.job.findUniqueOrThrow({ where: { id: parentJobId } });
+    const done = finished + failed >= parent.childCount;
+
+    await prisma.job.update({
+        where: { id: parentJobId },
+        data: {
+            childrenFinished: finished,
+            childrenFailed: failed,
+            ...(done ? { status: failed === parent.childCount ? JobStatus.failed : JobStatus.finished } : {}),
+        },
+    });
+}
+
+// A job has one transcription, every transformation of it is linked to that row
+async function saveTranscription(prisma: Prisma.TransactionClient, job: Job, message: TranscriptionUpdate) {
+    const mediaId = job.mediaId ?? 0;
+    const transcription = await prisma.transcription.findFirst({ where: { mediaId } });
+    if (transcription) {
+        return transcription;
+    }
+
+    return prisma.transcription.create({
+        data: {
+            mediaId,
+            transcriptionType: job.transcriptionType,
+            blobUrl: message.transcript ?? '', // message.blobUrl ?? 
+        },
+    });
+}
+
+// A redelivered result replaces the transformation it already recorded
+async function saveTransformation(prisma: Prisma.TransactionClient, job: Job, transcriptionId: number, type: string, blobUrl: string) {
+    const transformation = await prisma.transformation.findFirst({ where: { transcriptionId, type } });
+    if (transformation) {
+        return prisma.transformation.update({ where: { id: transformation.id }, data: { blobUrl } });
+    }
+
+    return prisma.transformation.create({
+        data: {
+            transcriptionId,
+            mediaId: job.mediaId ?? 0,
+            type,
+            blobUrl,
+        },
+    });
+}
+
+// The translator only lists a playlist's videos, the ones this user already has a job for are skipped here
+// so every replica sees the same history, the rest get their rows linked to the parent and are queued
+async function expandParent(prisma: Prisma.TransactionClient, message: TranscriptionUpdate): Promise<TranscriptionMessage[]> {
+    const children = message.children ?? [];
+    const parent = await prisma.job.findUniqueOrThrow({ where: { qid: message.jobId } });
+
+    // demo jobs all share one user, they aren't deduped
+    const dedupe = parent.userId !== null && message.userId !== '0';
+    const processed = dedupe && children.length ? await prisma.job.findMany({
+        where: {
+            userId: parent.userId,
+            videoId: { in: children.map(child => child.videoId) },
+            status: { not: JobStatus.failed },
+            OR: [{ parentJobId: null }, { parentJobId: { not: parent.id } }],
+        },
+        select: { videoId: true },
+    }) : [];
+    const skipped = new Set(processed.map(job => job.videoId));
+    const candidates = children.filter(child => !skipped.has(child.videoId));
+
+    // a redelivered playlist job expands into the same child ids, the ones already created were already queued
+    const existing = new Set((await prisma.job.findMany({
+        where: { qid: { in: candidates.map(child => child.jobId) } },
+        select: { qid: true },
+    })).map(job => job.qid));
+
+    await prisma.job.createMany({
+        data: candidates.map(child => ({
+            qid: child.jobId,
+            userId: parent.userId,
+            status: JobStatus.pending,
+            transcriptionType: parent.transcriptionType,
+            transform: parent.transform,
+            contentReference: child.url,
+            parentJobId: parent.id,
+            videoId: child.videoId,
+        })),
+        skipDuplicates: true,
+    });
+
+    await prisma.job.update({
+        where: { id: parent.id },
+        data: {
+            status: candidates.length ? JobStatus.inProgress : JobStatus.finished,
+            childCount: candidates.length,
+        },
+    });
+    if (candidates.length) {
+        await updateParentProgress(prisma, parent.id);
+    }
+
+    logger.info(`Job ${message.jobId} expanded into ${candidates.length} jobs, ${children.length - candidates.length} videos were already processed`);
+    return candidates
+        .filter(child => !existing.has(child.jobId))
+        .map(child => ({
+            jobId: child.jobId,
+            transcriptionType: (message.transcriptionType ?? parent.transcriptionType) as TranscriptionServiceType,
+            transform: (message.transform ?? parent.transform) as TranscriptionTransformation,
+            transforms: message.transforms as TranscriptionTransformation[] | undefined,
+            isFile: false,
+            content: child.url,
+            userId: message.userId ?? String(parent.userId ?? ''),
+            parentJobId: parent.qid,
+            videoId: child.videoId,
+        }));
+}
+
 async function executeWithRetry<T>(
     operation: () => Promise<T>,
     retryCount = 0
@@ -36,14 +165,19 @@ async function executeWithRetry<T>(
 listener.listen(async (message: TranscriptionUpdate) => {
     logger.info(`Processing status: ${message.status}`);
     
+    // children are queued once their rows are committed, a retried transaction doesn't queue them twice
+    let toQueue: TranscriptionMessage[] = [];
     try {
         await executeWithRetry(async () => {
+            toQueue = [];
             await prisma.$transaction(async (prisma) => {
                 if (message.status === JobStatus.failed) {
-                    await prisma.job.update({
+                    const job = await prisma.job.update({
                         where: { qid: message.jobId },
                         data: { status: message.status, error: message.error ?? '' },
                     });
+
+                    await updateParentProgress(prisma, job.parentJobId);
                 }else if (message.status === JobStatus.inProgress) {
 
                     const job = await prisma.job.update({
@@ -71,22 +205,25 @@ listener.listen(async (message: TranscriptionUpdate) => {
                         data: { status: message.status },
                     });
 
-                    const transcription = await prisma.transcription.create({
-                        data: {
-                            mediaId: job.mediaId ?? 0,
-                            transcriptionType: job.transcriptionType,
-                            blobUrl: message.transcript ?? '', // message.blobUrl ?? 
-                        },
-                    });
+                    const transcription = await saveTranscription(prisma, job, message);
 
-                    const transformation = await prisma.transformation.create({
-                        data: {
-                            transcriptionId: transcription.id,
-                            mediaId: job.mediaId ?? 0,
-                            type: job.transform,
-                            blobUrl: message.transformed ?? '',
-                        },
-                    });
+                    // a job with several transforms recorded each one as it arrived, its final result only carries the transcript
+                    if (message.transformed != null) {
+                        await saveTransformation(prisma, job, transcription.id, message.transform ?? job.transform, message.transformed);
+                    }
+
+                    await updateParentProgress(prisma, job.parentJobId);
+                }else if (message.status === JobStatus.transformed) {
+                    // one of several transforms is done, the job row only changes on the final result
+                    const job = await prisma.job.findUniqueOrThrow({ where: { qid: message.jobId } });
+                    const transcription = await saveTranscription(prisma, job, message);
+
+                    await saveTransformation(prisma, job, transcription.id, message.transform ?? job.transform, message.transformed ?? '');
+                }else if (message.status === JobStatus.expanded) {
+                    toQueue = await expandParent(prisma, message);
+                }else if (message.status === JobStatus.transcribing) {
+                    // partial transcripts are for live consumers, the job row only changes on the final result
+                    logger.debug(`Partial transcript ${message.segmentIndex}/${message.segmentCount} for job ${message.jobId}`);
                 }else{
                     logger.error(`Unknown status: ${message.status}`);
                 }
@@ -96,6 +233,7 @@ listener.listen(async (message: TranscriptionUpdate) => {
             });
         });
         logger.info("Database updated successfully");
+        await createJobs(toQueue);
     } catch (error) {
         logger.error("Failed to update database:", error);
     }
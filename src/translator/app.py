@@ -7,16 +7,17 @@ from dotenv import load_dotenv
 from services.audio.audio_service import AudioService
 from services.audio.audio_downloader import AudioDownloader
 from services.audio.file_handler import FileHandler
-from services.transcription import TranscriptionServiceType, TranscriptionFactory
-from pydub import AudioSegment
+from services.audio.media_probe import MediaProbe
+from services.transcription.transcription_factory import TranscriptionFactory
+from enums.transcription_service_type import TranscriptionServiceType
 
-from services.transformation import TranscriptionTransformation
+from enums.transcription_transformation import TranscriptionTransformation
 from services.transformation.transformation_factory import TransformationFactory
+from services.transcription.transcript import Transcript
+from services.storage.transcript_sink import TranscriptSink
 
 def get_audio_duration(file_path: str) -> int:
-    audio = AudioSegment.from_file(file_path)
-    duration_seconds = len(audio) / 1000  # pydub returns length in milliseconds
-    return duration_seconds
+    return MediaProbe.probe(file_path).duration_seconds  # read from the container header, no decode
 
 def process_audio(url, transform, path, max_length_minutes, prompt, service):
     logging.info("Processing audio...")
@@ -25,14 +26,12 @@ def process_audio(url, transform, path, max_length_minutes, prompt, service):
         audio_file_path = AudioDownloader.download_google_drive_video(url, path, max_length_minutes=max_length_minutes)
         video_info = {"title": "Google Drive Video", "duration": get_audio_duration(audio_file_path)}  # Google Drive doesn't give video info easily
     elif "vimeo.com" in url:
-        video_info = AudioDownloader.get_video_info(url)
-        audio_file_path = AudioDownloader.download_vimeo_video(url, f'{path}/audio', max_length_minutes=max_length_minutes)
+        video_info, audio_file_path = AudioDownloader.download_vimeo_video_with_info(url, f'{path}/audio', max_length_minutes=max_length_minutes)
     elif url.startswith("https://"):
-        video_info = AudioDownloader.get_video_info(url)
-        audio_file_path = AudioDownloader.download_audio(url, f'{path}/audio', max_length_minutes=max_length_minutes)
+        video_info, audio_file_path = AudioDownloader.download_audio_with_info(url, f'{path}/audio', max_length_minutes=max_length_minutes)
     else:
         logging.info("Processing file...")
-        audio_file_path = FileHandler.handle_local_file(url, path)
+        audio_file_path = FileHandler.handle_local_file(url, path, max_length_minutes)
         video_info = {"title": os.path.basename(url), "duration": get_audio_duration(audio_file_path)}
 
     logging.info(f"Audio file is ready at {audio_file_path}")
@@ -42,18 +41,15 @@ def process_audio(url, transform, path, max_length_minutes, prompt, service):
         transcription_service = TranscriptionFactory.get_transcription_service(TranscriptionServiceType(service)) 
         combined_transcription = AudioService.transcribe_audio(audio_file_path, transcription_service, prompt)
         
-        transcription_file_path = f'{os.path.splitext(audio_file_path)[0]}_transcript{transcription_service.file_name_extension()}'.replace("audio/", "transcript/")
-        os.makedirs(os.path.dirname(transcription_file_path), exist_ok=True)
-        
-        logging.info(f"Writing transcript to {transcription_file_path}")
-        with open(transcription_file_path, 'w', encoding='utf-8') as file:
-            file.write(combined_transcription)
+        transcript = Transcript(
+            text=combined_transcription,
+            file_name_extension=transcription_service.file_name_extension(),
+            source_path=audio_file_path
+        )
+        # Running locally the transcript file is the output, so it's always written
+        transcription_file_path = TranscriptSink.persist(transcript, enabled=True)
 
         try:
-            # Adjust transcript if necessary
-            logging.info("Adjusting transcript timings if needed...")
-            combined_transcription, transcription_file_path = AudioService.adjust_transcript_if_needed(transcription_file_path, TranscriptionServiceType(service))
-
             # Run the transformation
             logging.info(f"Running transformation {transform}")
             # build metadata
@@ -65,7 +61,7 @@ def process_audio(url, transform, path, max_length_minutes, prompt, service):
             transformation = TransformationFactory.get_transformation_service(TranscriptionTransformation(transform))
             transformed_transcript = transformation.transform(combined_transcription, metadata=metadata)
         except Exception as e:
-            logging.error(f"An error occurred during transcript adjustment or transformation: {str(e)}")
+            logging.error(f"An error occurred during transformation: {str(e)}")
             print(json.dumps({"error": f"An error occurred: {str(e)}"}))
             raise
         finally:
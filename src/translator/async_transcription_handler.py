@@ -0,0 +1,236 @@
+from datetime import datetime
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+from dotenv import load_dotenv
+from services.audio.audio_downloader import AudioDownloader
+from services.audio.async_audio_service import AsyncAudioService
+from services.audio.file_handler import FileHandler
+from services.audio.media_probe import MediaProbe
+from services.audio.segment_progress import SegmentProgress, SegmentUpdate
+from services.audio.playlist_expander import PlaylistExpander
+from services.transcription.transcription_factory import TranscriptionFactory
+from services.cache.transcript_cache import TranscriptCache
+from services.transcription.transcript import Transcript
+from services.transformation.transformation_runner import TransformationRunner, TransformationResults
+from services.storage.blob_downloader import BlobDownloader
+from services.storage.transcript_sink import TranscriptSink
+from services.storage.job_workspace import JobWorkspace
+from services.metrics.pipeline_metrics import PipelineMetrics
+from listeners.async_rabbitmq_listener import AsyncRabbitMQListener
+from azure.storage.blob import BlobServiceClient
+from enums.job_status import JobStatus
+from messages.transcription_message import TranscriptionMessage
+from messages.media_message import MediaMessage
+from messages.batch_message import BatchMessage
+from messages.partial_transcript_message import PartialTranscriptMessage
+from messages.transcription_result import TranscriptionResult
+from enums.transcription_service_type import TranscriptionServiceType
+from enums.transcription_transformation import TranscriptionTransformation
+
+class AsyncTranscriptionHandler:
+    # One event loop runs many jobs at once, each shared resource is bounded by its own semaphore
+    # and provider calls share the same per-provider scheduler as the threaded worker
+
+    def __init__(self):
+        load_dotenv()
+
+        logs_dir = 'logs'
+        os.makedirs(logs_dir, exist_ok=True)
+        log_filename = os.path.join(logs_dir, f"transcription_{datetime.now().strftime('%Y-%m-%d')}.log")
+        logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+
+        self.listener = AsyncRabbitMQListener()
+        self.downloads = asyncio.Semaphore(int(os.getenv("ASYNC_DOWNLOAD_CONCURRENCY", 8)))
+        self.ffmpeg = asyncio.Semaphore(int(os.getenv("ASYNC_FFMPEG_CONCURRENCY", os.cpu_count() or 2)))
+        self.transforms = asyncio.Semaphore(int(os.getenv("TRANSFORM_CONCURRENCY", 4)))
+        self.transcript_cache = TranscriptCache.from_env(os.getenv("PROCESSING_PATH") or "./incoming")
+        JobWorkspace.recover(os.getenv("PROCESSING_PATH") or "./incoming")
+        PipelineMetrics.start_server()
+
+    async def start_listening(self):
+        try:
+            await self.listener.listen(self.process_transcription_message)
+        except asyncio.CancelledError:
+            logging.info("Interrupted by user")
+        except Exception as e:
+            logging.error(f"An error occurred: {str(e)}", exc_info=True)
+
+    async def process_transcription_message(self, message: TranscriptionMessage) -> TranscriptionResult:
+        max_length_minutes = AudioDownloader.max_length_minutes()
+        path = os.getenv("PROCESSING_PATH") or "./incoming"
+
+        url = message.content # url or blob name
+        transforms = message.transforms or [message.transform]
+
+        # A playlist or channel is never downloaded itself, it's expanded into a job per video
+        if not message.isFile and PlaylistExpander.is_collection(url):
+            return await self.expand_collection(message)
+
+        # Many jobs share this loop, each one only ever touches its own workspace
+        workspace = await asyncio.to_thread(JobWorkspace.create, message.jobId, path, JobWorkspace.estimate_bytes(max_length_minutes))
+        try:
+            if message.isFile:
+                logging.info(f"Downloading blob {url}")
+                async with self.downloads:
+                    url = await asyncio.to_thread(self.download_blob_to_local, url, workspace.subdir("blobs"), message.fileName)
+                await asyncio.to_thread(workspace.check_quota, "blob_download")
+            else:
+                logging.info(f"Processing url {url}")
+
+            with PipelineMetrics.track_stage("job"):
+                result = await self.process_audio(url, transforms, workspace.path, max_length_minutes, None, message.transcriptionType, message.jobId, workspace)
+        finally:
+            await asyncio.to_thread(workspace.cleanup)
+        return result
+
+    async def expand_collection(self, message: TranscriptionMessage) -> BatchMessage:
+        logging.info(f"Expanding playlist {message.content}")
+        with PipelineMetrics.track_stage("expand"):
+            title, entries = await PlaylistExpander.expand_async(message.content, self.downloads)
+
+        batch = PlaylistExpander.batch(message, title, entries)
+        logging.info(f"Expanded {message.content} into {batch.childCount} videos")
+        return batch
+
+    def download_blob_to_local(self, blob_name: str, download_path: str, file_name: Optional[str] = None) -> str:
+        container_name, blob_path = blob_name.split('/', 1) # Extract container name and blob path
+        blob_service_client = BlobServiceClient.from_connection_string(os.getenv("AZURE_STORAGE_CONNECTION_STRING"))
+        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
+
+        with PipelineMetrics.track_stage("blob_download"):
+            content_path = BlobDownloader.download_to_local(blob_client, download_path, file_name)
+        PipelineMetrics.record_file_bytes("blob_download", content_path)
+        return content_path
+
+    async def get_audio_duration(self, file_path: str) -> int:
+        media_info = await asyncio.to_thread(MediaProbe.probe, file_path)
+        return int(media_info.duration_seconds)
+
+    async def process_audio(self, url: str,
+                            transforms: List[TranscriptionTransformation],
+                            path: str,
+                            max_length_minutes: Optional[int],
+                            prompt: Optional[str],
+                            service: TranscriptionServiceType,
+                            job_id: str,
+                            workspace: Optional[JobWorkspace] = None) -> TranscriptionResult:
+        logging.info("Processing audio...")
+        output_path = workspace.base_path if workspace is not None else path
+        limits = {"downloads": self.downloads, "ffmpeg": self.ffmpeg}
+
+        audio_file_path = None
+        combined_transcription = None
+        source_key = TranscriptCache.source_key(url, service.value, prompt, max_length_minutes) if self.transcript_cache is not None else None
+        cached_source = await asyncio.to_thread(self.transcript_cache.get_source, source_key) if source_key is not None else None
+        if cached_source is not None:
+            logging.info(f"Transcript cache hit for {url}, skipping download")
+            video_info, combined_transcription = cached_source
+        elif url.startswith("https://drive.google.com"):
+            video_info, audio_file_path = await AudioDownloader.download_google_drive_video_with_info_async(url, path, max_length_minutes, **limits)
+        elif "vimeo.com" in url:
+            video_info, audio_file_path = await AudioDownloader.download_vimeo_video_with_info_async(url, f'{path}/audio', max_length_minutes, **limits)
+        elif url.startswith("https://"):
+            video_info, audio_file_path = await AudioDownloader.download_audio_with_info_async(url, f'{path}/audio', max_length_minutes, **limits)
+        else:
+            logging.info("Processing file...")
+            with PipelineMetrics.track_stage("convert"):
+                audio_file_path = await FileHandler.handle_local_file_async(url, path, self.ffmpeg, max_length_minutes)
+            os.remove(url) # remove the tmp file after audio is extracted
+            video_info = {"title": os.path.basename(url), "duration": await self.get_audio_duration(audio_file_path)}
+
+        if audio_file_path is None and combined_transcription is None:
+            PipelineMetrics.record_error("download")
+            raise RuntimeError(f"Failed to download audio from {url}")
+        if audio_file_path is not None:
+            PipelineMetrics.record_file_bytes("audio", audio_file_path)
+            if workspace is not None:
+                await asyncio.to_thread(workspace.check_quota, "download")
+
+        await self.listener.publish_job_update(MediaMessage.from_video_info(job_id, video_info).dict())
+
+        transcription_service = TranscriptionFactory.get_transcription_service(service)
+        on_segment = self.partial_transcript_publisher(job_id)
+        if combined_transcription is None:
+            try:
+                # Hashing reads the whole file, it stays off the loop
+                audio_key = await asyncio.to_thread(TranscriptCache.audio_key, audio_file_path, service.value, prompt) if self.transcript_cache is not None else None
+                combined_transcription = await self.transcribe_with_cache(audio_file_path, transcription_service, prompt, audio_key, on_segment)
+            finally:
+                os.remove(audio_file_path)
+            if source_key is not None:
+                await asyncio.to_thread(self.transcript_cache.put_source, source_key, video_info, audio_key)
+        else:
+            await self.publish_whole_transcript(on_segment, combined_transcription, video_info.get("duration", 0))
+
+        transcript = Transcript(
+            text=combined_transcription,
+            file_name_extension=transcription_service.file_name_extension(),
+            source_path=os.path.join(output_path, "audio", os.path.basename(audio_file_path) if audio_file_path else job_id)
+        )
+        result = await self.run_transformations(transforms, transcript.text, TransformationRunner.metadata(video_info), job_id)
+        PipelineMetrics.record_job(result.status)
+
+        try:
+            await asyncio.to_thread(TranscriptSink.persist, transcript)
+        except OSError as e:
+            logging.error(f"Failed to persist transcript for job {job_id}: {e}")
+
+        return result
+
+    async def transcribe_with_cache(self, audio_file_path: str, transcription_service, prompt: Optional[str], audio_key: Optional[str],
+                                    on_segment: Optional[Callable[[SegmentUpdate], Awaitable[None]]] = None) -> str:
+        logging.info(f"Running transcription on {audio_file_path}")
+        if audio_key is None:
+            return await AsyncAudioService.transcribe_audio(audio_file_path, transcription_service, prompt, self.ffmpeg, on_segment)
+
+        combined_transcription = await asyncio.to_thread(self.transcript_cache.get, audio_key)
+        if combined_transcription is not None:
+            logging.info(f"Transcript cache hit for {audio_file_path}")
+            await self.publish_whole_transcript(on_segment, combined_transcription, await self.get_audio_duration(audio_file_path))
+            return combined_transcription
+
+        combined_transcription = await AsyncAudioService.transcribe_audio(audio_file_path, transcription_service, prompt, self.ffmpeg, on_segment, self.transcript_cache)
+        await asyncio.to_thread(self.transcript_cache.put, audio_key, combined_transcription)
+        return combined_transcription
+
+    @staticmethod
+    async def publish_whole_transcript(on_segment: Optional[Callable[[SegmentUpdate], Awaitable[None]]], transcript: str, duration_seconds: int):
+        # A cached transcript has no segments to stream, it goes out as a single final one
+        if on_segment is not None:
+            for update in SegmentProgress(1).complete(0, 0, duration_seconds * 1000, transcript):
+                await on_segment(update)
+
+    def partial_transcript_publisher(self, job_id: str) -> Optional[Callable[[SegmentUpdate], Awaitable[None]]]:
+        if os.getenv("PUBLISH_PARTIAL_TRANSCRIPTS", "false").lower() != "true":
+            return None
+
+        async def publish(update: SegmentUpdate):
+            await self.listener.publish_job_update(PartialTranscriptMessage.from_update(job_id, update).dict())
+        return publish
+
+    async def run_transformation(self, transform: TranscriptionTransformation, transcript: str, metadata: dict, job_id: str) -> TranscriptionResult:
+        # LangChain's own batching already runs the chunks of one transform concurrently, the thread only keeps the loop free
+        async with self.transforms:
+            return await asyncio.to_thread(TransformationRunner.run, transform, transcript, metadata, job_id)
+
+    async def run_transformations(self, transforms: List[TranscriptionTransformation], transcript: str, metadata: dict, job_id: str) -> TranscriptionResult:
+        transforms = TransformationRunner.unique(transforms)
+        if len(transforms) == 1:
+            return await self.run_transformation(transforms[0], transcript, metadata, job_id)
+
+        results = TransformationResults(transcript, job_id)
+        for completed in asyncio.as_completed([self.run_transformation(transform, transcript, metadata, job_id) for transform in transforms]):
+            ready = results.add(await completed)
+            if ready is not None:
+                await self.listener.publish_job_update(ready.dict())
+
+        return results.outcome()
+
+if __name__ == "__main__":
+    handler = AsyncTranscriptionHandler()
+    try:
+        asyncio.run(handler.start_listening())
+    except KeyboardInterrupt:
+        logging.info("Interrupted by user")
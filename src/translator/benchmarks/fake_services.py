@@ -0,0 +1,79 @@
+import os
+import time
+import random
+import threading
+from typing import Optional
+from services.audio.media_probe import MediaProbe
+from services.audio.audio_service import AudioService
+from services.audio.subtitle_adjuster import SubtitleCue
+from services.transcription.transcription_service import TranscriptionService
+from services.transformation.transformation_service import TransformationService
+
+class FakeProviderError(Exception):
+    # Carries a status code so the provider scheduler retries it like a real 503
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+class FakeLatency:
+    # Latency is a fixed part plus a part per MB uploaded, with jitter, errors are drawn from a seeded generator
+
+    def __init__(self, latency_seconds: float = 0.0, latency_per_mb: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_seconds = latency_seconds
+        self.latency_per_mb = latency_per_mb
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def wait(self, size_bytes: int = 0):
+        with self.lock:
+            self.calls += 1
+            delay = self.latency_seconds + self.latency_per_mb * size_bytes / (1024 * 1024)
+            delay *= 1 + self.random.uniform(-self.jitter, self.jitter)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(max(delay, 0))
+        if failed:
+            raise FakeProviderError("Injected provider failure")
+
+class FakeTranscriptionService(TranscriptionService):
+    WORDS_PER_MINUTE = 150
+    CUE_SECONDS = 5
+
+    def __init__(self, latency: Optional[FakeLatency] = None, extension: str = ".txt", name: str = "fake"):
+        self.latency = latency or FakeLatency()
+        self.extension = extension
+        self.name = name
+
+    def transcribe(self, audio_file_path: str, prompt: str) -> str:
+        self.latency.wait(os.path.getsize(audio_file_path))
+        duration_ms = MediaProbe.probe(audio_file_path).duration_ms
+        if self.extension in AudioService.SUBTITLE_ADJUSTERS:
+            return self.subtitles(duration_ms)
+        words = max(1, duration_ms * self.WORDS_PER_MINUTE // 60000)
+        return ' '.join(f"word{i}" for i in range(words))
+
+    def subtitles(self, duration_ms: int) -> str:
+        adjuster = AudioService.SUBTITLE_ADJUSTERS[self.extension]
+        cue_ms = self.CUE_SECONDS * 1000
+        cues = [SubtitleCue(start, min(start + cue_ms, duration_ms), f"cue at {start}") for start in range(0, max(duration_ms, 1), cue_ms)]
+        return adjuster.render(cues)
+
+    def file_name_extension(self) -> str:
+        return self.extension
+
+    def provider_name(self) -> str:
+        return self.name
+
+class FakeTransformationService(TransformationService):
+    def __init__(self, latency: Optional[FakeLatency] = None):
+        self.latency = latency or FakeLatency()
+
+    def transform(self, transcript: str, metadata: dict = None) -> str:
+        self.latency.wait(len(transcript.encode()))
+        return transcript[:200]
@@ -0,0 +1,53 @@
+import os
+import glob
+import threading
+from typing import List
+
+class MemorySampler:
+    # ru_maxrss of children is inflated by the parent image they were forked from, so the ffmpeg
+    # processes are sampled from /proc instead and the peak is taken over the whole process tree.
+    # Proportional set size splits pages a child still shares with the worker, they aren't counted twice
+
+    def __init__(self, interval_seconds: float = 0.05):
+        self.interval_seconds = interval_seconds
+        self.peak_bytes = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def __enter__(self) -> "MemorySampler":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while True:
+            self.peak_bytes = max(self.peak_bytes, sum(MemorySampler.pss_bytes(pid) for pid in MemorySampler.process_tree(os.getpid())))
+            if self.stopped.wait(self.interval_seconds):
+                return
+
+    @staticmethod
+    def process_tree(pid: int) -> List[int]:
+        pids = [pid]
+        for children in glob.glob(f"/proc/{pid}/task/*/children"):
+            try:
+                with open(children) as file:
+                    child_pids = [int(child) for child in file.read().split()]
+            except OSError:
+                continue
+            for child in child_pids:
+                pids.extend(MemorySampler.process_tree(child))
+        return pids
+
+    @staticmethod
+    def pss_bytes(pid: int) -> int:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as file:
+                for line in file:
+                    if line.startswith("Pss:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import statistics
+import subprocess
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic_audio import SyntheticAudio
+from benchmarks.memory_sampler import MemorySampler
+from benchmarks.fake_services import FakeLatency, FakeTranscriptionService, FakeTransformationService
+from services.audio.audio_service import AudioService
+from services.audio.file_handler import FileHandler
+from services.audio.media_probe import MediaProbe
+from services.audio.srt_adjuster import SrtAdjuster
+from services.audio.vtt_adjuster import VttAdjuster
+from services.audio.subtitle_adjuster import SubtitleCue
+from services.metrics.pipeline_metrics import STAGE_DURATION, PipelineMetrics
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+class BenchmarkRunner:
+    # Every scenario runs in a fresh process so peak RSS and the stage histograms belong to that scenario alone
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+
+    def scenarios(self) -> Dict[str, Callable[[str, str], dict]]:
+        return {
+            "file_handler": self.run_file_handler,
+            "split": self.run_split,
+            "split_at_silence": self.run_split_at_silence,
+            "transcribe": self.run_transcribe,
+            "subtitles": self.run_subtitles,
+            "process_audio": self.run_process_audio,
+        }
+
+    def latency(self, seed_offset: int = 0) -> FakeLatency:
+        return FakeLatency(
+            latency_seconds=self.args.latency,
+            latency_per_mb=self.args.latency_per_mb,
+            jitter=self.args.jitter,
+            error_rate=self.args.error_rate,
+            seed=self.args.seed + seed_offset
+        )
+
+    def transcription_service(self, extension: str = ".txt") -> FakeTranscriptionService:
+        return FakeTranscriptionService(self.latency(), extension)
+
+    def source(self, extension: str) -> str:
+        return SyntheticAudio.generate(os.path.join(self.args.cache_dir, "sources"), self.args.duration, extension, self.args.bit_rate)
+
+    def run_file_handler(self, source_path: str, work_dir: str) -> dict:
+        # A video that only needs its AAC remuxed and a WAV that has to be encoded
+        for path in (self.source(".mp4"), self.source(".wav")):
+            with PipelineMetrics.track_stage("convert"):
+                audio_file_path = FileHandler.handle_local_file(path, work_dir)
+            os.remove(audio_file_path)
+        return {}
+
+    def run_split(self, source_path: str, work_dir: str) -> dict:
+        segments = AudioService.split_audio(source_path, self.args.segment_ms)
+        for segment in segments:
+            os.remove(segment)
+        return {"segments": len(segments)}
+
+    def run_split_at_silence(self, source_path: str, work_dir: str) -> dict:
+        parts = AudioService.split_audio_at_silence(source_path, self.args.segment_ms, self.args.overlap_ms)
+        for part in parts:
+            os.remove(part.path)
+        return {"segments": len(parts)}
+
+    def run_transcribe(self, source_path: str, work_dir: str) -> dict:
+        service = self.transcription_service()
+        AudioService.transcribe_audio(source_path, service, None)
+        return {"provider_calls": service.latency.calls, "provider_errors": service.latency.errors}
+
+    def run_subtitles(self, source_path: str, work_dir: str) -> dict:
+        # Pure parsing and rendering, the same cue density a real provider returns for this much audio
+        segment_ms = self.args.segment_ms
+        duration_ms = self.args.duration * 1000
+        cue_ms = FakeTranscriptionService.CUE_SECONDS * 1000
+        for adjuster in (SrtAdjuster, VttAdjuster):
+            segments = []
+            for offset_ms in range(0, duration_ms, segment_ms):
+                length_ms = min(segment_ms, duration_ms - offset_ms)
+                cues = [SubtitleCue(start, min(start + cue_ms, length_ms), f"cue at {start}") for start in range(0, length_ms, cue_ms)]
+                segments.append((offset_ms, adjuster.render(cues)))
+            adjuster.merge(segments)
+        return {}
+
+    def run_process_audio(self, source_path: str, work_dir: str) -> dict:
+        from transcription_handler import TranscriptionHandler
+        from enums.transcription_service_type import TranscriptionServiceType
+        from enums.transcription_transformation import TranscriptionTransformation
+
+        # process_audio deletes its input like the worker deletes a downloaded file
+        job_path = os.path.join(work_dir, "job" + os.path.splitext(source_path)[1])
+        shutil.copyfile(source_path, job_path)
+        service = self.transcription_service()
+        transformation = FakeTransformationService(self.latency(seed_offset=1))
+        with patch('transcription_handler.RabbitMQListener'), \
+             patch('transcription_handler.TranscriptionFactory.get_transcription_service', return_value=service), \
+             patch('services.transformation.transformation_runner.TransformationFactory.get_transformation_service', return_value=transformation):
+            handler = TranscriptionHandler()
+            result = handler.process_audio(job_path, [TranscriptionTransformation.SUMMARIZE], work_dir, None, None, TranscriptionServiceType.GROQ, "benchmark")
+        return {"status": result.status, "provider_calls": service.latency.calls, "provider_errors": service.latency.errors}
+
+    @staticmethod
+    def stage_seconds() -> Dict[str, float]:
+        stages = {}
+        for metric in STAGE_DURATION.collect():
+            for sample in metric.samples:
+                if sample.name.endswith("_sum"):
+                    stages[sample.labels["stage"]] = round(sample.value, 4)
+        return stages
+
+    def measure(self, name: str, source_path: str) -> dict:
+        media_info = MediaProbe.probe(source_path)
+        with tempfile.TemporaryDirectory(dir=self.args.cache_dir) as work_dir:
+            os.chdir(work_dir)  # the handler writes its logs relative to the working directory
+            with MemorySampler() as memory:
+                started = time.perf_counter()
+                details = self.scenarios()[name](source_path, work_dir)
+                wall_seconds = time.perf_counter() - started
+
+        audio_seconds = media_info.duration_seconds or self.args.duration
+        audio_mb = os.path.getsize(source_path) / (1024 * 1024)
+        # ru_maxrss is in KB on Linux, the tree peak adds the ffmpeg processes running at the same time
+        return {
+            "wall_seconds": round(wall_seconds, 4),
+            "stages": self.stage_seconds(),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "peak_tree_pss_mb": round(memory.peak_bytes / (1024 * 1024), 1),
+            "audio_seconds": round(audio_seconds, 2),
+            "audio_mb": round(audio_mb, 2),
+            "realtime_factor": round(audio_seconds / wall_seconds, 1) if wall_seconds else None,
+            "mb_per_second": round(audio_mb / wall_seconds, 2) if wall_seconds else None,
+            **details
+        }
+
+    def run(self, names: List[str]) -> Dict[str, dict]:
+        # Sources are generated once up front and reused, generating them isn't part of any timing
+        source_path = self.source(self.args.format)
+        if "file_handler" in names:
+            self.source(".mp4")
+            self.source(".wav")
+        context = multiprocessing.get_context("spawn")
+        results = {}
+        for name in names:
+            runs = []
+            for _ in range(self.args.repeat):
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(run_scenario, (vars(self.args), name, source_path)))
+            results[name] = BenchmarkRunner.summarize(runs)
+            print(BenchmarkRunner.format_result(name, results[name]), flush=True)
+        return results
+
+    @staticmethod
+    def summarize(runs: List[dict]) -> dict:
+        # The median run is kept as is, peak memory is the worst seen across repeats
+        ordered = sorted(runs, key=lambda run: run["wall_seconds"])
+        result = dict(ordered[len(ordered) // 2])
+        result["wall_seconds_all"] = [run["wall_seconds"] for run in runs]
+        result["wall_seconds_stdev"] = round(statistics.stdev(result["wall_seconds_all"]), 4) if len(runs) > 1 else 0.0
+        result["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+        result["peak_tree_pss_mb"] = max(run["peak_tree_pss_mb"] for run in runs)
+        return result
+
+    @staticmethod
+    def format_result(name: str, result: dict) -> str:
+        stages = ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in sorted(result["stages"].items()))
+        return (f"{name:<18} wall={result['wall_seconds']:.2f}s rss={result['peak_rss_mb']}MB tree_pss={result['peak_tree_pss_mb']}MB "
+                f"x{result['realtime_factor']} realtime {result['mb_per_second']}MB/s [{stages}]")
+
+def run_scenario(options: dict, name: str, source_path: str) -> dict:
+    # Runs in the spawned child, provider and worker settings come from the environment like in the real worker
+    args = argparse.Namespace(**options)
+    os.environ.setdefault("METRICS_PORT", "0")
+    os.environ.setdefault("TRANSCRIPT_CACHE_MAX_MB", "0")
+    os.environ["SEGMENT_LENGTH_MS"] = str(args.segment_ms)
+    os.environ["SEGMENT_OVERLAP_MS"] = str(args.overlap_ms)
+    AudioService.MAX_UPLOAD_BYTES = int(args.max_upload_mb * 1024 * 1024)
+    return BenchmarkRunner(args).measure(name, source_path)
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline: dict, results: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for metric in ("wall_seconds", "peak_rss_mb", "peak_tree_pss_mb"):
+            before, after = previous[metric], result[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{name:<18} {metric:<13} {before:>10} -> {after:<10} {change:+.1f}%")
+            if change > tolerance:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+    return regressions
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks with synthetic audio and fake providers")
+    parser.add_argument("--scenario", action="append", help="scenario to run, repeatable, all by default")
+    parser.add_argument("--duration", type=int, default=600, help="synthetic audio length in seconds")
+    parser.add_argument("--format", default=".m4a", choices=sorted(SyntheticAudio.FORMATS), help="synthetic audio container")
+    parser.add_argument("--bit-rate", type=int, default=128, help="synthetic audio bitrate in kbps")
+    parser.add_argument("--segment-ms", type=int, default=120000, help="segment length for splitting")
+    parser.add_argument("--overlap-ms", type=int, default=2000, help="overlap between silence aware segments")
+    parser.add_argument("--max-upload-mb", type=float, default=2.0, help="upload limit, lower than the provider's so splitting is exercised")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake provider latency per request in seconds")
+    parser.add_argument("--latency-per-mb", type=float, default=0.1, help="fake provider latency per uploaded MB in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="fake provider latency jitter as a fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake provider requests that fail with a 503")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario, the median is reported")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "scribe-benchmarks"), help="where synthetic audio is generated and reused")
+    parser.add_argument("--save", metavar="NAME", help=f"save the results as a baseline in {BASELINE_DIR}")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="percent slower or larger before --compare fails")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    args.cache_dir = os.path.abspath(args.cache_dir)
+    os.makedirs(args.cache_dir, exist_ok=True)
+    runner = BenchmarkRunner(args)
+    names = args.scenario or list(runner.scenarios())
+    unknown = set(names) - set(runner.scenarios())
+    if unknown:
+        print(f"Unknown scenarios {sorted(unknown)}, expected {list(runner.scenarios())}", file=sys.stderr)
+        return 2
+
+    results = runner.run(names)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "options": {key: value for key, value in vars(args).items() if key not in ("save", "compare", "cache_dir", "scenario", "tolerance")},
+        "results": results,
+    }
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, f"{args.save}.json"), "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as file:
+            baseline = json.load(file)
+        if baseline["options"] != report["options"]:
+            print(f"Warning: baseline {args.compare} was recorded with different options {baseline['options']}", file=sys.stderr)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"Regressions over {args.tolerance}%: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+import subprocess
+from typing import List
+
+class SyntheticAudio:
+    # Pink noise with a short pause every few seconds, close enough to speech for the encoders and the silence planner
+    FORMATS = {
+        ".m4a": ['-c:a', 'aac', '-f', 'ipod'],
+        ".mp3": ['-c:a', 'libmp3lame', '-f', 'mp3'],
+        ".wav": ['-c:a', 'pcm_s16le', '-f', 'wav'],
+        ".ogg": ['-c:a', 'libopus', '-f', 'ogg'],
+        ".mp4": ['-c:a', 'aac', '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-f', 'mp4'],
+    }
+
+    @staticmethod
+    def generate(output_dir: str, duration_seconds: int, extension: str = ".m4a", bit_rate_kbps: int = 128,
+                 sample_rate: int = 44100, channels: int = 2, pause_every_seconds: float = 4.0) -> str:
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f"synthetic_{duration_seconds}s_{bit_rate_kbps}k{extension}")
+        if os.path.exists(output_path):
+            return output_path
+        subprocess.run(
+            SyntheticAudio.command(output_path, duration_seconds, extension, bit_rate_kbps, sample_rate, channels, pause_every_seconds),
+            check=True, capture_output=True, text=True
+        )
+        return output_path
+
+    @staticmethod
+    def command(output_path: str, duration_seconds: int, extension: str, bit_rate_kbps: int,
+                sample_rate: int, channels: int, pause_every_seconds: float) -> List[str]:
+        if extension not in SyntheticAudio.FORMATS:
+            raise ValueError(f"Unsupported format {extension}, expected one of {sorted(SyntheticAudio.FORMATS)}")
+
+        layout = "mono" if channels == 1 else "stereo"
+        speech = (
+            f"anoisesrc=color=pink:amplitude=0.3:sample_rate={sample_rate}:duration={duration_seconds},"
+            f"aformat=channel_layouts={layout},"
+            f"volume='if(lt(mod(t,{pause_every_seconds}),{pause_every_seconds * 0.9}),1,0)':eval=frame"
+        )
+        command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-f', 'lavfi', '-i', speech]
+        if extension == ".mp4":
+            command += ['-f', 'lavfi', '-i', f"color=c=black:s=320x240:r=5:d={duration_seconds}"]
+        command += ['-t', str(duration_seconds), '-b:a', f"{bit_rate_kbps}k", *SyntheticAudio.FORMATS[extension], output_path]
+        return command
@@ -3,5 +3,8 @@ from enum import Enum
 class JobStatus(Enum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
+    TRANSCRIBING = "transcribing"
+    EXPANDED = "expanded"
+    TRANSFORMED = "transformed"
     FINISHED = "finished"
     FAILED = "failed"
\ No newline at end of file
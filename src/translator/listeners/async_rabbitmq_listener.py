@@ -0,0 +1,127 @@
+import os
+import json
+import random
+import asyncio
+import logging
+import aio_pika
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from listeners.abstract_listener import AbstractJobListener
+from messages.transcription_message import TranscriptionMessage
+
+load_dotenv()
+
+rabbitmq_url = os.getenv("RABBITMQ_CONNECTION_STRING")
+job_queue_name = os.getenv("TRANSCRIPTION_JOB_QUEUE_NAME")
+update_queue_name = os.getenv('TRANSCRIPTION_UPDATE_QUEUE_NAME')
+dead_letter_exchange = os.getenv("DEAD_LETTER_EXCHANGE")
+max_retries = int(os.getenv("MAX_RETRIES", 5))
+job_concurrency = int(os.getenv("ASYNC_JOB_CONCURRENCY", 32))
+
+class AsyncRabbitMQListener(AbstractJobListener):
+    def __init__(self):
+        self.connection = None
+        self.channel = None
+        self.handler = None
+        self.tasks = set()
+
+    async def establish_connection(self):
+        while True:
+            try:
+                self.connection = await aio_pika.connect_robust(rabbitmq_url)
+                self.channel = await self.connection.channel()
+                logging.info("Successfully connected to RabbitMQ")
+                # The prefetch is the number of jobs in flight, each one is a task on this loop
+                await self.channel.set_qos(prefetch_count=job_concurrency)
+
+                exchange = await self.channel.declare_exchange(dead_letter_exchange, aio_pika.ExchangeType.DIRECT, durable=True)
+                dead_letter_queue = await self.channel.declare_queue(f"{job_queue_name}-dlq", durable=True)
+                await dead_letter_queue.bind(exchange, routing_key=f"{job_queue_name}-dlq")
+
+                await self.channel.declare_queue(
+                    update_queue_name,
+                    durable=True,
+                    arguments={
+                        'x-dead-letter-exchange': dead_letter_exchange,
+                        'x-dead-letter-routing-key': f"{update_queue_name}-dlq",
+                        'x-message-ttl': 1000 * 60 * 60 * 24 * 7  # 1 week in milliseconds
+                    }
+                )
+                break
+            except (aio_pika.exceptions.AMQPConnectionError, OSError) as e:
+                logging.error(f"Connection to RabbitMQ failed: {e}. Retrying in 5 seconds...")
+                await asyncio.sleep(5)
+
+    async def listen(self, handler):
+        self.handler = handler
+        await self.establish_connection()
+        queue = await self.channel.declare_queue(
+            job_queue_name,
+            durable=True,
+            arguments={
+                'x-dead-letter-exchange': dead_letter_exchange,
+                'x-dead-letter-routing-key': f"{job_queue_name}-dlq",
+                'x-message-ttl': 1000 * 60 * 60 * 24 * 7  # 1 week in milliseconds
+            }
+        )
+
+        await queue.consume(self.callback)
+        logging.info(f"Listening for messages on RabbitMQ queue: {job_queue_name} (up to {job_concurrency} concurrent jobs)")
+        try:
+            await asyncio.Future()  # consume until cancelled
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.connection.close()
+
+    async def callback(self, message: aio_pika.abc.AbstractIncomingMessage):
+        logging.info(f"Received message from RabbitMQ...")
+        task = asyncio.create_task(self.process_message(message))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def process_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        try:
+            transcription_message = TranscriptionMessage.model_validate_json(message.body)
+            logging.info(f"Parsed Transcription Message: {transcription_message}")
+            update = await self.handler(transcription_message)
+
+            if update is None:
+                raise ValueError(f"Invalid update object: {update}")
+            if isinstance(update, BaseModel):
+                update = update.dict()
+            try:
+                json.dumps(update)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Failed to serialize update object: {e}")
+
+            await self.publish_job_update(update)
+            await message.ack()
+        except asyncio.CancelledError:
+            raise  # shutting down, the broker redelivers unacknowledged jobs
+        except Exception as e:
+            logging.error(f"Error processing message: {e} for message: {message.body}", exc_info=not isinstance(e, (json.JSONDecodeError, ValueError)))
+            await asyncio.sleep(random.randint(1, 5))  # sleep to not instantly re-queue the message
+            await self.retry_message(message)
+
+    async def retry_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        headers = dict(message.headers or {})
+        retry_count = headers.get("x-retry-count", 0)
+        if retry_count >= max_retries:
+            logging.error(f"Max retries reached for message: {message.body}")
+            await message.nack(requeue=False)
+            return
+
+        headers["x-retry-count"] = retry_count + 1
+        await self.channel.default_exchange.publish(aio_pika.Message(body=message.body, headers=headers), routing_key=job_queue_name)
+        await message.ack()
+
+    async def publish_job_update(self, message: dict):
+        try:
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(body=json.dumps(message).encode(), delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+                routing_key=update_queue_name
+            )
+        except Exception as e:
+            logging.error(f"Failed to publish message: {e}", exc_info=True)
@@ -4,6 +4,10 @@ import logging
 import time
 import json
 import random
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
 from dotenv import load_dotenv
 from listeners.abstract_listener import AbstractJobListener
 from messages.transcription_message import TranscriptionMessage
@@ -15,12 +19,16 @@ job_queue_name = os.getenv("TRANSCRIPTION_JOB_QUEUE_NAME")
 update_queue_name = os.getenv('TRANSCRIPTION_UPDATE_QUEUE_NAME')
 dead_letter_exchange = os.getenv("DEAD_LETTER_EXCHANGE")
 max_retries = int(os.getenv("MAX_RETRIES", 5))
+prefetch_count = int(os.getenv("PREFETCH_COUNT", 1))
+worker_concurrency = int(os.getenv("WORKER_CONCURRENCY", prefetch_count))
 
 class RabbitMQListener(AbstractJobListener):
     def __init__(self):
         self.connection = None
         self.channel = None
         self.handler = None
+        self.executor = None
+        self.connection_thread = None
         self.establish_connection()
 
     def establish_connection(self):
@@ -44,6 +52,22 @@ class RabbitMQListener(AbstractJobListener):
 
     def listen(self, handler):
         self.handler = handler # set the handler to the handler passed in, this way we can centralize the retry logic for the callback
+        # Jobs run on a bounded worker pool so the connection thread keeps servicing heartbeats while they run,
+        # the pool outlives a reconnect so jobs in flight finish and publish their update on the new connection
+        self.executor = ThreadPoolExecutor(max_workers=worker_concurrency, thread_name_prefix="job-worker")
+        self.connection_thread = threading.current_thread()
+        try:
+            while True:
+                try:
+                    self.consume()
+                    break
+                except pika.exceptions.AMQPError as e:
+                    # A lost connection ends start_consuming, the consumer is set up again on a new one
+                    logging.error(f"Lost the RabbitMQ connection while consuming: {e}. Reconnecting...")
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def consume(self):
         self.establish_connection()
         self.channel.queue_declare(
             queue=job_queue_name,
@@ -58,48 +82,92 @@ class RabbitMQListener(AbstractJobListener):
         dead_letter_queue = f"{job_queue_name}-dlq"
         self.channel.queue_declare(queue=dead_letter_queue, durable=True)
 
+        self.channel.basic_qos(prefetch_count=prefetch_count)
         self.channel.basic_consume(queue=job_queue_name, on_message_callback=self.callback, auto_ack=False)
-        logging.info(f"Listening for messages on RabbitMQ queue: {job_queue_name}")
+        logging.info(f"Listening for messages on RabbitMQ queue: {job_queue_name} (prefetch {prefetch_count}, workers {worker_concurrency})")
         self.channel.start_consuming()
 
     def callback(self, ch, method, properties, body):
         logging.info(f"Received message from RabbitMQ...")
+        self.executor.submit(self.process_message, ch, method, properties, body)
+
+    def process_message(self, ch, method, properties, body):
         try:
-            transcription_message = TranscriptionMessage.model_validate_json(body)
-            logging.info(f"Parsed Transcription Message: {transcription_message}")
-            # todo : publish in_progress message?
-            update = self.handler(transcription_message)
-            
-            if update is not None:
-                try:
-                    self.publish_job_update(update)
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
-                except (TypeError, ValueError) as e:
-                    raise ValueError(f"Failed to serialize update object: {e}")
-            else:
-                raise ValueError(f"Invalid update object: {update}")
-        except (json.JSONDecodeError, ValueError) as e:
-            logging.error(f"Error processing message: {e} for message: {body}")
+            update = self.run_job(body)
+        except Exception as e:
+            logging.error(f"Error processing message: {e} for message: {body}", exc_info=not isinstance(e, (json.JSONDecodeError, ValueError)))
             time.sleep(random.randint(1, 5))  # sleep to not instantly re-queue the message
-            retry_count = properties.headers.get("x-retry-count", 0) if properties.headers else 0
-            if retry_count >= max_retries:
-                logging.error(f"Max retries reached for message: {body}")
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-            else:
-                properties.headers = properties.headers or {}
-                properties.headers["x-retry-count"] = retry_count + 1
-                ch.basic_publish(
-                    exchange="",
-                    routing_key=job_queue_name,
-                    body=body,
-                    properties=pika.BasicProperties(headers=properties.headers)
-                )
-                ch.basic_ack(delivery_tag=method.delivery_tag)
+            self.hand_off(functools.partial(self.retry_message, ch, method.delivery_tag, properties, body), f"the retry of {body}, it will be redelivered")
+            return
+
+        self.hand_off(functools.partial(self.complete_message, ch, method.delivery_tag, update), f"the result of {body}, it will be redelivered")
 
+    def run_job(self, body) -> dict:
+        transcription_message = TranscriptionMessage.model_validate_json(body)
+        logging.info(f"Parsed Transcription Message: {transcription_message}")
+        # todo : publish in_progress message?
+        update = self.handler(transcription_message)
+
+        if update is None:
+            raise ValueError(f"Invalid update object: {update}")
+        if isinstance(update, BaseModel):
+            update = update.dict()
+        try:
+            json.dumps(update)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Failed to serialize update object: {e}")
+        return update
+
+    def complete_message(self, ch, delivery_tag, update: dict):
+        self.publish_job_update(update)
+        if ch.is_open:
+            ch.basic_ack(delivery_tag=delivery_tag)
+        else:
+            logging.warning(f"Channel closed before job could be acknowledged, it will be redelivered")
+
+    def retry_message(self, ch, delivery_tag, properties, body):
+        if not ch.is_open:
+            logging.warning(f"Channel closed before job could be retried, it will be redelivered")
+            return
+
+        retry_count = properties.headers.get("x-retry-count", 0) if properties.headers else 0
+        if retry_count >= max_retries:
+            logging.error(f"Max retries reached for message: {body}")
+            ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+        else:
+            properties.headers = properties.headers or {}
+            properties.headers["x-retry-count"] = retry_count + 1
+            ch.basic_publish(
+                exchange="",
+                routing_key=job_queue_name,
+                body=body,
+                properties=pika.BasicProperties(headers=properties.headers)
+            )
+            ch.basic_ack(delivery_tag=delivery_tag)
+
+    def hand_off(self, callback, description: str):
+        # Called from a worker, the connection can be closed while the listener reconnects
+        try:
+            self.run_on_connection_thread(callback)
+        except Exception as e:
+            logging.error(f"Failed to hand {description} to the connection thread: {e}", exc_info=True)
+
+    def run_on_connection_thread(self, callback):
+        # pika connections aren't thread safe, anything touching the channel from a worker is handed to the I/O loop
+        if self.connection_thread is None or threading.current_thread() is self.connection_thread:
+            callback()
+        else:
+            self.connection.add_callback_threadsafe(callback)
 
     def publish_job_update(self, message : dict):
+        if self.connection_thread is not None and threading.current_thread() is not self.connection_thread:
+            self.hand_off(functools.partial(self.publish_job_update, message), f"the update for job {message.get('jobId')}")
+            return
+
         try:
             if self.channel is None or self.channel.is_closed:
+                if self.connection_thread is not None:
+                    raise pika.exceptions.ChannelWrongStateError("Channel is closed")
                 self.establish_connection()
             
             # Declare the update queue with dead-lettering
@@ -124,6 +192,8 @@ class RabbitMQListener(AbstractJobListener):
                 ))
         except pika.exceptions.AMQPError as e:
             logging.error(f"Failed to publish message: {e}")
+            if self.connection_thread is not None:
+                raise  # the consumer can't move to a new connection from here, listen reconnects once start_consuming ends
             self.establish_connection()  # Re-establish connection if it fails
         except Exception as e:
             logging.error(f"Failed to publish message: {e}", exc_info=True)
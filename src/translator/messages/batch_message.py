@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class ChildJob(BaseModel):
+    jobId: str
+    videoId: str
+    title: str
+    url: str
+    duration: int = 0
+
+class BatchMessage(BaseModel):
+    jobId: str
+    title: str
+    status: str
+    childCount: int
+    children: List[ChildJob]
+    # What the API needs to queue the children it hasn't already processed for this user
+    userId: str
+    transcriptionType: str
+    transform: str
+    transforms: Optional[List[str]] = None
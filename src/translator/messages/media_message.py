@@ -1,4 +1,6 @@
+import os
 from pydantic import BaseModel
+from enums.job_status import JobStatus
 
 class MediaMessage(BaseModel):
     jobId: str
@@ -6,3 +8,13 @@ class MediaMessage(BaseModel):
     duration: int
     blobUrl: str
     status: str
+
+    @staticmethod
+    def from_video_info(job_id: str, video_info: dict) -> "MediaMessage":
+        return MediaMessage(
+            jobId=job_id,
+            title=os.path.splitext(video_info.get("title", "Unknown Title"))[0],  # Trim the file extension
+            duration=video_info.get("duration", 0),
+            blobUrl="todo://save.to.blob.storage",
+            status=JobStatus.IN_PROGRESS.value
+        )
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from enums.job_status import JobStatus
+from services.audio.segment_progress import SegmentUpdate
+
+class PartialTranscriptMessage(BaseModel):
+    jobId: str
+    segmentIndex: int
+    segmentCount: int
+    startMs: int
+    endMs: int
+    text: str  # subtitle cues are already shifted to the job's timeline, not the segment's
+    final: bool
+    status: str
+
+    @staticmethod
+    def from_update(job_id: str, update: SegmentUpdate) -> "PartialTranscriptMessage":
+        return PartialTranscriptMessage(
+            jobId=job_id,
+            segmentIndex=update.index,
+            segmentCount=update.count,
+            startMs=update.start_ms,
+            endMs=update.end_ms,
+            text=update.text,
+            final=update.final,
+            status=JobStatus.TRANSCRIBING.value
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from enums.transcription_service_type import TranscriptionServiceType
 from enums.transcription_transformation import TranscriptionTransformation
 
@@ -7,8 +7,11 @@ class TranscriptionMessage(BaseModel):
     jobId: str
     transcriptionType: TranscriptionServiceType
     transform: TranscriptionTransformation
+    transforms: Optional[List[TranscriptionTransformation]] = None
     isFile: bool
     content: str
     userId: str
     mimeType: Optional[str] = None
-    fileName: Optional[str] = None
\ No newline at end of file
+    fileName: Optional[str] = None
+    parentJobId: Optional[str] = None
+    videoId: Optional[str] = None
@@ -5,5 +5,6 @@ class TranscriptionResult(BaseModel):
     jobId: str
     transcript: str
     transformed: Optional[str] = None
+    transform: Optional[str] = None
     status: str
     error: Optional[str] = None
@@ -0,0 +1,120 @@
+import os
+import asyncio
+import logging
+import subprocess
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Optional
+from services.audio.audio_service import AudioService
+from services.audio.audio_segmenter import AudioSegmenter
+from services.audio.split_planner import SplitPlanner
+from services.audio.media_probe import MediaProbe
+from services.audio.segment_progress import SegmentProgress, SegmentUpdate
+from services.audio.async_subprocess import AsyncSubprocess
+from services.transcription.transcription_service import TranscriptionService
+from services.cache.transcript_cache import TranscriptCache
+from services.metrics.pipeline_metrics import PipelineMetrics
+
+class AsyncAudioService:
+    # Same splitting and merging as AudioService, with segments uploaded as tasks on the event loop
+
+    @staticmethod
+    async def transcribe_audio(file_path: str, service: TranscriptionService, prompt: Optional[str], ffmpeg: Optional[asyncio.Semaphore] = None,
+                               on_segment: Optional[Callable[[SegmentUpdate], Awaitable[None]]] = None, cache: Optional[TranscriptCache] = None) -> str:
+        encoded_file_path = await AsyncAudioService.pre_encode_for_speech(file_path, ffmpeg)
+        try:
+            return await AsyncAudioService.transcribe_file(encoded_file_path or file_path, service, prompt, ffmpeg, on_segment, cache)
+        finally:
+            if encoded_file_path is not None and os.path.exists(encoded_file_path):
+                os.remove(encoded_file_path)
+
+    @staticmethod
+    async def pre_encode_for_speech(file_path: str, ffmpeg: Optional[asyncio.Semaphore] = None) -> Optional[str]:
+        encoded_file_path = await asyncio.to_thread(AudioService.speech_encode_path, file_path)
+        if encoded_file_path is None:
+            return None
+        with PipelineMetrics.track_stage("pre_encode"):
+            try:
+                await AsyncSubprocess.run(AudioService.speech_encode_command(file_path, encoded_file_path), ffmpeg)
+            except subprocess.CalledProcessError as e:
+                logging.warning(f"Speech pre-encode failed for {file_path}, transcribing the original: {e.stderr}")
+                if os.path.exists(encoded_file_path):
+                    os.remove(encoded_file_path)
+                return None
+        PipelineMetrics.record_file_bytes("pre_encode", encoded_file_path)
+        return encoded_file_path
+
+    @staticmethod
+    async def transcribe_file(file_path: str, service: TranscriptionService, prompt: Optional[str], ffmpeg: Optional[asyncio.Semaphore] = None,
+                              on_segment: Optional[Callable[[SegmentUpdate], Awaitable[None]]] = None, cache: Optional[TranscriptCache] = None) -> str:
+        with PipelineMetrics.track_stage("transcribe"):
+            PipelineMetrics.record_file_bytes("transcribe", file_path)
+            if os.path.getsize(file_path) <= AudioService.MAX_UPLOAD_BYTES:
+                PipelineMetrics.record_segments(1)
+                transcription = await AsyncAudioService.transcribe_audio_segment(file_path, service, prompt, cache)
+                if on_segment is not None:
+                    media_info = await asyncio.to_thread(MediaProbe.probe, file_path)
+                    for update in SegmentProgress(1).complete(0, 0, media_info.duration_ms, transcription):
+                        await on_segment(update)
+                return transcription
+
+            segment_length_ms = await asyncio.to_thread(AudioService.segment_length_for, file_path, int(os.getenv("SEGMENT_LENGTH_MS", 600000)))
+            adjuster = AudioService.SUBTITLE_ADJUSTERS.get(service.file_name_extension())
+            overlap_ms = int(os.getenv("SEGMENT_OVERLAP_MS", 2000)) if adjuster is None else 0
+
+            with PipelineMetrics.track_stage("split"):
+                if os.getenv("SEGMENT_SILENCE_AWARE", "true").lower() == "true":
+                    # The energy analysis decodes the whole file, it counts against the ffmpeg limit like any other pass
+                    async with ffmpeg or nullcontext():
+                        ranges = await asyncio.to_thread(SplitPlanner.plan, file_path, segment_length_ms, segment_length_ms // 20, overlap_ms)
+                    parts = await AudioSegmenter.cut_async(file_path, ranges, ffmpeg)
+                    segments = [part.path for part in parts]
+                    ranges = [(part.start_ms, part.end_ms) for part in parts]
+                else:
+                    segments = await AudioSegmenter.segment_async(file_path, segment_length_ms, ffmpeg)
+                    ranges = await asyncio.to_thread(AudioService.segment_ranges, segments) if adjuster is not None or on_segment is not None else None
+                    overlap_ms = 0
+            offsets = [start_ms for start_ms, _ in ranges] if ranges is not None else None
+            PipelineMetrics.record_segments(len(segments))
+
+            segment_limit = asyncio.Semaphore(int(os.getenv("SEGMENT_CONCURRENCY", 4)))
+            progress = SegmentProgress(len(segments), overlap_ms > 0, adjuster=adjuster)
+            # The lock is taken in the same step as completing the segment, so updates go out in the order they were released
+            publishing = asyncio.Lock()
+
+            async def transcribe_segment(index: int, segment: str) -> str:
+                async with segment_limit:
+                    transcription = await AsyncAudioService.transcribe_audio_segment(segment, service, prompt, cache)
+                if on_segment is not None:
+                    ready = progress.complete(index, *ranges[index], transcription)
+                    async with publishing:
+                        for update in ready:
+                            await on_segment(update)
+                return transcription
+
+            try:
+                transcriptions = await asyncio.gather(*(transcribe_segment(index, segment) for index, segment in enumerate(segments)), return_exceptions=True)
+            finally:
+                for segment in segments:
+                    if os.path.exists(segment):
+                        os.remove(segment)
+
+            failed_segments = [index for index, transcription in enumerate(transcriptions) if isinstance(transcription, BaseException)]
+            for index in failed_segments:
+                logging.error(f"Error transcribing segment {index}: {transcriptions[index]}")
+            if failed_segments:
+                raise RuntimeError(f"Failed to transcribe segments {failed_segments} of {file_path}")
+
+            return AudioService.combine_transcriptions(service, transcriptions, offsets, overlap_ms)
+
+    @staticmethod
+    async def transcribe_audio_segment(file_path: str, service: TranscriptionService, prompt: Optional[str], cache: Optional[TranscriptCache] = None) -> str:
+        # The provider scheduler is shared with the threaded worker, its quota and limit apply to both
+        if cache is None:
+            return await service.transcribe_scheduled_async(file_path, prompt)
+
+        segment_key = await asyncio.to_thread(AudioService.segment_cache_key, file_path, service, prompt)
+        transcription = await asyncio.to_thread(cache.get, segment_key)
+        if transcription is None:
+            transcription = await service.transcribe_scheduled_async(file_path, prompt)
+            await asyncio.to_thread(cache.put, segment_key, transcription)
+        return transcription
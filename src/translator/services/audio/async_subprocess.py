@@ -0,0 +1,29 @@
+import asyncio
+import subprocess
+from typing import List, Optional
+
+class AsyncSubprocess:
+
+    @staticmethod
+    async def run(command: List[str], semaphore: Optional[asyncio.Semaphore] = None) -> subprocess.CompletedProcess:
+        # Mirrors subprocess.run(check=True, capture_output=True, text=True) without blocking the event loop
+        if semaphore is None:
+            return await AsyncSubprocess._run(command)
+        async with semaphore:
+            return await AsyncSubprocess._run(command)
+
+    @staticmethod
+    async def _run(command: List[str]) -> subprocess.CompletedProcess:
+        process = await asyncio.create_subprocess_exec(*command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+        stdout = stdout.decode(errors='replace')
+        stderr = stderr.decode(errors='replace')
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, output=stdout, stderr=stderr)
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
@@ -1,102 +1,310 @@
 import json
+import asyncio
 import subprocess
 import os
-import re
 import logging
-from typing import Optional
+import yt_dlp
+from contextlib import nullcontext
+from typing import List, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
+from services.metrics.pipeline_metrics import PipelineMetrics
+from services.audio.async_subprocess import AsyncSubprocess
+from services.audio.media_probe import MediaProbe
+from services.audio.ytdlp_engine import YtDlpEngine
 
 class AudioDownloader:
+    # Only the fields the pipeline reads, printed as one JSON line once the file is in its final place
+    INFO_TEMPLATE = '%(.{id,title,duration,webpage_url,filepath})j'
+    # What yt-dlp reports when the format can't be fetched by sections, every other error fails the download as before
+    SECTIONS_UNSUPPORTED = ('cannot be partially downloaded', 'requested downloading the video partially')
 
     @staticmethod
-    def get_video_info(url: str) -> dict:
-        command = ['yt-dlp', '--dump-json', url]
+    def max_length_minutes() -> Optional[int]:
+        # Unset, empty and 0 all mean no limit, a typo shouldn't fail every job
+        value = (os.getenv("MAX_LENGTH_MINUTES") or "").strip()
+        if not value:
+            return None
+        try:
+            return int(value) or None
+        except ValueError:
+            logging.warning(f"Ignoring MAX_LENGTH_MINUTES={value!r}, it isn't a number of minutes")
+            return None
+
+    @staticmethod
+    @PipelineMetrics.timed("download")
+    def download_audio_with_info(url: str, path: str, max_length_minutes: Optional[int] = None) -> Tuple[dict, Optional[str]]:
+        # One yt-dlp extraction both reads the metadata and downloads, instead of a --dump-json pass first
+        logging.debug(f"Downloading audio and info from {url} to {path}")
+        try:
+            video_info, file_path = AudioDownloader._fetch_with_info(url, path, "audio", max_length_minutes)
+            if file_path is None:
+                logging.error("File path not found in yt-dlp output")
+                return video_info, None
+            if max_length_minutes:
+                file_path = AudioDownloader._limit_length(file_path, max_length_minutes)
+            return video_info, file_path
+        except (subprocess.CalledProcessError, yt_dlp.utils.DownloadError) as e:
+            logging.error(f"Error: {getattr(e, 'stderr', None) or e}")
+            return AudioDownloader._unknown_info(url), None
+
+    @staticmethod
+    @PipelineMetrics.timed("download")
+    def download_vimeo_video_with_info(url: str, path: str, max_length_minutes: Optional[int] = None) -> Tuple[dict, Optional[str]]:
+        return AudioDownloader._fetch_and_extract(url, os.path.join(path, 'vimeo'), path, max_length_minutes, "Vimeo")
+
+    @staticmethod
+    @PipelineMetrics.timed("download")
+    def download_google_drive_video_with_info(url: str, path: str, max_length_minutes: Optional[int] = None) -> Tuple[dict, Optional[str]]:
+        logging.debug(f"Processing Google Drive URL: {url}")
+        direct_link = AudioDownloader._google_drive_direct_link(url)
+        if direct_link is None:
+            return AudioDownloader._unknown_info(url), None
+        return AudioDownloader._fetch_and_extract(direct_link, os.path.join(path, 'google'), path, max_length_minutes, "Google Drive")
+
+    @staticmethod
+    def _fetch_and_extract(url: str, download_dir: str, path: str, max_length_minutes: Optional[int], source_name: str) -> Tuple[dict, Optional[str]]:
+        # The file yt-dlp reports is the one extracted, whatever else is left in the download directory
+        try:
+            video_info, media_file_path = AudioDownloader._fetch_with_info(url, download_dir, "media", max_length_minutes)
+            if media_file_path is None:
+                logging.error("No files were downloaded.")
+                return video_info, None
+
+            audio_file_path = AudioDownloader._extracted_audio_path(media_file_path, path)
+            subprocess.run(AudioDownloader._extract_command(media_file_path, audio_file_path, max_length_minutes), check=True)
+            os.remove(media_file_path)  # Delete the original download
+            return video_info, audio_file_path
+        except (subprocess.CalledProcessError, yt_dlp.utils.DownloadError) as e:
+            logging.error(f"Error downloading media from {source_name}: {getattr(e, 'stderr', None) or e}")
+        return AudioDownloader._unknown_info(url), None
+
+    @staticmethod
+    def _fetch_with_info(url: str, download_dir: str, profile: str, max_length_minutes: Optional[int] = None) -> Tuple[dict, Optional[str]]:
+        try:
+            return AudioDownloader._fetch_once(url, download_dir, profile, max_length_minutes)
+        except (subprocess.CalledProcessError, yt_dlp.utils.DownloadError) as e:
+            if not max_length_minutes or not AudioDownloader._sections_unsupported(e):
+                raise
+            logging.warning(f"Ranged download of {url} failed, fetching the whole file instead: {getattr(e, 'stderr', None) or e}")
+            return AudioDownloader._fetch_once(url, download_dir, profile)
+
+    @staticmethod
+    def _fetch_once(url: str, download_dir: str, profile: str, max_length_minutes: Optional[int] = None) -> Tuple[dict, Optional[str]]:
+        # The embedded engine by default, a yt-dlp process per download when YTDLP_ENGINE=subprocess
+        max_seconds = max_length_minutes * 60 if max_length_minutes else None
+        if YtDlpEngine.is_enabled():
+            video_info, file_path = YtDlpEngine.submit(url, download_dir, profile, max_seconds=max_seconds).result()
+            return AudioDownloader._normalize_info(video_info, file_path), file_path
+
+        os.makedirs(download_dir, exist_ok=True)
+        command = AudioDownloader._with_info_command(profile, url, download_dir, max_length_minutes)
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        return AudioDownloader._parse_download_info(result.stdout, url)
+
+    @staticmethod
+    def _sections_unsupported(error: Exception) -> bool:
+        message = getattr(error, 'stderr', None) or str(error)
+        return any(marker in message for marker in AudioDownloader.SECTIONS_UNSUPPORTED)
+
+    @staticmethod
+    def _limit_length(file_path: str, max_length_minutes: int) -> str:
+        # Sections are cut on keyframes and a full fetch after a fallback isn't cut at all, a stream copy evens both out
+        if not AudioDownloader._exceeds(file_path, max_length_minutes):
+            return file_path
+        trimmed_file_path = AudioDownloader._trimmed_path(file_path)
+        subprocess.run(AudioDownloader._trim_command(file_path, trimmed_file_path, max_length_minutes), check=True, capture_output=True, text=True)
+        os.remove(file_path)
+        return trimmed_file_path
+
+    @staticmethod
+    def _exceeds(file_path: str, max_length_minutes: int) -> bool:
+        # A second of slack for the container rounding the section's end
+        return MediaProbe.probe(file_path).duration_seconds > max_length_minutes * 60 + 1
+
+    # asyncio variants for the async worker, same commands run through create_subprocess_exec
+    # with yt-dlp bounded by the download semaphore and ffmpeg by the ffmpeg one
+
+    @staticmethod
+    async def download_audio_with_info_async(url: str, path: str, max_length_minutes: Optional[int] = None,
+                                             downloads: Optional[asyncio.Semaphore] = None, ffmpeg: Optional[asyncio.Semaphore] = None) -> Tuple[dict, Optional[str]]:
+        with PipelineMetrics.track_stage("download"):
+            try:
+                video_info, file_path = await AudioDownloader._fetch_with_info_async(url, path, "audio", max_length_minutes, downloads)
+                if file_path is None:
+                    logging.error("File path not found in yt-dlp output")
+                    return video_info, None
+                if max_length_minutes:
+                    file_path = await AudioDownloader._limit_length_async(file_path, max_length_minutes, ffmpeg)
+                return video_info, file_path
+            except (subprocess.CalledProcessError, yt_dlp.utils.DownloadError) as e:
+                logging.error(f"Error: {getattr(e, 'stderr', None) or e}")
+                return AudioDownloader._unknown_info(url), None
+
+    @staticmethod
+    async def download_vimeo_video_with_info_async(url: str, path: str, max_length_minutes: Optional[int] = None,
+                                                   downloads: Optional[asyncio.Semaphore] = None, ffmpeg: Optional[asyncio.Semaphore] = None) -> Tuple[dict, Optional[str]]:
+        with PipelineMetrics.track_stage("download"):
+            return await AudioDownloader._fetch_and_extract_async(url, os.path.join(path, 'vimeo'), path, max_length_minutes, "Vimeo", downloads, ffmpeg)
+
+    @staticmethod
+    async def download_google_drive_video_with_info_async(url: str, path: str, max_length_minutes: Optional[int] = None,
+                                                          downloads: Optional[asyncio.Semaphore] = None, ffmpeg: Optional[asyncio.Semaphore] = None) -> Tuple[dict, Optional[str]]:
+        direct_link = AudioDownloader._google_drive_direct_link(url)
+        if direct_link is None:
+            return AudioDownloader._unknown_info(url), None
+        with PipelineMetrics.track_stage("download"):
+            return await AudioDownloader._fetch_and_extract_async(direct_link, os.path.join(path, 'google'), path, max_length_minutes, "Google Drive", downloads, ffmpeg)
+
+    @staticmethod
+    async def _fetch_and_extract_async(url: str, download_dir: str, path: str, max_length_minutes: Optional[int], source_name: str,
+                                       downloads: Optional[asyncio.Semaphore] = None, ffmpeg: Optional[asyncio.Semaphore] = None) -> Tuple[dict, Optional[str]]:
+        try:
+            video_info, media_file_path = await AudioDownloader._fetch_with_info_async(url, download_dir, "media", max_length_minutes, downloads)
+            if media_file_path is None:
+                logging.error("No files were downloaded.")
+                return video_info, None
+
+            audio_file_path = AudioDownloader._extracted_audio_path(media_file_path, path)
+            await AsyncSubprocess.run(AudioDownloader._extract_command(media_file_path, audio_file_path, max_length_minutes), ffmpeg)
+            os.remove(media_file_path)  # Delete the original download
+            return video_info, audio_file_path
+        except (subprocess.CalledProcessError, yt_dlp.utils.DownloadError) as e:
+            logging.error(f"Error downloading media from {source_name}: {getattr(e, 'stderr', None) or e}")
+        return AudioDownloader._unknown_info(url), None
+
+    @staticmethod
+    async def _fetch_with_info_async(url: str, download_dir: str, profile: str, max_length_minutes: Optional[int] = None,
+                                     downloads: Optional[asyncio.Semaphore] = None) -> Tuple[dict, Optional[str]]:
         try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            return json.loads(result.stdout)
-        except Exception as e:
-            logging.error(f"Error occurred while trying to get video info: {str(e)}")
-            return {"title": "Unknown Title", "duration": 0, "url": url}
+            return await AudioDownloader._fetch_once_async(url, download_dir, profile, max_length_minutes, downloads)
+        except (subprocess.CalledProcessError, yt_dlp.utils.DownloadError) as e:
+            if not max_length_minutes or not AudioDownloader._sections_unsupported(e):
+                raise
+            logging.warning(f"Ranged download of {url} failed, fetching the whole file instead: {getattr(e, 'stderr', None) or e}")
+            return await AudioDownloader._fetch_once_async(url, download_dir, profile, None, downloads)
 
     @staticmethod
-    def download_audio(url: str, path: str, max_length_minutes: Optional[int] = None) -> Optional[str]:
-        logging.debug(f"Downloading audio from {url} to {path}")
+    async def _fetch_once_async(url: str, download_dir: str, profile: str, max_length_minutes: Optional[int] = None,
+                                downloads: Optional[asyncio.Semaphore] = None) -> Tuple[dict, Optional[str]]:
+        max_seconds = max_length_minutes * 60 if max_length_minutes else None
+        if YtDlpEngine.is_enabled():
+            async with downloads or nullcontext():
+                video_info, file_path = await asyncio.wrap_future(YtDlpEngine.submit(url, download_dir, profile, max_seconds=max_seconds))
+            return await asyncio.to_thread(AudioDownloader._normalize_info, video_info, file_path), file_path
+
+        os.makedirs(download_dir, exist_ok=True)
+        command = AudioDownloader._with_info_command(profile, url, download_dir, max_length_minutes)
+        result = await AsyncSubprocess.run(command, downloads)
+        return await asyncio.to_thread(AudioDownloader._parse_download_info, result.stdout, url)
 
-        os.makedirs(path, exist_ok=True)
+    @staticmethod
+    async def _limit_length_async(file_path: str, max_length_minutes: int, ffmpeg: Optional[asyncio.Semaphore] = None) -> str:
+        if not await asyncio.to_thread(AudioDownloader._exceeds, file_path, max_length_minutes):
+            return file_path
+        trimmed_file_path = AudioDownloader._trimmed_path(file_path)
+        await AsyncSubprocess.run(AudioDownloader._trim_command(file_path, trimmed_file_path, max_length_minutes), ffmpeg)
+        os.remove(file_path)
+        return trimmed_file_path
 
-        command = [
+    @staticmethod
+    def _download_audio_command(url: str, path: str, max_length_minutes: Optional[int] = None) -> List[str]:
+        return [
             'yt-dlp', '-x', '--audio-format', 'm4a',
             '--output', os.path.join(path, '%(title)s.%(ext)s'),
-            '--format', 'bestaudio', '-N', '4', url
+            '--format', 'bestaudio', '-N', '4',
+            *AudioDownloader._section_arguments(max_length_minutes), url
         ]
 
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            file_path_match = re.search(r'Destination:\s+(.*\.m4a)', result.stdout)
+    @staticmethod
+    def _section_arguments(max_length_minutes: Optional[int]) -> List[str]:
+        # yt-dlp hands the section to ffmpeg, which reads only the ranges it needs instead of the whole file
+        if not max_length_minutes:
+            return []
+        return ['--download-sections', f'*0-{max_length_minutes * 60}']
 
-            if file_path_match:
-                file_path = file_path_match.group(1)
-                if max_length_minutes:
-                    trimmed_file_path = file_path.replace('.m4a', '_trimmed.m4a')
-                    subprocess.run(['ffmpeg', '-i', file_path, '-ss', '00:00:00', '-t', f'{max_length_minutes * 60}', trimmed_file_path], check=True)
-                    os.remove(file_path)
-                    return trimmed_file_path
-                return file_path
-            else:
-                logging.error("File path not found in yt-dlp output")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error: {e.stderr}")
-        return None
+    @staticmethod
+    def _with_info_command(profile: str, url: str, download_dir: str, max_length_minutes: Optional[int] = None) -> List[str]:
+        if profile == "audio":
+            return AudioDownloader._download_audio_with_info_command(url, download_dir, max_length_minutes)
+        return AudioDownloader._download_media_with_info_command(url, download_dir, max_length_minutes)
+
+    @staticmethod
+    def _download_audio_with_info_command(url: str, path: str, max_length_minutes: Optional[int] = None) -> List[str]:
+        return AudioDownloader._download_audio_command(url, path, max_length_minutes)[:-1] + AudioDownloader._print_info_arguments() + [url]
+
+    @staticmethod
+    def _download_media_with_info_command(url: str, download_dir: str, max_length_minutes: Optional[int] = None) -> List[str]:
+        return AudioDownloader._download_media_command(url, download_dir, max_length_minutes)[:-1] + AudioDownloader._print_info_arguments() + [url]
+
+    @staticmethod
+    def _print_info_arguments() -> List[str]:
+        # --print normally implies --simulate, printing after the move keeps the download and still quiets the progress output
+        return ['--print', f'after_move:{AudioDownloader.INFO_TEMPLATE}', '--no-simulate']
+
+    @staticmethod
+    def _parse_download_info(stdout: str, url: str) -> Tuple[dict, Optional[str]]:
+        for line in reversed(stdout.splitlines()):
+            line = line.strip()
+            if not line.startswith('{'):
+                continue
+            try:
+                video_info = json.loads(line)
+            except ValueError:
+                continue
+            file_path = video_info.pop("filepath", None)
+            video_info["url"] = url
+            return AudioDownloader._normalize_info(video_info, file_path), file_path
+        return AudioDownloader._unknown_info(url), None
+
+    @staticmethod
+    def _normalize_info(video_info: dict, file_path: Optional[str]) -> dict:
+        video_info["title"] = video_info.get("title") or "Unknown Title"
+        # Sites the generic extractor handles don't report a duration, the container header has it
+        if not video_info.get("duration") and file_path and os.path.exists(file_path):
+            video_info["duration"] = MediaProbe.probe(file_path).duration_seconds
+        video_info["duration"] = int(video_info.get("duration") or 0)
+        return video_info
 
     @staticmethod
-    def download_vimeo_video(url: str, path: str, max_length_minutes: Optional[int] = None) -> Optional[str]:
-        logging.debug(f"Processing Vimeo URL: {url}")
-        
-        vimeo_dir = os.path.join(path, 'vimeo')
-        os.makedirs(vimeo_dir, exist_ok=True)
+    def _unknown_info(url: str) -> dict:
+        return {"title": "Unknown Title", "duration": 0, "url": url}
 
-        command = [
+    @staticmethod
+    def _download_media_command(url: str, download_dir: str, max_length_minutes: Optional[int] = None) -> List[str]:
+        return [
             'yt-dlp',
-            '--output', os.path.join(vimeo_dir, '%(title)s.%(ext)s'),
-            '--format', 'bestvideo+bestaudio/best',  # Download best video and audio format available
+            '--output', os.path.join(download_dir, '%(title)s.%(ext)s'),
+            '--format', 'bestaudio/best',  # Audio-only when the site offers it, a single muxed file otherwise
+            *AudioDownloader._section_arguments(max_length_minutes),
             url
         ]
 
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            output = result.stdout
-            
-            downloaded_files = os.listdir(vimeo_dir)
-            if downloaded_files:
-                video_file_path = os.path.join(vimeo_dir, downloaded_files[0])
-                
-                # Convert the video file to audio
-                audio_file_name = os.path.splitext(os.path.basename(video_file_path))[0] + '_audio.m4a'
-                audio_dir = os.path.join(path, 'audio')
-                os.makedirs(audio_dir, exist_ok=True)
-                audio_file_path = os.path.join(audio_dir, audio_file_name)
-                
-                subprocess.run(['ffmpeg', '-i', video_file_path, '-vn', '-ar', '16000', '-ac', '1', '-ab', '128k', '-f', 'ipod', audio_file_path], check=True)
-                os.remove(video_file_path)  # Delete the original video file
+    @staticmethod
+    def _trim_command(file_path: str, trimmed_file_path: str, max_length_minutes: int) -> List[str]:
+        # A stream copy, the audio is cut at the limit without being decoded again
+        return ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', file_path,
+                '-t', f'{max_length_minutes * 60}', '-map', '0:a:0', '-c', 'copy', trimmed_file_path]
 
-                if max_length_minutes:
-                    trimmed_file_path = audio_file_path.replace('.m4a', '_trimmed.m4a')
-                    subprocess.run(['ffmpeg', '-i', audio_file_path, '-ss', '00:00:00', '-t', f'{max_length_minutes * 60}', trimmed_file_path], check=True)
-                    os.remove(audio_file_path)
-                    return trimmed_file_path
+    @staticmethod
+    def _trimmed_path(file_path: str) -> str:
+        base_name, ext = os.path.splitext(file_path)
+        return f'{base_name}_trimmed{ext}'
 
-                return audio_file_path
-            else:
-                logging.error("No files were downloaded.")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error downloading video from Vimeo: {e.stderr}")
-        
-        return None
+    @staticmethod
+    def _extract_command(media_file_path: str, audio_file_path: str, max_length_minutes: Optional[int]) -> List[str]:
+        # Extract, resample to 16 kHz mono and trim in a single ffmpeg pass
+        trim = ['-t', f'{max_length_minutes * 60}'] if max_length_minutes else []
+        return ['ffmpeg', '-i', media_file_path, '-vn', *trim, '-ar', '16000', '-ac', '1', '-ab', '128k', '-f', 'ipod', audio_file_path]
 
     @staticmethod
-    def download_google_drive_video(url: str, path: str, max_length_minutes: Optional[int] = None) -> Optional[str]:
-        logging.debug(f"Processing Google Drive URL: {url}")
-        
+    def _extracted_audio_path(media_file_path: str, path: str) -> str:
+        audio_file_name = os.path.splitext(os.path.basename(media_file_path))[0] + '_audio.m4a'
+        audio_dir = os.path.join(path, 'audio')
+        os.makedirs(audio_dir, exist_ok=True)
+        return os.path.join(audio_dir, audio_file_name)
+
+    @staticmethod
+    def _google_drive_direct_link(url: str) -> Optional[str]:
         parsed_url = urlparse(url)
         file_id = None
 
@@ -117,43 +325,4 @@ class AudioDownloader:
             logging.error("File ID could not be extracted.")
             return None
 
-        direct_link = f"https://drive.google.com/uc?export=download&id={file_id}"
-        
-        google_dir = os.path.join(path, 'google')
-        os.makedirs(google_dir, exist_ok=True)
-
-        command = [
-            'yt-dlp',
-            '--output', os.path.join(google_dir, '%(title)s.%(ext)s'),
-            '--format', 'bestvideo+bestaudio/best',
-            direct_link
-        ]
-
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            downloaded_files = os.listdir(google_dir)
-            if downloaded_files:
-                video_file_path = os.path.join(google_dir, downloaded_files[0])
-                
-                # Convert the video file to audio
-                audio_file_name = os.path.splitext(os.path.basename(video_file_path))[0] + '_audio.m4a'
-                audio_dir = os.path.join(path, 'audio')
-                os.makedirs(audio_dir, exist_ok=True)
-                audio_file_path = os.path.join(audio_dir, audio_file_name)
-                
-                subprocess.run(['ffmpeg', '-i', video_file_path, '-vn', '-ar', '16000', '-ac', '1', '-ab', '128k', '-f', 'ipod', audio_file_path], check=True)
-                os.remove(video_file_path)  # Delete the original video file
-
-                if max_length_minutes:
-                    trimmed_file_path = audio_file_path.replace('.m4a', '_trimmed.m4a')
-                    subprocess.run(['ffmpeg', '-i', audio_file_path, '-ss', '00:00:00', '-t', f'{max_length_minutes * 60}', trimmed_file_path], check=True)
-                    os.remove(audio_file_path)
-                    return trimmed_file_path
-
-                return audio_file_path
-            else:
-                logging.error("No files were downloaded.")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error downloading video from Google Drive: {e.stderr}")
-        
-        return None
+        return f"https://drive.google.com/uc?export=download&id={file_id}"
@@ -0,0 +1,186 @@
+import os
+import glob
+import asyncio
+import re
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from services.audio.async_subprocess import AsyncSubprocess
+
+@dataclass
+class AudioPart:
+    path: str
+    start_ms: int
+    end_ms: int
+
+class AudioSegmenter:
+    # ffmpeg muxer names for the containers we produce, anything else uses the extension as-is
+    _muxer_map = {
+        'm4a': 'ipod',
+        'mp4': 'ipod',
+        'aac': 'adts',
+        'oga': 'ogg',
+    }
+    # encoders used when a stream can't be copied, the default aac matches the m4a files we produce
+    _encoder_map = {
+        'mp3': 'libmp3lame',
+        'ogg': 'libopus',
+        'oga': 'libopus',
+        'opus': 'libopus',
+        'webm': 'libopus',
+    }
+
+    @staticmethod
+    def segment(file_path: str, segment_length_ms: int = 600000) -> List[str]:
+        base, ext = os.path.splitext(file_path)
+        output_pattern = f"{base}_part%d{ext}"
+
+        # Stream copy first, the container is cut on packet boundaries without decoding the audio
+        command = AudioSegmenter._build_command(file_path, output_pattern, segment_length_ms, copy_codec=True)
+        if not AudioSegmenter._run(command):
+            # Some inputs can't be stream copied into the target container, re-encode once as a stream instead
+            logging.warning(f"Stream copy segmentation failed for {file_path}, re-encoding segments")
+            AudioSegmenter._remove_parts(base, ext)
+            command = AudioSegmenter._build_command(file_path, output_pattern, segment_length_ms, copy_codec=False)
+            if not AudioSegmenter._run(command):
+                AudioSegmenter._remove_parts(base, ext)
+                raise RuntimeError(f"Failed to segment audio file {file_path}")
+
+        return AudioSegmenter._collect_parts(base, ext)
+
+    @staticmethod
+    def cut(file_path: str, ranges: List[Tuple[int, int]]) -> List[AudioPart]:
+        base, ext = os.path.splitext(file_path)
+        parts = []
+        try:
+            for i, (start_ms, end_ms) in enumerate(ranges):
+                part_file_path = f"{base}_part{i}{ext}"
+                # Input seeking with a stream copy only reads the packets inside the range
+                command = AudioSegmenter._build_cut_command(file_path, part_file_path, start_ms, end_ms, copy_codec=True)
+                if not AudioSegmenter._run(command):
+                    logging.warning(f"Stream copy cut failed for {part_file_path}, re-encoding the range")
+                    command = AudioSegmenter._build_cut_command(file_path, part_file_path, start_ms, end_ms, copy_codec=False)
+                    if not AudioSegmenter._run(command):
+                        raise RuntimeError(f"Failed to cut {start_ms}-{end_ms}ms from audio file {file_path}")
+                parts.append(AudioPart(part_file_path, start_ms, end_ms))
+        except Exception:
+            AudioSegmenter._remove_parts(base, ext)
+            raise
+
+        return parts
+
+    @staticmethod
+    async def segment_async(file_path: str, segment_length_ms: int = 600000, ffmpeg: Optional[asyncio.Semaphore] = None) -> List[str]:
+        base, ext = os.path.splitext(file_path)
+        output_pattern = f"{base}_part%d{ext}"
+
+        command = AudioSegmenter._build_command(file_path, output_pattern, segment_length_ms, copy_codec=True)
+        if not await AudioSegmenter._run_async(command, ffmpeg):
+            logging.warning(f"Stream copy segmentation failed for {file_path}, re-encoding segments")
+            AudioSegmenter._remove_parts(base, ext)
+            command = AudioSegmenter._build_command(file_path, output_pattern, segment_length_ms, copy_codec=False)
+            if not await AudioSegmenter._run_async(command, ffmpeg):
+                AudioSegmenter._remove_parts(base, ext)
+                raise RuntimeError(f"Failed to segment audio file {file_path}")
+
+        return AudioSegmenter._collect_parts(base, ext)
+
+    @staticmethod
+    async def cut_async(file_path: str, ranges: List[Tuple[int, int]], ffmpeg: Optional[asyncio.Semaphore] = None) -> List[AudioPart]:
+        # Every range is an independent seek into the source, so the cuts run side by side
+        base, ext = os.path.splitext(file_path)
+
+        async def cut_range(i: int, start_ms: int, end_ms: int) -> AudioPart:
+            part_file_path = f"{base}_part{i}{ext}"
+            command = AudioSegmenter._build_cut_command(file_path, part_file_path, start_ms, end_ms, copy_codec=True)
+            if not await AudioSegmenter._run_async(command, ffmpeg):
+                logging.warning(f"Stream copy cut failed for {part_file_path}, re-encoding the range")
+                command = AudioSegmenter._build_cut_command(file_path, part_file_path, start_ms, end_ms, copy_codec=False)
+                if not await AudioSegmenter._run_async(command, ffmpeg):
+                    raise RuntimeError(f"Failed to cut {start_ms}-{end_ms}ms from audio file {file_path}")
+            return AudioPart(part_file_path, start_ms, end_ms)
+
+        tasks = [asyncio.ensure_future(cut_range(i, start_ms, end_ms)) for i, (start_ms, end_ms) in enumerate(ranges)]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            # Stop the cuts still running before their parts are removed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            AudioSegmenter._remove_parts(base, ext)
+            raise
+
+    @staticmethod
+    def _build_cut_command(file_path: str, part_file_path: str, start_ms: int, end_ms: int, copy_codec: bool) -> List[str]:
+        ext = os.path.splitext(file_path)[1].replace('.', '').lower()
+        codec = AudioSegmenter._codec_args(ext, copy_codec)
+
+        return [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-ss', f'{start_ms / 1000:.3f}',
+            '-i', file_path,
+            '-t', f'{(end_ms - start_ms) / 1000:.3f}',
+            '-map', '0:a:0', '-vn',
+            *codec,
+            '-f', AudioSegmenter._muxer_map.get(ext, ext),
+            part_file_path
+        ]
+
+    @staticmethod
+    def _build_command(file_path: str, output_pattern: str, segment_length_ms: int, copy_codec: bool) -> List[str]:
+        ext = os.path.splitext(file_path)[1].replace('.', '').lower()
+        codec = AudioSegmenter._codec_args(ext, copy_codec)
+
+        return [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-i', file_path,
+            '-map', '0:a:0', '-vn',
+            *codec,
+            '-f', 'segment',
+            '-segment_time', f'{segment_length_ms / 1000:.3f}',
+            '-segment_format', AudioSegmenter._muxer_map.get(ext, ext),
+            '-reset_timestamps', '1',
+            output_pattern
+        ]
+
+    @staticmethod
+    def _codec_args(ext: str, copy_codec: bool) -> List[str]:
+        if copy_codec:
+            return ['-c', 'copy']
+        return ['-c:a', AudioSegmenter._encoder_map.get(ext, 'aac'), '-b:a', '128k', '-ar', '16000', '-ac', '1']
+
+    @staticmethod
+    def _run(command: List[str]) -> bool:
+        try:
+            subprocess.run(command, check=True, capture_output=True, text=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            logging.error(f"ffmpeg segmentation error: {e.stderr}")
+            return False
+
+    @staticmethod
+    async def _run_async(command: List[str], ffmpeg: Optional[asyncio.Semaphore] = None) -> bool:
+        try:
+            await AsyncSubprocess.run(command, ffmpeg)
+            return True
+        except subprocess.CalledProcessError as e:
+            logging.error(f"ffmpeg segmentation error: {e.stderr}")
+            return False
+
+    @staticmethod
+    def _collect_parts(base: str, ext: str) -> List[str]:
+        part_pattern = re.compile(re.escape(base) + r"_part(\d+)" + re.escape(ext) + "$")
+        parts = []
+        for part_file_path in glob.glob(f"{glob.escape(base)}_part*{glob.escape(ext)}"):
+            match = part_pattern.match(part_file_path)
+            if match:
+                parts.append((int(match.group(1)), part_file_path))
+
+        return [part_file_path for _, part_file_path in sorted(parts)]
+
+    @staticmethod
+    def _remove_parts(base: str, ext: str):
+        for part_file_path in AudioSegmenter._collect_parts(base, ext):
+            os.remove(part_file_path)
@@ -1,73 +1,193 @@
 import os
 import logging
-from typing import List
-from pydub import AudioSegment
+import subprocess
+from typing import Callable, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.audio.audio_segmenter import AudioSegmenter, AudioPart
+from services.audio.split_planner import SplitPlanner
+from services.audio.media_probe import MediaProbe
+from services.audio.transcript_stitcher import TranscriptStitcher
+from services.audio.segment_progress import SegmentProgress, SegmentUpdate
 from services.audio.srt_adjuster import SrtAdjuster
 from services.audio.vtt_adjuster import VttAdjuster
-from enums.transcription_service_type import TranscriptionServiceType
 from services.transcription.transcription_service import TranscriptionService
+from services.cache.transcript_cache import TranscriptCache
+from services.metrics.pipeline_metrics import PipelineMetrics
 
 class AudioService:
+    MAX_UPLOAD_BYTES = 26214400  # provider limit per request
+    SUBTITLE_ADJUSTERS = {".srt": SrtAdjuster, ".vtt": VttAdjuster}
 
     @staticmethod
+    @PipelineMetrics.timed("split")
     def split_audio(file_path: str, segment_length_ms: int = 600000) -> List[str]:
-        song = AudioSegment.from_file(file_path)
-        parts = (len(song) + segment_length_ms - 1) // segment_length_ms  # Calculate number of parts
-        base, ext = os.path.splitext(file_path)
-        audio_format = ext.replace('.', '')
+        # Parts are cut by ffmpeg and written to disk as it goes, so memory stays flat regardless of input length
+        return AudioSegmenter.segment(file_path, segment_length_ms)
 
-        def export_segment(i: int):
-            start = i * segment_length_ms
-            part = song[start:start + segment_length_ms]
-            part_file_path = f"{base}_part{i}{ext}"
-            part.export(part_file_path, format=audio_format if audio_format != 'm4a' else 'ipod')
-            return part_file_path
+    @staticmethod
+    @PipelineMetrics.timed("split")
+    def split_audio_at_silence(file_path: str, segment_length_ms: int = 600000, overlap_ms: int = 0) -> List[AudioPart]:
+        # Cuts land in the quietest stretch near each nominal boundary instead of mid-word
+        ranges = SplitPlanner.plan(file_path, segment_length_ms, search_window_ms=segment_length_ms // 20, overlap_ms=overlap_ms)
+        return AudioSegmenter.cut(file_path, ranges)
+
+    @staticmethod
+    def transcribe_audio(file_path: str, service: TranscriptionService, prompt: str, cache: Optional[TranscriptCache] = None,
+                         on_segment: Optional[Callable[[SegmentUpdate], None]] = None) -> str:
+        # The size check and splitting run on the speech encode when it's enabled, usually one or two requests an hour
+        encoded_file_path = AudioService.pre_encode_for_speech(file_path)
+        try:
+            return AudioService.transcribe_file(encoded_file_path or file_path, service, prompt, cache, on_segment)
+        finally:
+            if encoded_file_path is not None and os.path.exists(encoded_file_path):
+                os.remove(encoded_file_path)
+
+    @staticmethod
+    @PipelineMetrics.timed("pre_encode")
+    def pre_encode_for_speech(file_path: str) -> Optional[str]:
+        encoded_file_path = AudioService.speech_encode_path(file_path)
+        if encoded_file_path is None:
+            return None
+        try:
+            subprocess.run(AudioService.speech_encode_command(file_path, encoded_file_path), check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            logging.warning(f"Speech pre-encode failed for {file_path}, transcribing the original: {e.stderr}")
+            if os.path.exists(encoded_file_path):
+                os.remove(encoded_file_path)
+            return None
+        PipelineMetrics.record_file_bytes("pre_encode", encoded_file_path)
+        logging.info(f"Pre-encoded {file_path} for speech: {os.path.getsize(file_path)} -> {os.path.getsize(encoded_file_path)} bytes")
+        return encoded_file_path
 
-        with ThreadPoolExecutor(max_workers=6) as executor:
-            segments = list(executor.map(export_segment, range(parts)))
+    @staticmethod
+    def speech_encode_path(file_path: str) -> Optional[str]:
+        # None when pre-encoding is off or wouldn't make the upload any smaller
+        if os.getenv("SPEECH_PRE_ENCODE", "false").lower() != "true":
+            return None
+        media_info = MediaProbe.probe(file_path)
+        already_speech = media_info.audio_codec == "opus" and media_info.channels == 1
+        if already_speech or (media_info.bit_rate and media_info.bit_rate <= AudioService.speech_bit_rate() * 1.25):
+            logging.debug(f"{file_path} is already {media_info.audio_codec} at {media_info.bit_rate} bps, not pre-encoding")
+            return None
+        return f"{os.path.splitext(file_path)[0]}_speech.ogg"
 
-        return segments
+    @staticmethod
+    def speech_bit_rate() -> int:
+        return int(os.getenv("SPEECH_BITRATE_KBPS", 24)) * 1000
 
     @staticmethod
-    def transcribe_audio(file_path: str, service: TranscriptionService, prompt: str) -> str:
-        if os.path.getsize(file_path) > 26214400:  # If file size exceeds 25MB
-            segments = AudioService.split_audio(file_path)
+    def speech_encode_command(file_path: str, encoded_file_path: str) -> List[str]:
+        # 16 kHz mono is what the speech models resample to anyway, Opus in voip mode is tuned for speech at low bitrates
+        return [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-i', file_path,
+            '-vn', '-map', '0:a:0', '-ac', '1', '-ar', '16000',
+            '-c:a', 'libopus', '-b:a', str(AudioService.speech_bit_rate()), '-application', 'voip',
+            '-f', 'ogg', encoded_file_path
+        ]
+
+    @staticmethod
+    @PipelineMetrics.timed("transcribe")
+    def transcribe_file(file_path: str, service: TranscriptionService, prompt: str, cache: Optional[TranscriptCache] = None,
+                        on_segment: Optional[Callable[[SegmentUpdate], None]] = None) -> str:
+        PipelineMetrics.record_file_bytes("transcribe", file_path)
+        if os.path.getsize(file_path) > AudioService.MAX_UPLOAD_BYTES:  # If file size exceeds 25MB
+            segment_length_ms = AudioService.segment_length_for(file_path, int(os.getenv("SEGMENT_LENGTH_MS", 600000)))
+            # Only plain text can be de-duplicated across an overlap, subtitle cues would be repeated
+            adjuster = AudioService.SUBTITLE_ADJUSTERS.get(service.file_name_extension())
+            overlap_ms = int(os.getenv("SEGMENT_OVERLAP_MS", 2000)) if adjuster is None else 0
+
+            if os.getenv("SEGMENT_SILENCE_AWARE", "true").lower() == "true":
+                parts = AudioService.split_audio_at_silence(file_path, segment_length_ms, overlap_ms)
+                segments = [part.path for part in parts]
+                ranges = [(part.start_ms, part.end_ms) for part in parts]
+            else:
+                segments = AudioService.split_audio(file_path, segment_length_ms)
+                ranges = AudioService.segment_ranges(segments) if adjuster is not None or on_segment is not None else None
+                overlap_ms = 0
+            offsets = [start_ms for start_ms, _ in ranges] if ranges is not None else None
+            PipelineMetrics.record_segments(len(segments))
+            progress = SegmentProgress(len(segments), overlap_ms > 0, on_segment, adjuster) if on_segment is not None else None
 
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                futures = {executor.submit(service.transcribe, segment, prompt): i for i, segment in enumerate(segments)}
+            with ThreadPoolExecutor(max_workers=int(os.getenv("SEGMENT_CONCURRENCY", 4))) as executor:
+                futures = {executor.submit(AudioService.transcribe_audio_segment, segment, service, prompt, cache): i for i, segment in enumerate(segments)}
                 transcriptions = [None] * len(segments)
 
+                failed_segments = []
                 for future in as_completed(futures):
                     index = futures[future]
                     try:
                         transcriptions[index] = future.result()
+                        if progress is not None:
+                            progress.complete(index, *ranges[index], transcriptions[index])
                     except Exception as e:
                         logging.error(f"Error transcribing segment {index}: {e}")
+                        failed_segments.append(index)
                     finally:
                         os.remove(segments[index])  # Clean up the segment file
 
-            return ' '.join(filter(None, transcriptions))
+            # A missing segment would silently drop part of the transcript, fail the job so it's retried instead
+            if failed_segments:
+                raise RuntimeError(f"Failed to transcribe segments {sorted(failed_segments)} of {file_path}")
+
+            return AudioService.combine_transcriptions(service, transcriptions, offsets, overlap_ms)
         else:
-            return service.transcribe(file_path, prompt)
+            PipelineMetrics.record_segments(1)
+            transcription = AudioService.transcribe_audio_segment(file_path, service, prompt)
+            if on_segment is not None:
+                SegmentProgress(1, publish=on_segment).complete(0, 0, MediaProbe.probe(file_path).duration_ms, transcription)
+            return transcription
+
+    @staticmethod
+    def combine_transcriptions(service: TranscriptionService, transcriptions: List[str], offsets: Optional[List[int]], overlap_ms: int) -> str:
+        adjuster = AudioService.SUBTITLE_ADJUSTERS.get(service.file_name_extension())
+        if adjuster is not None:
+            # Cues are shifted by the exact start of their segment, renumbered and rendered once
+            return adjuster.merge(list(zip(offsets, transcriptions)))
+        if overlap_ms > 0:
+            return TranscriptStitcher.stitch(transcriptions)
+        return ' '.join(filter(None, transcriptions))
+
+    @staticmethod
+    def segment_ranges(segments: List[str]) -> List[Tuple[int, int]]:
+        # Stream copied parts don't end exactly on the nominal length, their own durations give the real offsets
+        ranges = []
+        offset_ms = 0
+        for segment in segments:
+            end_ms = offset_ms + MediaProbe.probe(segment).duration_ms
+            ranges.append((offset_ms, end_ms))
+            offset_ms = end_ms
+        return ranges
 
     @staticmethod
-    def adjust_transcript_if_needed(transcription_file_path: str, service_type: TranscriptionServiceType) -> str:
-        if service_type == TranscriptionServiceType.OPENAI_SRT:
-            adjusted_srt_file_path = transcription_file_path.replace(".srt", "_adjusted.srt")
-            srt_adjuster = SrtAdjuster(transcription_file_path, adjusted_srt_file_path)
-            srt_adjuster.adjust_timings()
-            os.replace(adjusted_srt_file_path, transcription_file_path)  # Replace original with adjusted
-            logging.debug(f"Replaced original SRT file with adjusted SRT file: {transcription_file_path}")
-
-        elif service_type == TranscriptionServiceType.OPENAI_VTT:
-            adjusted_vtt_file_path = transcription_file_path.replace(".vtt", "_adjusted.vtt")
-            vtt_adjuster = VttAdjuster(transcription_file_path, adjusted_vtt_file_path)
-            vtt_adjuster.adjust_timings()
-            os.replace(adjusted_vtt_file_path, transcription_file_path)  # Replace original with adjusted
-            logging.debug(f"Replaced original VTT file with adjusted VTT file: {transcription_file_path}")
-
-        # Return the path to the adjusted transcript
-        with open(transcription_file_path, 'r', encoding='utf-8') as file:
-            return file.read(), transcription_file_path
+    def segment_length_for(file_path: str, segment_length_ms: int) -> int:
+        # High bitrate sources need shorter segments for every part to stay under the upload limit
+        media_info = MediaProbe.probe(file_path)
+        bit_rate = media_info.bit_rate
+        if not bit_rate and media_info.duration_seconds:
+            bit_rate = os.path.getsize(file_path) * 8 / media_info.duration_seconds
+        if not bit_rate:
+            return segment_length_ms
 
+        max_segment_ms = int(AudioService.MAX_UPLOAD_BYTES * 8 / bit_rate * 1000 * 0.9)  # headroom for container overhead
+        if max_segment_ms < segment_length_ms:
+            logging.info(f"Shortening segments to {max_segment_ms}ms for {bit_rate} bps audio")
+            return max_segment_ms
+        return segment_length_ms
+
+    @staticmethod
+    def transcribe_audio_segment(file_path: str, service: TranscriptionService, prompt: str, cache: Optional[TranscriptCache] = None) -> str:
+        if cache is None:
+            return service.transcribe_scheduled(file_path, prompt)
+
+        segment_key = AudioService.segment_cache_key(file_path, service, prompt)
+        transcription = cache.get(segment_key)
+        if transcription is None:
+            transcription = service.transcribe_scheduled(file_path, prompt)
+            cache.put(segment_key, transcription)
+        return transcription
+
+    @staticmethod
+    def segment_cache_key(file_path: str, service: TranscriptionService, prompt: Optional[str]) -> str:
+        # Segments are cut deterministically, so a retried job finds the segments that already succeeded
+        return TranscriptCache.build_key("segment", TranscriptCache.hash_file(file_path), service.provider_name(), service.file_name_extension(), prompt)
@@ -1,31 +1,75 @@
 import os
+import shutil
+import asyncio
 import logging
-from pydub import AudioSegment
+import subprocess
+from typing import List, Optional, Tuple
+from services.audio.media_probe import MediaProbe
+from services.audio.async_subprocess import AsyncSubprocess
 
 class FileHandler:
-    
+
+    @staticmethod
+    def handle_local_file(file_path: str, output_dir: str, max_length_minutes: Optional[int] = None) -> str:
+        audio_file_path, arguments = FileHandler.plan_conversion(file_path, output_dir, max_length_minutes)
+        if arguments is None:
+            shutil.copyfile(file_path, audio_file_path)
+        else:
+            FileHandler.run_ffmpeg(arguments)
+        return audio_file_path
+
+    @staticmethod
+    async def handle_local_file_async(file_path: str, output_dir: str, ffmpeg: Optional[asyncio.Semaphore] = None,
+                                      max_length_minutes: Optional[int] = None) -> str:
+        audio_file_path, arguments = await asyncio.to_thread(FileHandler.plan_conversion, file_path, output_dir, max_length_minutes)
+        if arguments is None:
+            await asyncio.to_thread(shutil.copyfile, file_path, audio_file_path)
+            return audio_file_path
+
+        try:
+            await AsyncSubprocess.run(FileHandler.ffmpeg_command(arguments), ffmpeg)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"ffmpeg conversion error: {e.stderr}")
+            raise
+        return audio_file_path
+
     @staticmethod
-    def handle_local_file(file_path: str, output_dir: str) -> str:
+    def plan_conversion(file_path: str, output_dir: str, max_length_minutes: Optional[int] = None) -> Tuple[str, Optional[List[str]]]:
+        # The output path and the ffmpeg arguments to produce it, no arguments means a plain copy is enough
         file_name = os.path.basename(file_path)
         base_name, ext = os.path.splitext(file_name)
         audio_file_path = os.path.join(output_dir, "audio", base_name + "_audio.m4a")
+        os.makedirs(os.path.dirname(audio_file_path), exist_ok=True)
 
-        # Check for video formats that need conversion to audio
-        if ext.lower() in [".mov", ".mp4", ".avi", ".mkv", ".webm"]:
-            logging.debug(f"Converting video file {file_name} to audio and saving to {audio_file_path}")
-            os.makedirs(os.path.dirname(audio_file_path), exist_ok=True)
-            audio = AudioSegment.from_file(file_path)
-            audio.export(audio_file_path, format="ipod", bitrate="128k", parameters=["-ar", "16000", "-ac", "1"])
-        elif ext.lower() not in [".m4a", ".mp3"]:
-            logging.debug(f"Converting unsupported audio file {file_name} to m4a...")
-            os.makedirs(os.path.dirname(audio_file_path), exist_ok=True)
-            audio = AudioSegment.from_file(file_path)
-            audio.export(audio_file_path, format="ipod", bitrate="128k", parameters=["-ar", "16000", "-ac", "1"])
-        else:
+        # Decide from the stream headers rather than the extension, a .mp4 with AAC audio only needs a remux
+        media_info = MediaProbe.probe(file_path)
+        # Files over the limit are cut while they're copied, remuxed or converted, never in a pass of their own
+        trim = ['-t', f'{max_length_minutes * 60}'] if max_length_minutes and media_info.duration_seconds > max_length_minutes * 60 else []
+        if media_info.audio_codec == "mp3" and not media_info.has_video:
+            mp3_file_path = os.path.join(output_dir, "audio", base_name + "_audio.mp3")
+            if trim:
+                logging.debug(f"Trimming {file_name} to {max_length_minutes} minutes with a stream copy")
+                return mp3_file_path, ['-i', file_path, *trim, '-map', '0:a:0', '-c', 'copy', '-f', 'mp3', mp3_file_path]
             logging.debug(f"No conversion needed for file {file_name}, copying to output directory...")
-            os.makedirs(os.path.dirname(audio_file_path), exist_ok=True)
-            with open(file_path, "rb") as src_file:
-                with open(audio_file_path, "wb") as dst_file:
-                    dst_file.write(src_file.read())
+            return mp3_file_path, None
+        elif media_info.audio_codec == "aac" and not media_info.has_video and ext.lower() == ".m4a" and not trim:
+            logging.debug(f"No conversion needed for file {file_name}, copying to output directory...")
+            return audio_file_path, None
+        elif media_info.audio_codec == "aac":
+            logging.debug(f"Remuxing AAC audio from {file_name} to {audio_file_path}")
+            return audio_file_path, ['-i', file_path, '-vn', *trim, '-map', '0:a:0', '-c:a', 'copy', '-f', 'ipod', audio_file_path]
+        else:
+            logging.debug(f"Converting {file_name} ({media_info.audio_codec}) to m4a and saving to {audio_file_path}")
+            return audio_file_path, ['-i', file_path, '-vn', *trim, '-map', '0:a:0', '-ar', '16000', '-ac', '1', '-b:a', '128k', '-f', 'ipod', audio_file_path]
 
-        return audio_file_path
+    @staticmethod
+    def ffmpeg_command(arguments: list) -> List[str]:
+        return ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', *arguments]
+
+    @staticmethod
+    def run_ffmpeg(arguments: list):
+        try:
+            subprocess.run(FileHandler.ffmpeg_command(arguments), check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"ffmpeg conversion error: {e.stderr}")
+            raise
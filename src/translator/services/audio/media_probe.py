@@ -0,0 +1,97 @@
+import re
+import json
+import shutil
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class MediaInfo:
+    duration_seconds: float
+    format_name: Optional[str] = None
+    bit_rate: Optional[int] = None
+    audio_codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    has_video: bool = False
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self.duration_seconds * 1000)
+
+class MediaProbe:
+    # Only container and stream headers are read, the media itself is never decoded
+
+    @staticmethod
+    def probe(file_path: str) -> MediaInfo:
+        if shutil.which('ffprobe'):
+            return MediaProbe.probe_with_ffprobe(file_path)
+        return MediaProbe.probe_with_ffmpeg(file_path)
+
+    @staticmethod
+    def probe_with_ffprobe(file_path: str) -> MediaInfo:
+        command = ['ffprobe', '-v', 'error', '-show_format', '-show_streams', '-of', 'json', file_path]
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        data = json.loads(result.stdout)
+
+        media_format = data.get('format', {})
+        streams = data.get('streams', [])
+        audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), {})
+        # cover art shows up as a video stream in audio files
+        has_video = any(stream.get('codec_type') == 'video' and not stream.get('disposition', {}).get('attached_pic') for stream in streams)
+
+        duration = media_format.get('duration') or audio.get('duration') or 0
+        bit_rate = media_format.get('bit_rate') or audio.get('bit_rate')
+        return MediaInfo(
+            duration_seconds=float(duration),
+            format_name=media_format.get('format_name'),
+            bit_rate=int(bit_rate) if bit_rate else None,
+            audio_codec=audio.get('codec_name'),
+            sample_rate=int(audio['sample_rate']) if audio.get('sample_rate') else None,
+            channels=audio.get('channels'),
+            has_video=has_video
+        )
+
+    @staticmethod
+    def probe_with_ffmpeg(file_path: str) -> MediaInfo:
+        # Without ffprobe the same header summary is printed by ffmpeg when it's given no output
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-i', file_path], capture_output=True, text=True)
+        header = result.stderr
+        if 'Duration:' not in header:
+            raise RuntimeError(f"Failed to probe media file {file_path}: {header.strip()}")
+
+        info = MediaInfo(duration_seconds=0)
+        format_match = re.search(r"Input #0, ([^,]+(?:,[^,\s]+)*), from", header)
+        if format_match:
+            info.format_name = format_match.group(1)
+
+        duration_match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", header)
+        if duration_match:
+            hours, minutes, seconds = duration_match.groups()
+            info.duration_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+        bit_rate_match = re.search(r"bitrate: (\d+) kb/s", header)
+        if bit_rate_match:
+            info.bit_rate = int(bit_rate_match.group(1)) * 1000
+
+        audio_match = re.search(r"Stream #\S+.*?: Audio: (\w+)[^,\n]*(?:, (\d+) Hz)?(?:, ([^,\n]+))?", header)
+        if audio_match:
+            info.audio_codec = audio_match.group(1)
+            info.sample_rate = int(audio_match.group(2)) if audio_match.group(2) else None
+            info.channels = MediaProbe._channel_count(audio_match.group(3))
+
+        info.has_video = any('(attached pic)' not in line for line in re.findall(r"Stream #\S+.*?: Video: .*", header))
+        logging.debug(f"Probed {file_path} from ffmpeg header: {info}")
+        return info
+
+    @staticmethod
+    def _channel_count(layout: Optional[str]) -> Optional[int]:
+        if not layout:
+            return None
+        layout = layout.strip()
+        named = {'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '5.0': 5, '5.1': 6, '7.1': 8}
+        if layout in named:
+            return named[layout]
+        channels_match = re.match(r"(\d+) channels", layout)
+        return int(channels_match.group(1)) if channels_match else None
@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import uuid
+import asyncio
+import logging
+import subprocess
+from contextlib import nullcontext
+from typing import List, Optional, Tuple
+from services.audio.async_subprocess import AsyncSubprocess
+from services.audio.ytdlp_engine import YtDlpEngine
+from enums.job_status import JobStatus
+from messages.batch_message import BatchMessage, ChildJob
+from messages.transcription_message import TranscriptionMessage
+
+class PlaylistExpander:
+    # Playlists and channels are listed from their index pages without resolving a single video,
+    # every entry becomes a job of its own on the job queue
+    COLLECTION_PATTERNS = [
+        r'^https://(www\.|m\.)?youtube\.com/playlist\?(.*&)?list=',
+        r'^https://(www\.|m\.)?youtube\.com/(channel/|c/|user/|@)[^/?#]+',
+        r'^https://(www\.)?vimeo\.com/(showcase|album)/\d+/?(\?.*)?$',
+        r'^https://(www\.)?vimeo\.com/channels/[^/?#]+/?(\?.*)?$',
+    ]
+    YOUTUBE_CHANNEL = r'^(https://(www\.|m\.)?youtube\.com/(channel/|c/|user/|@)[^/?#]+)/?(\?.*)?$'
+
+    @staticmethod
+    def is_collection(url: str) -> bool:
+        return any(re.match(pattern, url) for pattern in PlaylistExpander.COLLECTION_PATTERNS)
+
+    @staticmethod
+    def listing_url(url: str) -> str:
+        # A channel's home page lists its tabs rather than its videos, the back catalog is the videos tab
+        match = re.match(PlaylistExpander.YOUTUBE_CHANNEL, url)
+        return f"{match.group(1)}/videos" if match else url
+
+    @staticmethod
+    def max_entries() -> int:
+        return int(os.getenv("PLAYLIST_MAX_ENTRIES", 500))
+
+    @staticmethod
+    def expand(url: str) -> Tuple[str, List[dict]]:
+        listing_url = PlaylistExpander.listing_url(url)
+        if YtDlpEngine.is_enabled():
+            info = YtDlpEngine.executor().submit(YtDlpEngine.extract, listing_url, "flat", PlaylistExpander.max_entries()).result()
+        else:
+            result = subprocess.run(PlaylistExpander._flat_command(listing_url), check=True, capture_output=True, text=True)
+            info = json.loads(result.stdout)
+        return PlaylistExpander._parse(info, url)
+
+    @staticmethod
+    async def expand_async(url: str, downloads: Optional[asyncio.Semaphore] = None) -> Tuple[str, List[dict]]:
+        listing_url = PlaylistExpander.listing_url(url)
+        if YtDlpEngine.is_enabled():
+            async with downloads or nullcontext():
+                info = await asyncio.wrap_future(YtDlpEngine.executor().submit(YtDlpEngine.extract, listing_url, "flat", PlaylistExpander.max_entries()))
+        else:
+            result = await AsyncSubprocess.run(PlaylistExpander._flat_command(listing_url), downloads)
+            info = json.loads(result.stdout)
+        return PlaylistExpander._parse(info, url)
+
+    @staticmethod
+    def _flat_command(url: str) -> List[str]:
+        return ['yt-dlp', '--flat-playlist', '--dump-single-json', '--playlist-end', str(PlaylistExpander.max_entries()), url]
+
+    @staticmethod
+    def _parse(info: dict, url: str) -> Tuple[str, List[dict]]:
+        entries = []
+        seen = set()
+        for entry in PlaylistExpander._flatten(info.get("entries") or []):
+            video_id = entry.get("id")
+            video_url = entry.get("url") or entry.get("webpage_url")
+            if not video_id or not video_url or not video_url.startswith("https://"):
+                logging.warning(f"Skipping playlist entry without a video url: {entry.get('title') or video_id}")
+                continue
+            if PlaylistExpander.is_collection(video_url):
+                logging.warning(f"Skipping nested playlist {video_url} in {url}")
+                continue
+            # The same video can show up twice in one playlist
+            if video_id in seen:
+                continue
+            seen.add(video_id)
+            entries.append({
+                "id": video_id,
+                "title": entry.get("title") or video_id,
+                "url": video_url,
+                "duration": int(entry.get("duration") or 0),
+            })
+        return info.get("title") or url, entries[:PlaylistExpander.max_entries()]
+
+    @staticmethod
+    def _flatten(entries: list) -> list:
+        # Playlists of playlists (seasons, sections) arrive inline with entries of their own
+        flattened = []
+        for entry in entries:
+            if not entry:
+                continue  # unavailable videos are listed as None
+            if entry.get("_type") == "playlist":
+                flattened.extend(PlaylistExpander._flatten(entry.get("entries") or []))
+            else:
+                flattened.append(entry)
+        return flattened
+
+    @staticmethod
+    def child_job_id(parent_job_id: str, video_id: str) -> str:
+        # A redelivered parent produces the same child ids, the API creates and queues them only once
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{parent_job_id}/{video_id}"))
+
+    @staticmethod
+    def batch(message: TranscriptionMessage, title: str, entries: List[dict]) -> BatchMessage:
+        # The API dedupes against the user's earlier jobs and queues the rest, the translator only lists the videos
+        children = [
+            ChildJob(
+                jobId=PlaylistExpander.child_job_id(message.jobId, entry["id"]),
+                videoId=entry["id"],
+                title=entry["title"],
+                url=entry["url"],
+                duration=entry["duration"]
+            )
+            for entry in entries
+        ]
+        return BatchMessage(
+            jobId=message.jobId,
+            title=title,
+            status=JobStatus.EXPANDED.value,
+            childCount=len(children),
+            children=children,
+            userId=message.userId,
+            transcriptionType=message.transcriptionType.value,
+            transform=message.transform.value,
+            transforms=[transform.value for transform in message.transforms] if message.transforms else None
+        )
@@ -0,0 +1,62 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Type
+from services.audio.transcript_stitcher import TranscriptStitcher
+from services.audio.subtitle_adjuster import SubtitleAdjuster
+
+@dataclass
+class SegmentUpdate:
+    index: int
+    count: int
+    start_ms: int
+    end_ms: int
+    text: str
+    final: bool
+
+class SegmentProgress:
+    # Segments finish in any order, updates are released strictly in segment order
+
+    def __init__(self, segment_count: int, overlapping: bool = False, publish: Optional[Callable[[SegmentUpdate], None]] = None,
+                 adjuster: Optional[Type[SubtitleAdjuster]] = None):
+        self.segment_count = segment_count
+        self.overlapping = overlapping
+        self.publish = publish
+        self.adjuster = adjuster
+        self.cue_count = 0
+        self.completed = {}
+        self.next_index = 0
+        self.previous_words = None
+        self.lock = threading.Lock()
+
+    def complete(self, index: int, start_ms: int, end_ms: int, text: str) -> List[SegmentUpdate]:
+        with self.lock:
+            self.completed[index] = (start_ms, end_ms, text or "")
+            ready = []
+            while self.next_index in self.completed:
+                start_ms, end_ms, text = self.completed.pop(self.next_index)
+                ready.append(self.update_for(self.next_index, start_ms, end_ms, text))
+                self.next_index += 1
+
+            # Published while still holding the lock so two threads can't reorder their updates
+            if self.publish is not None:
+                for update in ready:
+                    self.publish(update)
+            return ready
+
+    def update_for(self, index: int, start_ms: int, end_ms: int, text: str) -> SegmentUpdate:
+        if self.adjuster is not None:
+            # Cues are timed from the start of their segment, updates carry them on the job's timeline
+            # and numbered on from the last update, so the updates concatenate into one subtitle file
+            cues = self.adjuster.shift(self.adjuster.parse(text), start_ms)
+            text = self.adjuster.render(cues, self.cue_count + 1, header=index == 0) if cues or index == 0 else ""
+            if cues and self.cue_count:
+                text = "\n" + text  # the blank line between this update's cues and the last one's
+            self.cue_count += len(cues)
+            return SegmentUpdate(index, self.segment_count, start_ms, end_ms, text, index == self.segment_count - 1)
+
+        words = text.split()
+        if self.overlapping and self.previous_words is not None:
+            # The start of this segment repeats the end of the last one, only the new words are sent
+            text = ' '.join(TranscriptStitcher.new_words(self.previous_words, words))
+        self.previous_words = words
+        return SegmentUpdate(index, self.segment_count, start_ms, end_ms, text, index == self.segment_count - 1)
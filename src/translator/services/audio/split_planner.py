@@ -0,0 +1,88 @@
+import logging
+import subprocess
+from typing import List, Tuple
+import numpy as np
+
+class SplitPlanner:
+    SAMPLE_RATE = 8000  # energy analysis doesn't need more than telephone bandwidth
+    FRAME_MS = 50
+    SMOOTHING_MS = 500  # a cut should land in a sustained pause, not a single quiet frame
+    READ_CHUNK_FRAMES = 1200  # one minute of PCM per read from ffmpeg
+
+    @staticmethod
+    def plan(file_path: str, segment_length_ms: int = 600000, search_window_ms: int = 30000, overlap_ms: int = 0) -> List[Tuple[int, int]]:
+        envelope = SplitPlanner.compute_rms_envelope(file_path)
+        return SplitPlanner.plan_from_envelope(envelope, SplitPlanner.FRAME_MS, segment_length_ms, search_window_ms, overlap_ms)
+
+    @staticmethod
+    def compute_rms_envelope(file_path: str) -> np.ndarray:
+        frame_samples = SplitPlanner.SAMPLE_RATE * SplitPlanner.FRAME_MS // 1000
+        frame_bytes = frame_samples * 2  # s16le
+        command = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', file_path,
+            '-vn', '-ac', '1', '-ar', str(SplitPlanner.SAMPLE_RATE),
+            '-f', 's16le', '-'
+        ]
+
+        # PCM is streamed from ffmpeg and reduced to one RMS value per frame, only the envelope is kept in memory
+        frames = []
+        remainder = b''
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+            while True:
+                chunk = process.stdout.read(frame_bytes * SplitPlanner.READ_CHUNK_FRAMES)
+                if not chunk:
+                    break
+                data = remainder + chunk
+                usable = len(data) - len(data) % frame_bytes
+                remainder = data[usable:]
+                if usable:
+                    samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32).reshape(-1, frame_samples)
+                    frames.append(np.sqrt(np.mean(samples * samples, axis=1)))
+            stderr = process.stderr.read()
+
+        if process.returncode != 0:
+            raise RuntimeError(f"Failed to analyze audio energy for {file_path}: {stderr.decode(errors='ignore')}")
+
+        if remainder:
+            samples = np.frombuffer(remainder[:len(remainder) - len(remainder) % 2], dtype='<i2').astype(np.float32)
+            if len(samples):
+                frames.append(np.array([np.sqrt(np.mean(samples * samples))], dtype=np.float32))
+
+        if not frames:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(frames)
+
+    @staticmethod
+    def plan_from_envelope(envelope: np.ndarray, frame_ms: int, segment_length_ms: int, search_window_ms: int, overlap_ms: int = 0) -> List[Tuple[int, int]]:
+        duration_ms = len(envelope) * frame_ms
+        if duration_ms <= segment_length_ms:
+            return [(0, duration_ms)]
+
+        smoothing_frames = max(1, SplitPlanner.SMOOTHING_MS // frame_ms)
+        smoothed = np.convolve(envelope, np.ones(smoothing_frames) / smoothing_frames, mode='same')
+        window_frames = search_window_ms // frame_ms
+
+        cuts = [0]
+        while duration_ms - cuts[-1] > segment_length_ms:
+            target = (cuts[-1] + segment_length_ms) // frame_ms
+            # Never search back past the middle of the current segment so segments can't collapse
+            low = max(target - window_frames, (cuts[-1] + segment_length_ms // 2) // frame_ms)
+            # Leave at least a search window of audio after the cut so the last segment isn't a sliver
+            high = min(target + window_frames, len(smoothed) - 1 - window_frames)
+            if high <= low:
+                cut_frame = target
+            else:
+                window = smoothed[low:high + 1]
+                # Among equally quiet frames prefer the one closest to the nominal boundary
+                quiet_frames = np.flatnonzero(window <= window.min() + 1e-6) + low
+                cut_frame = int(quiet_frames[np.argmin(np.abs(quiet_frames - target))])
+            cuts.append(cut_frame * frame_ms)
+            logging.debug(f"Planned split at {cuts[-1]}ms (nominal {target * frame_ms}ms)")
+        cuts.append(duration_ms)
+
+        ranges = []
+        for i in range(len(cuts) - 1):
+            start = cuts[i] if i == 0 else max(0, cuts[i] - overlap_ms)
+            ranges.append((start, cuts[i + 1]))
+        return ranges
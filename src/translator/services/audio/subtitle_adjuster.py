@@ -0,0 +1,80 @@
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+from services.metrics.pipeline_metrics import PipelineMetrics
+
+@dataclass
+class SubtitleCue:
+    start_ms: int
+    end_ms: int
+    text: str
+    settings: str = ""
+
+class SubtitleAdjuster:
+    # Segments are transcribed separately, every cue is shifted by the known start of its segment
+    HEADER = ""
+    MILLISECOND_SEPARATOR = ","
+    NUMBERED = True
+
+    TIME_PATTERN = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})")
+    TIMING_PATTERN = re.compile(r"^\s*(\S+)\s+-->\s+(\S+)(.*)$")
+
+    @classmethod
+    def merge(cls, segments: List[Tuple[int, str]]) -> str:
+        with PipelineMetrics.track_stage("adjust"):
+            cues = []
+            for offset_ms, text in segments:
+                cues.extend(cls.shift(cls.parse(text or ""), offset_ms))
+            return cls.render(cues)
+
+    @classmethod
+    def parse(cls, text: str) -> List[SubtitleCue]:
+        cues = []
+        for block in re.split(r"\n\s*\n", text.replace("\r\n", "\n").strip()):
+            lines = block.split("\n")
+            timing_index = next((i for i, line in enumerate(lines) if "-->" in line), None)
+            if timing_index is None:
+                continue  # header, NOTE and STYLE blocks carry no timings
+
+            match = cls.TIMING_PATTERN.match(lines[timing_index])
+            if not match:
+                continue
+            start, end, settings = match.groups()
+            cues.append(SubtitleCue(
+                start_ms=cls.parse_time(start),
+                end_ms=cls.parse_time(end),
+                text="\n".join(lines[timing_index + 1:]).strip(),
+                settings=settings.strip()
+            ))
+        return cues
+
+    @staticmethod
+    def shift(cues: List[SubtitleCue], offset_ms: int) -> List[SubtitleCue]:
+        return [SubtitleCue(cue.start_ms + offset_ms, cue.end_ms + offset_ms, cue.text, cue.settings) for cue in cues]
+
+    @classmethod
+    def render(cls, cues: List[SubtitleCue], first_number: int = 1, header: bool = True) -> str:
+        blocks = [cls.HEADER] if cls.HEADER and header else []
+        for number, cue in enumerate(cues, start=first_number):
+            timing = f"{cls.format_time(cue.start_ms)} --> {cls.format_time(cue.end_ms)}"
+            if cue.settings:
+                timing += f" {cue.settings}"
+            lines = [str(number)] if cls.NUMBERED else []
+            lines += [timing, cue.text]
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks) + "\n"
+
+    @classmethod
+    def parse_time(cls, value: str) -> int:
+        match = cls.TIME_PATTERN.fullmatch(value)
+        if not match:
+            raise ValueError(f"Invalid subtitle timestamp: {value}")
+        hours, minutes, seconds, milliseconds = match.groups()
+        return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(milliseconds)
+
+    @classmethod
+    def format_time(cls, total_ms: int) -> str:
+        seconds, milliseconds = divmod(max(0, total_ms), 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:02}:{minutes:02}:{seconds:02}{cls.MILLISECOND_SEPARATOR}{milliseconds:03}"
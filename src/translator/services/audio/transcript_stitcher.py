@@ -0,0 +1,51 @@
+import re
+import logging
+from difflib import SequenceMatcher
+from typing import List, Optional
+
+class TranscriptStitcher:
+
+    @staticmethod
+    def stitch(transcriptions: List[Optional[str]], max_overlap_words: int = 25, min_match_words: int = 3) -> str:
+        stitched = []
+        for transcription in transcriptions:
+            if not transcription:
+                continue
+            words = transcription.split()
+            if not stitched:
+                stitched = words
+                continue
+            stitched = TranscriptStitcher.merge(stitched, words, max_overlap_words, min_match_words)
+
+        return ' '.join(stitched)
+
+    @staticmethod
+    def new_words(previous: List[str], following: List[str], max_overlap_words: int = 25, min_match_words: int = 3) -> List[str]:
+        # The part of the following segment that isn't a repeat of the overlap, for text that's already been sent on
+        match = TranscriptStitcher._overlap(previous, following, max_overlap_words)
+        if match.size < min_match_words:
+            return following
+        return following[match.b + match.size:]
+
+    @staticmethod
+    def merge(previous: List[str], following: List[str], max_overlap_words: int = 25, min_match_words: int = 3) -> List[str]:
+        tail_offset = max(0, len(previous) - max_overlap_words)
+        match = TranscriptStitcher._overlap(previous, following, max_overlap_words)
+        if match.size < min_match_words:
+            return previous + following
+
+        logging.debug(f"Stitched segments on {match.size} overlapping words")
+        return previous[:tail_offset + match.a + match.size] + following[match.b + match.size:]
+
+    @staticmethod
+    def _overlap(previous: List[str], following: List[str], max_overlap_words: int):
+        tail = previous[-max_overlap_words:]
+        head = following[:max_overlap_words]
+
+        # Words on either edge of the overlap may be cut mid-word, so look for the longest run both sides agree on
+        matcher = SequenceMatcher(None, TranscriptStitcher._normalize(tail), TranscriptStitcher._normalize(head), autojunk=False)
+        return matcher.find_longest_match(0, len(tail), 0, len(head))
+
+    @staticmethod
+    def _normalize(words: List[str]) -> List[str]:
+        return [re.sub(r"[^\w']", '', word.lower()) for word in words]
@@ -1,53 +1,6 @@
-import re
-from datetime import timedelta
+from services.audio.subtitle_adjuster import SubtitleAdjuster
 
-class VttAdjuster:
-    
-    def __init__(self, vtt_file, output_file):
-        self.vtt_file = vtt_file
-        self.output_file = output_file
-
-    # Function to parse VTT time format
-    def parse_vtt_time(self, vtt_time):
-        hours, minutes, seconds = map(float, vtt_time.replace(',', '.').split(':'))
-        return timedelta(hours=int(hours), minutes=int(minutes), seconds=seconds)
-
-    # Function to format time back to VTT format
-    def format_vtt_time(self, td):
-        total_seconds = int(td.total_seconds())
-        hours, remainder = divmod(total_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        milliseconds = td.microseconds // 1000
-        return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}"
-
-    # Adjust timings in VTT file
-    def adjust_timings(self):
-        with open(self.vtt_file, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        adjusted_lines = []
-        last_end_time = timedelta(0)
-        last_segment_end_time = timedelta(0)
-        time_pattern = re.compile(r"(\d{2}:\d{2}:\d{2}\.\d{3}) --> (\d{2}:\d{2}:\d{2}\.\d{3})")
-
-        for line in lines:
-            match = time_pattern.match(line)
-            if match:
-                start_time, end_time = match.groups()
-                start_time_td = self.parse_vtt_time(start_time)
-                end_time_td = self.parse_vtt_time(end_time)
-
-                if start_time_td < last_end_time:
-                    last_segment_end_time += last_end_time
-                
-                last_end_time = end_time_td
-                start_time_td += last_segment_end_time
-                end_time_td += last_segment_end_time
-
-                adjusted_line = f"{self.format_vtt_time(start_time_td)} --> {self.format_vtt_time(end_time_td)}\n"
-                adjusted_lines.append(adjusted_line)
-            else:
-                adjusted_lines.append(line)
-
-        with open(self.output_file, 'w', encoding='utf-8') as file:
-            file.writelines(adjusted_lines)
+class VttAdjuster(SubtitleAdjuster):
+    HEADER = "WEBVTT"
+    MILLISECOND_SEPARATOR = "."
+    NUMBERED = False
@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import yt_dlp
+from services.metrics.pipeline_metrics import PipelineMetrics
+
+class YtDlpEngine:
+    # yt-dlp embedded in the worker: extractors are imported once and each YoutubeDL keeps its extractor
+    # instances and HTTP sessions between jobs. An instance isn't thread safe, so every download checks
+    # one out of the idle pool for its profile and hands it back afterwards
+    PROFILES = {
+        # same as the subprocess commands, bestaudio extracted to m4a with 4 fragment connections
+        "audio": {
+            "format": "bestaudio",
+            "concurrent_fragment_downloads": 4,
+            "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "m4a"}],
+        },
+        # audio-only when the site offers it, a single muxed file otherwise, ffmpeg extracts the audio afterwards
+        "media": {
+            "format": "bestaudio/best",
+        },
+        # playlists and channels listed from their index pages, no video page is resolved
+        "flat": {
+            "extract_flat": "in_playlist",
+            "noplaylist": False,
+        },
+    }
+
+    _idle: Dict[str, List[yt_dlp.YoutubeDL]] = {}
+    _lock = threading.Lock()
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return os.getenv("YTDLP_ENGINE", "embedded").lower() == "embedded"
+
+    @staticmethod
+    def executor() -> ThreadPoolExecutor:
+        # Bounds the downloads in flight across every job on this worker
+        with YtDlpEngine._lock:
+            if YtDlpEngine._executor is None:
+                YtDlpEngine._executor = ThreadPoolExecutor(max_workers=int(os.getenv("YTDLP_CONCURRENCY", 4)), thread_name_prefix="yt-dlp")
+            return YtDlpEngine._executor
+
+    @staticmethod
+    def submit(url: str, output_dir: str, profile: str = "audio", on_progress: Optional[Callable[[dict], None]] = None,
+               max_seconds: Optional[int] = None) -> "Future[Tuple[dict, Optional[str]]]":
+        return YtDlpEngine.executor().submit(YtDlpEngine.download, url, output_dir, profile, on_progress, max_seconds)
+
+    @staticmethod
+    def download(url: str, output_dir: str, profile: str = "audio", on_progress: Optional[Callable[[dict], None]] = None,
+                 max_seconds: Optional[int] = None) -> Tuple[dict, Optional[str]]:
+        # The info dict and the final path after post-processing, straight from yt-dlp rather than its console output
+        os.makedirs(output_dir, exist_ok=True)
+        ydl = YtDlpEngine.acquire(profile)
+        healthy = False
+        try:
+            ydl.params["outtmpl"] = {"default": os.path.join(output_dir, "%(title)s.%(ext)s")}
+            # Set on every checkout, a pooled instance must not keep the previous job's section
+            if max_seconds:
+                ydl.params["download_ranges"] = yt_dlp.utils.download_range_func(None, [(0, max_seconds)])
+            else:
+                ydl.params.pop("download_ranges", None)
+            ydl.progress_callback = on_progress or ProgressLogger(url)
+            info = ydl.extract_info(url, download=True)
+            healthy = True
+        finally:
+            ydl.progress_callback = None
+            # An instance that raised midway may hold half-open state, it's closed instead of reused
+            YtDlpEngine.release(profile, ydl, healthy)
+
+        downloads = info.get("requested_downloads") or []
+        file_path = downloads[-1].get("filepath") if downloads else None
+        video_info = {key: info.get(key) for key in ("id", "title", "duration", "webpage_url")}
+        video_info["url"] = url
+        return video_info, file_path
+
+    @staticmethod
+    def extract(url: str, profile: str = "flat", max_entries: Optional[int] = None) -> dict:
+        ydl = YtDlpEngine.acquire(profile)
+        healthy = False
+        try:
+            if max_entries:
+                ydl.params["playlistend"] = max_entries
+            else:
+                ydl.params.pop("playlistend", None)
+            info = ydl.extract_info(url, download=False)
+            healthy = True
+        finally:
+            YtDlpEngine.release(profile, ydl, healthy)
+        return info
+
+    @staticmethod
+    def acquire(profile: str) -> yt_dlp.YoutubeDL:
+        with YtDlpEngine._lock:
+            idle = YtDlpEngine._idle.setdefault(profile, [])
+            if idle:
+                return idle.pop()
+        return YtDlpEngine.create(profile)
+
+    @staticmethod
+    def release(profile: str, ydl: yt_dlp.YoutubeDL, healthy: bool = True):
+        if healthy:
+            with YtDlpEngine._lock:
+                YtDlpEngine._idle.setdefault(profile, []).append(ydl)
+                return
+        ydl.close()
+
+    @staticmethod
+    def create(profile: str) -> yt_dlp.YoutubeDL:
+        params = {
+            "quiet": True,
+            "no_warnings": True,
+            "noprogress": True,
+            "noplaylist": True,
+            "logger": logging.getLogger("yt-dlp"),
+            **YtDlpEngine.PROFILES[profile],
+        }
+        ydl = yt_dlp.YoutubeDL(params)
+        ydl.progress_callback = None
+        # One hook for the instance's lifetime, it forwards to whichever job holds the instance
+        ydl.add_progress_hook(lambda status: ydl.progress_callback and ydl.progress_callback(status))
+        return ydl
+
+    @staticmethod
+    def close():
+        with YtDlpEngine._lock:
+            idle = [ydl for instances in YtDlpEngine._idle.values() for ydl in instances]
+            YtDlpEngine._idle.clear()
+            executor, YtDlpEngine._executor = YtDlpEngine._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for ydl in idle:
+            ydl.close()
+
+class ProgressLogger:
+    # Default progress hook, a line per quarter of the download and the bytes once it's finished
+    def __init__(self, url: str):
+        self.url = url
+        self.logged_quarter = -1
+        self.started = time.monotonic()
+
+    def __call__(self, status: dict):
+        if status.get("status") == "finished":
+            size = status.get("total_bytes") or status.get("downloaded_bytes") or 0
+            PipelineMetrics.record_bytes("download", size)
+            logging.info(f"Downloaded {size} bytes from {self.url} in {time.monotonic() - self.started:.1f}s")
+            return
+
+        total = status.get("total_bytes") or status.get("total_bytes_estimate")
+        if status.get("status") != "downloading" or not total:
+            return
+        quarter = int(status.get("downloaded_bytes", 0) * 4 / total)
+        if quarter > self.logged_quarter:
+            self.logged_quarter = quarter
+            logging.info(f"Downloading {self.url}: {min(quarter * 25, 100)}% of {int(total)} bytes")
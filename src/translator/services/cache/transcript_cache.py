@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional, Tuple
+
+class TranscriptCache:
+
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_last_access ON transcripts (last_access)")
+        self.connection.commit()
+
+    @staticmethod
+    def from_env(path: str) -> Optional["TranscriptCache"]:
+        max_mb = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", 512))
+        if max_mb <= 0:
+            return None  # caching disabled
+
+        db_path = os.getenv("TRANSCRIPT_CACHE_PATH") or os.path.join(path, "cache", "transcripts.db")
+        try:
+            return TranscriptCache(db_path, max_mb * 1024 * 1024)
+        except sqlite3.Error as e:
+            logging.error(f"Transcript cache unavailable at {db_path}: {e}")
+            return None
+
+    @staticmethod
+    def build_key(*parts) -> str:
+        return hashlib.sha256("\x1f".join("" if part is None else str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def audio_key(file_path: str, service_name: str, prompt: Optional[str]) -> str:
+        return TranscriptCache.build_key(TranscriptCache.hash_file(file_path), service_name, prompt)
+
+    @staticmethod
+    def source_key(url: str, service_name: str, prompt: Optional[str], max_length_minutes: Optional[int]) -> Optional[str]:
+        # Only remote sources are stable enough to key on, uploaded blobs are new files every time
+        if not url.startswith("https://"):
+            return None
+        return TranscriptCache.build_key("source", url, service_name, prompt, max_length_minutes)
+
+    def get_source(self, source_key: str) -> Optional[Tuple[dict, str]]:
+        # A source entry points at the audio's transcript, so the download can be skipped altogether
+        cached = self.get(source_key)
+        if cached is None:
+            return None
+
+        source = json.loads(cached)
+        transcript = self.get(source["audio_key"])
+        if transcript is None:
+            return None
+        return source["video_info"], transcript
+
+    def put_source(self, source_key: str, video_info: dict, audio_key: str):
+        self.put(source_key, json.dumps({
+            "audio_key": audio_key,
+            "video_info": {"title": video_info.get("title", "Unknown Title"), "duration": video_info.get("duration", 0)}
+        }))
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with self.lock:
+                row = self.connection.execute("SELECT value FROM transcripts WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                self.connection.execute("UPDATE transcripts SET last_access = ? WHERE key = ?", (time.time(), key))
+                self.connection.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            logging.error(f"Transcript cache read failed: {e}")
+            return None
+
+    def put(self, key: str, value: str):
+        if not value:
+            return  # never cache a failed (empty) transcription
+
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        try:
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time())
+                )
+                self.evict()
+                self.connection.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Transcript cache write failed: {e}")
+
+    def evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until we're back under the size limit
+        rows = self.connection.execute("SELECT key, size FROM transcripts ORDER BY last_access ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM transcripts WHERE key = ?", evicted)
+        logging.debug(f"Evicted {len(evicted)} transcripts from cache")
@@ -0,0 +1,86 @@
+import os
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, start_http_server
+
+# Stages run from seconds (probing, transforms) to the better part of an hour (long downloads and transcriptions)
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 2400, 3600)
+
+STAGE_DURATION = Histogram('scribe_stage_duration_seconds', 'Time spent in each pipeline stage', ['stage'], buckets=DURATION_BUCKETS)
+STAGE_ERRORS = Counter('scribe_stage_errors_total', 'Pipeline stage failures', ['stage'])
+STAGE_BYTES = Counter('scribe_stage_bytes_total', 'Bytes produced or consumed by each pipeline stage', ['stage'])
+SEGMENTS_PER_JOB = Histogram('scribe_segments_per_job', 'Audio segments a job was split into', buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+PROVIDER_LATENCY = Histogram('scribe_provider_request_duration_seconds', 'Transcription provider request latency', ['provider', 'outcome'], buckets=DURATION_BUCKETS)
+PROVIDER_ERRORS = Counter('scribe_provider_errors_total', 'Transcription provider request failures', ['provider', 'retryable'])
+HEDGES = Counter('scribe_hedged_requests_total', 'Segment requests hedged or failed over to the secondary provider', ['outcome'])
+JOBS = Counter('scribe_jobs_total', 'Jobs processed by final status', ['status'])
+
+class PipelineMetrics:
+
+    @staticmethod
+    def start_server():
+        port = int(os.getenv("METRICS_PORT", 9100))
+        if port <= 0:
+            return
+        try:
+            start_http_server(port)
+            logging.info(f"Serving Prometheus metrics on port {port}")
+        except OSError as e:
+            logging.error(f"Failed to start metrics server on port {port}: {e}")
+
+    @staticmethod
+    @contextmanager
+    def track_stage(stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(stage=stage).inc()
+            raise
+        finally:
+            STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def timed(stage: str):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with PipelineMetrics.track_stage(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def record_error(stage: str):
+        STAGE_ERRORS.labels(stage=stage).inc()
+
+    @staticmethod
+    def record_bytes(stage: str, size: int):
+        STAGE_BYTES.labels(stage=stage).inc(size)
+
+    @staticmethod
+    def record_file_bytes(stage: str, file_path: str):
+        if file_path and os.path.exists(file_path):
+            STAGE_BYTES.labels(stage=stage).inc(os.path.getsize(file_path))
+
+    @staticmethod
+    def record_segments(count: int):
+        SEGMENTS_PER_JOB.observe(count)
+
+    @staticmethod
+    def record_provider_request(provider: str, seconds: float, outcome: str):
+        PROVIDER_LATENCY.labels(provider=provider, outcome=outcome).observe(seconds)
+
+    @staticmethod
+    def record_provider_error(provider: str, retryable: bool):
+        PROVIDER_ERRORS.labels(provider=provider, retryable=str(retryable).lower()).inc()
+
+    @staticmethod
+    def record_hedge(outcome: str):
+        HEDGES.labels(outcome=outcome).inc()
+
+    @staticmethod
+    def record_job(status: str):
+        JOBS.labels(status=status).inc()
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import base64
+import logging
+from typing import BinaryIO, Iterable, Optional
+
+class Base64EnvelopeDecoder:
+    # Streams a {"fileName": "...", "content": "<base64>"} envelope, decoding content straight to the output file
+    EXPECT_KEY, IN_KEY, EXPECT_COLON, EXPECT_VALUE, IN_STRING, IN_CONTENT, IN_OTHER, DONE = range(8)
+    _content_delimiters = re.compile(rb'["\\]')
+    _whitespace = b' \t\r\n'
+
+    def __init__(self, output: BinaryIO, content_field: str = "content"):
+        self.output = output
+        self.content_field = content_field
+        self.fields = {}
+        self.bytes_written = 0
+        self.state = Base64EnvelopeDecoder.EXPECT_KEY
+        self.started = False
+        self.token = bytearray()
+        self.key = None
+        self.escaped = False
+        self.depth = 0
+        self.in_nested_string = False
+        self.pending_base64 = b''
+
+    def feed(self, chunk: bytes):
+        pos = 0
+        length = len(chunk)
+        while pos < length and self.state != Base64EnvelopeDecoder.DONE:
+            if self.state == Base64EnvelopeDecoder.IN_CONTENT:
+                pos = self._feed_content(chunk, pos)
+                continue
+
+            byte = chunk[pos:pos + 1]
+            pos += 1
+            if self.state == Base64EnvelopeDecoder.EXPECT_KEY:
+                if byte in self._whitespace or byte == b',':
+                    continue
+                if byte == b'{' and not self.started:
+                    self.started = True
+                elif byte == b'}':
+                    self.state = Base64EnvelopeDecoder.DONE
+                elif byte == b'"' and self.started:
+                    self.token.clear()
+                    self.state = Base64EnvelopeDecoder.IN_KEY
+                else:
+                    raise ValueError(f"Unexpected {byte!r} in blob envelope")
+            elif self.state in (Base64EnvelopeDecoder.IN_KEY, Base64EnvelopeDecoder.IN_STRING):
+                if self.escaped:
+                    self.escaped = False
+                    self.token += byte
+                elif byte == b'\\':
+                    self.escaped = True
+                    self.token += byte
+                elif byte == b'"':
+                    value = json.loads(b'"' + bytes(self.token) + b'"')
+                    if self.state == Base64EnvelopeDecoder.IN_KEY:
+                        self.key = value
+                        self.state = Base64EnvelopeDecoder.EXPECT_COLON
+                    else:
+                        self.fields[self.key] = value
+                        self.state = Base64EnvelopeDecoder.EXPECT_KEY
+                else:
+                    self.token += byte
+            elif self.state == Base64EnvelopeDecoder.EXPECT_COLON:
+                if byte == b':':
+                    self.state = Base64EnvelopeDecoder.EXPECT_VALUE
+                elif byte not in self._whitespace:
+                    raise ValueError(f"Unexpected {byte!r} in blob envelope")
+            elif self.state == Base64EnvelopeDecoder.EXPECT_VALUE:
+                if byte in self._whitespace:
+                    continue
+                self.token.clear()
+                if byte == b'"':
+                    self.state = Base64EnvelopeDecoder.IN_CONTENT if self.key == self.content_field else Base64EnvelopeDecoder.IN_STRING
+                else:
+                    # numbers, literals and nested values are kept as raw JSON
+                    self.state = Base64EnvelopeDecoder.IN_OTHER
+                    self.depth = 0
+                    pos -= 1
+            elif self.state == Base64EnvelopeDecoder.IN_OTHER:
+                if self.in_nested_string:
+                    if self.escaped:
+                        self.escaped = False
+                    elif byte == b'\\':
+                        self.escaped = True
+                    elif byte == b'"':
+                        self.in_nested_string = False
+                elif byte == b'"':
+                    self.in_nested_string = True
+                elif byte in (b'{', b'['):
+                    self.depth += 1
+                elif byte in (b'}', b']') and self.depth > 0:
+                    self.depth -= 1
+                elif byte in (b',', b'}') and self.depth == 0:
+                    self.fields[self.key] = json.loads(bytes(self.token))
+                    self.state = Base64EnvelopeDecoder.EXPECT_KEY if byte == b',' else Base64EnvelopeDecoder.DONE
+                    continue
+                self.token += byte
+
+    def _feed_content(self, chunk: bytes, pos: int) -> int:
+        if self.escaped:
+            self.escaped = False
+            if chunk[pos:pos + 1] == b'/':
+                self._write_base64(b'/')
+            return pos + 1  # other escapes (\n, \r, ...) are whitespace for base64
+
+        match = self._content_delimiters.search(chunk, pos)
+        end = match.start() if match else len(chunk)
+        self._write_base64(chunk[pos:end])
+        if match is None:
+            return end
+        if match.group() == b'\\':
+            self.escaped = True
+        else:
+            self._flush_base64()
+            self.fields[self.content_field] = None  # decoded to the output file, not kept in memory
+            self.state = Base64EnvelopeDecoder.EXPECT_KEY
+        return end + 1
+
+    def _write_base64(self, data: bytes):
+        data = self.pending_base64 + data.translate(None, self._whitespace)
+        usable = len(data) - len(data) % 4
+        self.pending_base64 = data[usable:]
+        if usable:
+            decoded = base64.b64decode(data[:usable])
+            self.output.write(decoded)
+            self.bytes_written += len(decoded)
+
+    def _flush_base64(self):
+        if self.pending_base64:
+            padded = self.pending_base64 + b'=' * (-len(self.pending_base64) % 4)
+            decoded = base64.b64decode(padded)
+            self.output.write(decoded)
+            self.bytes_written += len(decoded)
+            self.pending_base64 = b''
+
+    def close(self):
+        if self.state != Base64EnvelopeDecoder.DONE:
+            raise ValueError("Blob envelope ended unexpectedly")
+        if self.content_field not in self.fields:
+            raise ValueError(f"Blob envelope has no {self.content_field} field")
+
+class BlobDownloader:
+
+    @staticmethod
+    def download_to_local(blob_client, download_path: str, file_name: Optional[str] = None) -> str:
+        os.makedirs(download_path, exist_ok=True)
+        properties = blob_client.get_blob_properties()
+        metadata = properties.metadata or {}
+        blob_base_name = os.path.basename(blob_client.blob_name)
+        # Raw uploads carry their name in blob metadata or on the job message
+        file_name = metadata.get("fileName") or metadata.get("filename") or file_name
+
+        stream = blob_client.download_blob(max_concurrency=int(os.getenv("BLOB_DOWNLOAD_CONCURRENCY", 4)))
+        tmp_path = os.path.join(download_path, f"{blob_base_name}.part")
+        try:
+            with open(tmp_path, "wb") as output:
+                file_name = BlobDownloader.write_chunks(stream.chunks(), output, file_name or blob_base_name)
+            content_path = os.path.join(download_path, os.path.basename(file_name))
+            os.replace(tmp_path, content_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        logging.info(f"Extracted content saved to {content_path} ({os.path.getsize(content_path)} bytes)")
+        return content_path
+
+    @staticmethod
+    def write_chunks(chunks: Iterable[bytes], output: BinaryIO, file_name: str, sniff_bytes: int = 64) -> str:
+        decoder = None
+        head = b''
+        sniffed = False
+        for chunk in chunks:
+            if not sniffed:
+                # Hold back the first few bytes until we can tell an envelope from raw media
+                head += chunk
+                if len(head) < sniff_bytes:
+                    continue
+                sniffed = True
+                chunk, head = head, b''
+                decoder = BlobDownloader.create_decoder(chunk, output)
+            if decoder is not None:
+                decoder.feed(chunk)
+            else:
+                output.write(chunk)
+
+        if not sniffed and head:
+            decoder = BlobDownloader.create_decoder(head, output)
+            if decoder is not None:
+                decoder.feed(head)
+            else:
+                output.write(head)
+
+        if decoder is not None:
+            decoder.close()
+            return decoder.fields.get("fileName") or file_name
+        return file_name
+
+    @staticmethod
+    def create_decoder(head: bytes, output: BinaryIO) -> Optional[Base64EnvelopeDecoder]:
+        if not BlobDownloader.is_json_envelope(head):
+            return None
+        logging.debug("Blob is a base64 JSON envelope, decoding while streaming")
+        return Base64EnvelopeDecoder(output)
+
+    @staticmethod
+    def is_json_envelope(first_chunk: bytes) -> bool:
+        return re.match(rb'\s*\{\s*"', first_chunk) is not None
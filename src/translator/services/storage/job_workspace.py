@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import time
+import shutil
+import socket
+import logging
+import tempfile
+from typing import List, Optional
+from services.metrics.pipeline_metrics import PipelineMetrics
+
+class WorkspaceQuotaExceeded(RuntimeError):
+    pass
+
+class JobWorkspace:
+    # Every job downloads, converts and splits inside its own directory, so concurrent jobs never see each
+    # other's files and everything a job wrote is removed with it. An owner file lets a restarted worker
+    # find and remove the workspaces a crashed one left behind
+    OWNER_FILE = ".owner"
+    JOBS_DIR = "jobs"
+
+    def __init__(self, path: str, base_path: str, quota_bytes: int = 0):
+        self.path = path
+        self.base_path = base_path
+        self.quota_bytes = quota_bytes
+        self.peak_bytes = 0
+
+    @staticmethod
+    def create(job_id: str, base_path: str, expected_bytes: Optional[int] = None) -> "JobWorkspace":
+        quota_bytes = int(float(os.getenv("WORKSPACE_QUOTA_MB", 0)) * 1024 * 1024)
+        root = os.path.join(base_path, JobWorkspace.JOBS_DIR)
+        tmpfs_root = JobWorkspace.tmpfs_root(expected_bytes)
+        if tmpfs_root is not None:
+            root = tmpfs_root
+            # A download that turns out larger than expected must not fill the memory backed mount
+            tmpfs_bytes = JobWorkspace.tmpfs_max_bytes()
+            quota_bytes = min(quota_bytes, tmpfs_bytes) if quota_bytes else tmpfs_bytes
+
+        os.makedirs(root, exist_ok=True)
+        # A redelivered job can still be running elsewhere on this node, each attempt gets a fresh directory
+        path = tempfile.mkdtemp(prefix=f"{JobWorkspace.safe_name(job_id)}-", dir=root)
+        with open(os.path.join(path, JobWorkspace.OWNER_FILE), 'w') as file:
+            json.dump({"host": socket.gethostname(), "pid": os.getpid(), "created": time.time(), "job_id": job_id}, file)
+        logging.info(f"Created workspace {path} for job {job_id}")
+        return JobWorkspace(path, base_path, quota_bytes)
+
+    @staticmethod
+    def tmpfs_root(expected_bytes: Optional[int]) -> Optional[str]:
+        tmpfs_path = os.getenv("WORKSPACE_TMPFS_PATH")
+        if not tmpfs_path or expected_bytes is None or expected_bytes > JobWorkspace.tmpfs_max_bytes():
+            return None
+        root = os.path.join(tmpfs_path, JobWorkspace.JOBS_DIR)
+        try:
+            os.makedirs(root, exist_ok=True)
+            if shutil.disk_usage(root).free < expected_bytes:
+                return None
+        except OSError as e:
+            logging.warning(f"tmpfs workspace root {root} is unavailable, using disk: {e}")
+            return None
+        return root
+
+    @staticmethod
+    def tmpfs_max_bytes() -> int:
+        return int(float(os.getenv("WORKSPACE_TMPFS_MAX_MB", 256)) * 1024 * 1024)
+
+    @staticmethod
+    def estimate_bytes(max_length_minutes: Optional[int]) -> Optional[int]:
+        # Only a length limit bounds a download up front, the original plus its conversion and segments at 256 kbps
+        if not max_length_minutes:
+            return None
+        return max_length_minutes * 60 * 256 * 1000 // 8 * 3
+
+    @staticmethod
+    def safe_name(job_id: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', job_id)[:64] or "job"
+
+    def subdir(self, name: str) -> str:
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def usage_bytes(self) -> int:
+        total = 0
+        for directory, _, files in os.walk(self.path):
+            for file_name in files:
+                try:
+                    total += os.path.getsize(os.path.join(directory, file_name))
+                except OSError:
+                    pass  # removed while walking
+        return total
+
+    def check_quota(self, stage: str = "workspace"):
+        usage = self.usage_bytes()
+        self.peak_bytes = max(self.peak_bytes, usage)
+        if self.quota_bytes and usage > self.quota_bytes:
+            PipelineMetrics.record_error(stage)
+            raise WorkspaceQuotaExceeded(f"Workspace {self.path} uses {usage} bytes after {stage}, over its quota of {self.quota_bytes}")
+
+    def cleanup(self):
+        self.peak_bytes = max(self.peak_bytes, self.usage_bytes())
+        PipelineMetrics.record_bytes("workspace", self.peak_bytes)
+        shutil.rmtree(self.path, ignore_errors=True)
+        logging.info(f"Removed workspace {self.path}")
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+    @staticmethod
+    def recover(base_path: str) -> List[str]:
+        # Run once at start-up, before this worker takes any job
+        roots = [os.path.join(base_path, JobWorkspace.JOBS_DIR)]
+        if os.getenv("WORKSPACE_TMPFS_PATH"):
+            roots.append(os.path.join(os.getenv("WORKSPACE_TMPFS_PATH"), JobWorkspace.JOBS_DIR))
+        max_age_seconds = float(os.getenv("WORKSPACE_MAX_AGE_HOURS", 24)) * 3600
+
+        removed = []
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            for name in os.listdir(root):
+                path = os.path.join(root, name)
+                if os.path.isdir(path) and JobWorkspace.is_abandoned(path, max_age_seconds):
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed.append(path)
+        if removed:
+            logging.info(f"Removed {len(removed)} abandoned workspaces: {removed}")
+        return removed
+
+    @staticmethod
+    def is_abandoned(path: str, max_age_seconds: float) -> bool:
+        try:
+            with open(os.path.join(path, JobWorkspace.OWNER_FILE)) as file:
+                owner = json.load(file)
+        except (OSError, ValueError):
+            # Killed before the owner file was written, only the age tells
+            return time.time() - os.path.getmtime(path) > max_age_seconds
+
+        if time.time() - owner.get("created", 0) > max_age_seconds:
+            return True
+        if owner.get("host") != socket.gethostname():
+            return False  # another node's worker on a shared volume, left to the age limit
+        # A restarted container reuses its pids, so a workspace claiming to be ours is from before the restart
+        return owner.get("pid") == os.getpid() or not JobWorkspace.is_running(owner.get("pid"))
+
+    @staticmethod
+    def is_running(pid: Optional[int]) -> bool:
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
@@ -0,0 +1,27 @@
+import os
+import logging
+from typing import Optional
+from services.transcription.transcript import Transcript
+
+class TranscriptSink:
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return os.getenv("PERSIST_TRANSCRIPTS", "false").lower() == "true"
+
+    @staticmethod
+    def persist(transcript: Transcript, enabled: Optional[bool] = None) -> Optional[str]:
+        if enabled is None:
+            enabled = TranscriptSink.is_enabled()
+        if not enabled:
+            return None
+
+        file_path = transcript.file_path
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        logging.info(f"Writing transcript to {file_path}")
+        # Written under a temporary name and moved into place so readers never see a partial transcript
+        partial_path = f"{file_path}.part"
+        with open(partial_path, 'w', encoding='utf-8') as file:
+            file.write(transcript.text)
+        os.replace(partial_path, file_path)
+        return file_path
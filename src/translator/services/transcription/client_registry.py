@@ -0,0 +1,61 @@
+import os
+import logging
+import threading
+import httpx
+from groq import AsyncGroq, Groq
+from openai import AsyncOpenAI, OpenAI
+
+class ClientRegistry:
+    # One client per provider and key per process, its keep-alive pool is reused by every job and segment.
+    # The SDKs don't retry on their own, ProviderScheduler sees every 429 and is the only retry layer
+    _clients = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def openai(api_key: str) -> OpenAI:
+        return ClientRegistry.get("openai", api_key, lambda http_client: OpenAI(api_key=api_key, http_client=http_client, max_retries=0))
+
+    @staticmethod
+    def groq(api_key: str) -> Groq:
+        return ClientRegistry.get("groq", api_key, lambda http_client: Groq(api_key=api_key, http_client=http_client, max_retries=0))
+
+    @staticmethod
+    def async_openai(api_key: str) -> AsyncOpenAI:
+        return ClientRegistry.get("openai-async", api_key, lambda http_client: AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0), asynchronous=True)
+
+    @staticmethod
+    def async_groq(api_key: str) -> AsyncGroq:
+        return ClientRegistry.get("groq-async", api_key, lambda http_client: AsyncGroq(api_key=api_key, http_client=http_client, max_retries=0), asynchronous=True)
+
+    @staticmethod
+    def get(provider: str, api_key: str, create, asynchronous: bool = False):
+        key = (provider, api_key)
+        with ClientRegistry._lock:
+            if key not in ClientRegistry._clients:
+                pool_size = ClientRegistry.pool_size()
+                logging.info(f"Creating {provider} client with a pool of {pool_size} connections")
+                ClientRegistry._clients[key] = create(ClientRegistry.create_http_client(pool_size, asynchronous))
+            return ClientRegistry._clients[key]
+
+    @staticmethod
+    def pool_size() -> int:
+        # Every concurrent job can have SEGMENT_CONCURRENCY uploads in flight at once
+        segment_concurrency = int(os.getenv("SEGMENT_CONCURRENCY", 4))
+        worker_concurrency = int(os.getenv("WORKER_CONCURRENCY", os.getenv("PREFETCH_COUNT", 1)))
+        return max(1, segment_concurrency * worker_concurrency)
+
+    @staticmethod
+    def create_http_client(pool_size: int, asynchronous: bool = False):
+        # Request timeouts are set by the SDKs per call, the client only owns the pool
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=float(os.getenv("PROVIDER_KEEPALIVE_SECONDS", 120)))
+        if asynchronous:
+            return httpx.AsyncClient(limits=limits)
+        return httpx.Client(limits=limits)
+
+    @staticmethod
+    def close():
+        with ClientRegistry._lock:
+            for client in ClientRegistry._clients.values():
+                if not isinstance(client, (AsyncOpenAI, AsyncGroq)):
+                    client.close()  # async pools are closed with their event loop
+            ClientRegistry._clients.clear()
@@ -1,30 +1,50 @@
+import os
 import logging
-from groq import Groq
+from .client_registry import ClientRegistry
 from .transcription_service import TranscriptionService
 
 class GroqTranscriptionService(TranscriptionService):
     def __init__(self, api_key: str):
-        self.client = Groq(api_key=api_key)
+        self.api_key = api_key
+        self.client = ClientRegistry.groq(api_key)
 
     def transcribe(self, audio_file_path: str, prompt: str) -> str:
-        try:
-            with open(audio_file_path, 'rb') as audio_file:
-                logging.debug(f"Processing part {audio_file_path}")
-                trimmed_prompt = self.take_last_896_chars(prompt)
-                transcription = self.client.audio.transcriptions.create(
-                    model="whisper-large-v3", 
-                    file=(audio_file_path, audio_file.read()),
-                    response_format="verbose_json" 
-                )
-            return transcription.text
-        except Exception as e:
-            logging.error(f"Error transcribing audio file: {e}")
-            return ""
+        # Errors propagate so the provider scheduler can retry them instead of losing the segment
+        with open(audio_file_path, 'rb') as audio_file:
+            logging.debug(f"Processing part {audio_file_path}")
+            trimmed_prompt = self.take_last_896_chars(prompt)
+            prompt_args = {"prompt": trimmed_prompt} if trimmed_prompt else {}
+            transcription = self.client.audio.transcriptions.create(
+                model="whisper-large-v3", 
+                file=(os.path.basename(audio_file_path), audio_file),  # streamed from disk by the multipart encoder
+                response_format="verbose_json",
+                **prompt_args
+            )
+        return transcription.text
+
+    async def transcribe_async(self, audio_file_path: str, prompt: str) -> str:
+        client = ClientRegistry.async_groq(self.api_key)
+        with open(audio_file_path, 'rb') as audio_file:
+            logging.debug(f"Processing part {audio_file_path}")
+            trimmed_prompt = self.take_last_896_chars(prompt)
+            prompt_args = {"prompt": trimmed_prompt} if trimmed_prompt else {}
+            transcription = await client.audio.transcriptions.create(
+                model="whisper-large-v3",
+                file=(os.path.basename(audio_file_path), audio_file),
+                response_format="verbose_json",
+                **prompt_args
+            )
+        return transcription.text
+
+    def provider_name(self) -> str:
+        return "groq"
 
     def file_name_extension(self) -> str:
         return ".txt"
 
     def take_last_896_chars(self, input_string):
+        if input_string is None:
+            return None
         if len(input_string) > 896:
             return input_string[-896:]
         else:
@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from services.metrics.pipeline_metrics import PipelineMetrics
+from .client_registry import ClientRegistry
+from .transcription_service import TranscriptionService
+
+class HedgedTranscriptionService(TranscriptionService):
+    # Latency samples are seconds per MB of audio, so short tail segments don't skew the threshold
+    _latencies = {}
+    _lock = threading.Lock()
+    # Hedges run outside the job's segment pool, a losing request is left to finish here in the background.
+    # Every segment in flight can have both of its requests running
+    _executor = ThreadPoolExecutor(max_workers=2 * ClientRegistry.pool_size(), thread_name_prefix="hedge")
+
+    def __init__(self, primary: TranscriptionService, secondary: TranscriptionService,
+                 percentile: float = 95.0, min_samples: int = 20, initial_delay: float = 60.0, window: int = 500):
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.window = window
+
+    @staticmethod
+    def from_env(primary: TranscriptionService, secondary: TranscriptionService) -> "HedgedTranscriptionService":
+        return HedgedTranscriptionService(
+            primary,
+            secondary,
+            percentile=float(os.getenv("TRANSCRIPTION_HEDGE_PERCENTILE", 95)),
+            min_samples=int(os.getenv("TRANSCRIPTION_HEDGE_MIN_SAMPLES", 20)),
+            initial_delay=float(os.getenv("TRANSCRIPTION_HEDGE_INITIAL_DELAY_SECONDS", 60))
+        )
+
+    def transcribe(self, audio_file_path: str, prompt: str) -> str:
+        return self.transcribe_scheduled(audio_file_path, prompt)
+
+    def transcribe_scheduled(self, audio_file_path: str, prompt: str) -> str:
+        # Each leg goes through its own provider's scheduler, this wrapper adds no retries of its own
+        started = threading.Event()
+        primary = self._executor.submit(self.run_primary, audio_file_path, prompt, started)
+        # The delay counts from the request, not from the time it spent waiting for a thread
+        started.wait()
+        done, _ = wait([primary], timeout=self.hedge_delay(audio_file_path))
+        if primary in done:
+            try:
+                return primary.result()
+            except Exception as e:
+                logging.warning(f"{self.primary.provider_name()} failed on {audio_file_path}, falling back to {self.secondary.provider_name()}: {e}")
+                PipelineMetrics.record_hedge("fallback")
+                return self.secondary.transcribe_scheduled(audio_file_path, prompt)
+
+        logging.info(f"{self.primary.provider_name()} is slow on {audio_file_path}, hedging with {self.secondary.provider_name()}")
+        PipelineMetrics.record_hedge("hedged")
+        secondary = self._executor.submit(self.secondary.transcribe_scheduled, audio_file_path, prompt)
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    transcription = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                PipelineMetrics.record_hedge("primary_won" if future is primary else "secondary_won")
+                return transcription
+        raise error
+
+    async def transcribe_async(self, audio_file_path: str, prompt: str) -> str:
+        return await self.transcribe_scheduled_async(audio_file_path, prompt)
+
+    async def transcribe_scheduled_async(self, audio_file_path: str, prompt: str) -> str:
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self.primary.transcribe_scheduled_async(audio_file_path, prompt))
+        primary.add_done_callback(lambda task: self.record_primary(task, audio_file_path, time.monotonic() - started))
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_delay(audio_file_path))
+        if primary in done:
+            try:
+                return primary.result()
+            except Exception as e:
+                logging.warning(f"{self.primary.provider_name()} failed on {audio_file_path}, falling back to {self.secondary.provider_name()}: {e}")
+                PipelineMetrics.record_hedge("fallback")
+                return await self.secondary.transcribe_scheduled_async(audio_file_path, prompt)
+
+        logging.info(f"{self.primary.provider_name()} is slow on {audio_file_path}, hedging with {self.secondary.provider_name()}")
+        PipelineMetrics.record_hedge("hedged")
+        secondary = asyncio.ensure_future(self.secondary.transcribe_scheduled_async(audio_file_path, prompt))
+        pending = {primary, secondary}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    PipelineMetrics.record_hedge("primary_won" if task is primary else "secondary_won")
+                    return task.result()
+            raise error
+        finally:
+            # Unlike threads the losing request can be cancelled, which also frees its provider slot
+            for task in pending:
+                task.cancel()
+
+    def run_primary(self, audio_file_path: str, prompt: str, started: threading.Event) -> str:
+        # Recorded whether or not the primary wins, samples only from the races it won would pull the threshold down
+        started.set()
+        request_started = time.monotonic()
+        transcription = self.primary.transcribe_scheduled(audio_file_path, prompt)
+        self.record_latency(audio_file_path, time.monotonic() - request_started)
+        return transcription
+
+    def record_primary(self, task: asyncio.Future, audio_file_path: str, seconds: float):
+        # A primary cancelled after losing took at least this long, which is kept as its sample
+        if task.cancelled() or task.exception() is None:
+            self.record_latency(audio_file_path, seconds)
+
+    def hedge_delay(self, audio_file_path: str) -> float:
+        with self._lock:
+            samples = list(self._latencies.get(self.primary.provider_name(), ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+
+        samples.sort()
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return samples[index] * self.size_mb(audio_file_path)
+
+    def record_latency(self, audio_file_path: str, seconds: float):
+        with self._lock:
+            samples = self._latencies.setdefault(self.primary.provider_name(), deque(maxlen=self.window))
+            samples.append(seconds / self.size_mb(audio_file_path))
+
+    @staticmethod
+    def size_mb(audio_file_path: str) -> float:
+        return max(os.path.getsize(audio_file_path) / (1024 * 1024), 0.1)
+
+    def file_name_extension(self) -> str:
+        return self.primary.file_name_extension()
+
+    def provider_name(self) -> str:
+        return f"{self.primary.provider_name()}+{self.secondary.provider_name()}"
@@ -1,20 +1,28 @@
 import logging
-from openai import OpenAI
+from .client_registry import ClientRegistry
 from .transcription_service import TranscriptionService
 
 class OpenAISrtTranscriptionService(TranscriptionService):
     def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.client = ClientRegistry.openai(api_key)
 
     def transcribe(self, audio_file_path: str, prompt: str) -> str:
-        try:
-            with open(audio_file_path, 'rb') as audio_file:
-                logging.debug(f"Processing part {audio_file_path}")
-                transcription = self.client.audio.transcriptions.create(model="whisper-1", file=audio_file, response_format="srt", prompt=prompt)
-            return transcription
-        except Exception as e:
-            logging.error(f"Error transcribing audio file: {e}")
-            return ""
+        # Errors propagate so the provider scheduler can retry them instead of losing the segment
+        with open(audio_file_path, 'rb') as audio_file:
+            logging.debug(f"Processing part {audio_file_path}")
+            transcription = self.client.audio.transcriptions.create(model="whisper-1", file=audio_file, response_format="srt", prompt=prompt)
+        return transcription
+
+    async def transcribe_async(self, audio_file_path: str, prompt: str) -> str:
+        client = ClientRegistry.async_openai(self.api_key)
+        with open(audio_file_path, 'rb') as audio_file:
+            logging.debug(f"Processing part {audio_file_path}")
+            transcription = await client.audio.transcriptions.create(model="whisper-1", file=audio_file, response_format="srt", prompt=prompt)
+        return transcription
+
+    def provider_name(self) -> str:
+        return "openai"
 
     def file_name_extension(self) -> str:
         return ".srt"
@@ -0,0 +1,197 @@
+import os
+import time
+import asyncio
+import random
+import logging
+import threading
+from typing import Callable, Optional
+from services.metrics.pipeline_metrics import PipelineMetrics
+
+class ProviderScheduler:
+    # One scheduler per provider per process, so concurrent jobs share the same quota
+    _schedulers = {}
+    _lock = threading.Lock()
+
+    RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+    RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "ConnectionError", "TimeoutError"}
+
+    def __init__(self, name: str, requests_per_minute: float = 0, max_concurrency: int = 4, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0, latency_tolerance: float = 3.0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_tolerance = latency_tolerance
+
+        # token bucket, a rate of 0 means the provider has no request quota we need to respect
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+
+        # adaptive concurrency limit, additive increase and multiplicative decrease
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def for_provider(name: str) -> "ProviderScheduler":
+        with ProviderScheduler._lock:
+            if name not in ProviderScheduler._schedulers:
+                prefix = name.upper()
+                ProviderScheduler._schedulers[name] = ProviderScheduler(
+                    name,
+                    requests_per_minute=float(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", 0)),
+                    max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", 8)),
+                    max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", 5))
+                )
+            return ProviderScheduler._schedulers[name]
+
+    def run(self, func: Callable, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.acquire()
+            started = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.release()
+                time.sleep(self.on_failure(e, attempt, started))
+                attempt += 1
+                continue
+
+            self.release()
+            self.on_completed(started)
+            return result
+
+    async def run_async(self, func: Callable, *args, **kwargs):
+        # Same quota and limit as run, waiting yields to the event loop instead of blocking a thread
+        attempt = 0
+        while True:
+            await self.acquire_async()
+            started = time.monotonic()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                self.release()
+                await asyncio.sleep(self.on_failure(e, attempt, started))
+                attempt += 1
+                continue
+
+            self.release()
+            self.on_completed(started)
+            return result
+
+    def on_failure(self, error: Exception, attempt: int, started: float) -> float:
+        retryable = self.is_retryable(error)
+        PipelineMetrics.record_provider_request(self.name, time.monotonic() - started, "error")
+        PipelineMetrics.record_provider_error(self.name, retryable)
+        if not retryable or attempt >= self.max_retries:
+            logging.error(f"{self.name} request failed after {attempt + 1} attempts: {error}")
+            raise error
+        retry_after = self.retry_after(error)
+        if self.status_code(error) == 429:
+            self.on_rate_limited()
+        delay = retry_after if retry_after is not None else self.backoff(attempt)
+        logging.warning(f"{self.name} request failed ({error}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+    def on_completed(self, started: float):
+        latency = time.monotonic() - started
+        PipelineMetrics.record_provider_request(self.name, latency, "success")
+        self.on_success(latency)
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                wait = self.try_acquire()
+                if wait == 0:
+                    return
+                self.condition.wait(timeout=wait)
+
+    async def acquire_async(self):
+        while True:
+            with self.condition:
+                wait = self.try_acquire()
+            if wait == 0:
+                return
+            # releases happen on other tasks or threads, poll instead of waiting on the condition
+            await asyncio.sleep(min(wait, 0.05) if wait is not None else 0.05)
+
+    def try_acquire(self) -> Optional[float]:
+        # 0 once a slot is taken, otherwise how long until a token is due (None when waiting on a release)
+        self.refill()
+        if self.in_flight < max(1, int(self.limit)) and (self.rate <= 0 or self.tokens >= 1):
+            if self.rate > 0:
+                self.tokens -= 1
+            self.in_flight += 1
+            return 0
+        if self.rate > 0 and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return None
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def on_rate_limited(self):
+        with self.condition:
+            now = time.monotonic()
+            # One 429 burst usually hits every in-flight request, only back off once per burst
+            if now - self.last_decrease > 1.0:
+                self.limit = max(1.0, self.limit / 2)
+                self.last_decrease = now
+                logging.info(f"{self.name} rate limited, concurrency limit lowered to {int(self.limit)}")
+
+    def on_success(self, latency: float):
+        with self.condition:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+            if latency > self.baseline_latency * self.latency_tolerance:
+                # Queueing on the provider side shows up as latency before it shows up as 429s
+                self.limit = max(1.0, self.limit * 0.9)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(1.0, self.limit))
+            self.condition.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter keeps retries from concurrent segments from landing together
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def status_code(error: Exception) -> Optional[int]:
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        return status if isinstance(status, int) else None
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if not headers:
+            return None
+        try:
+            value = headers.get("retry-after")
+            return min(float(value), 120.0) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        status = ProviderScheduler.status_code(error)
+        if status is not None:
+            return status in ProviderScheduler.RETRYABLE_STATUS_CODES
+        return any(cls.__name__ in ProviderScheduler.RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
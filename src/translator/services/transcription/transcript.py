@@ -0,0 +1,13 @@
+import os
+from dataclasses import dataclass
+
+@dataclass
+class Transcript:
+    # Carried through the pipeline in memory, disk is only touched if the transcript sink is enabled
+    text: str
+    file_name_extension: str
+    source_path: str
+
+    @property
+    def file_path(self) -> str:
+        return f'{os.path.splitext(self.source_path)[0]}_transcript{self.file_name_extension}'.replace("audio/", "transcript/")
@@ -1,9 +1,11 @@
 import os
+import logging
 from .transcription_service import TranscriptionService
 from .openai_transcription_service import OpenAITranscriptionService
 from .openai_srt_transcription_service import OpenAISrtTranscriptionService
 from .openai_vtt_transcription_service import OpenAIVttTranscriptionService
 from .groq_transcription_service import GroqTranscriptionService
+from .hedged_transcription_service import HedgedTranscriptionService
 from enums.transcription_service_type import TranscriptionServiceType
 
 class TranscriptionFactory:
@@ -16,6 +18,25 @@ class TranscriptionFactory:
 
     @staticmethod
     def get_transcription_service(service_name: TranscriptionServiceType) -> TranscriptionService:
+        service = TranscriptionFactory.create_service(service_name)
+
+        # Opt-in hedging, slow segments are raced against a second provider and hard failures fall back to it
+        hedge_service_name = os.getenv("TRANSCRIPTION_HEDGE_SERVICE")
+        if not hedge_service_name or hedge_service_name == service_name.value:
+            return service
+        try:
+            hedge_service = TranscriptionFactory.create_service(TranscriptionServiceType(hedge_service_name))
+        except ValueError as e:
+            logging.warning(f"Hedging disabled, {hedge_service_name} is unavailable: {e}")
+            return service
+        if hedge_service.file_name_extension() != service.file_name_extension():
+            # Either answer has to be usable as-is, a subtitle job can't be answered with plain text
+            logging.debug(f"Not hedging {service_name.value} with {hedge_service_name}, their output formats differ")
+            return service
+        return HedgedTranscriptionService.from_env(service, hedge_service)
+
+    @staticmethod
+    def create_service(service_name: TranscriptionServiceType) -> TranscriptionService:
         if service_name not in TranscriptionFactory._service_map:
             raise ValueError(f"Unsupported transcription service: {service_name}")
 
@@ -1,9 +1,25 @@
+import asyncio
 from abc import ABC, abstractmethod
+from .provider_scheduler import ProviderScheduler
 
 class TranscriptionService(ABC):
     @abstractmethod
     def transcribe(self, audio_file_path: str, prompt: str) -> str:
         pass
 
+    async def transcribe_async(self, audio_file_path: str, prompt: str) -> str:
+        # Services without an async client keep the event loop free by running on a thread
+        return await asyncio.to_thread(self.transcribe, audio_file_path, prompt)
+
+    def transcribe_scheduled(self, audio_file_path: str, prompt: str) -> str:
+        # Every provider call goes through the shared scheduler for rate limiting and retries
+        return ProviderScheduler.for_provider(self.provider_name()).run(self.transcribe, audio_file_path, prompt)
+
+    async def transcribe_scheduled_async(self, audio_file_path: str, prompt: str) -> str:
+        return await ProviderScheduler.for_provider(self.provider_name()).run_async(self.transcribe_async, audio_file_path, prompt)
+
     def file_name_extension(self) -> str:
         pass
+
+    def provider_name(self) -> str:
+        return type(self).__name__
@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+import threading
+from langchain import hub
+
+class ChainRegistry:
+    # (prompt reference, api key) -> [chain, fetched_at, refreshing]
+    _entries = {}
+    _lock = threading.Lock()
+    _pull_locks = {}
+
+    @staticmethod
+    def get(prompt_name: str, api_key: str):
+        prompt_ref = ChainRegistry.resolve_reference(prompt_name)
+        key = (prompt_ref, api_key)
+
+        with ChainRegistry._lock:
+            entry = ChainRegistry._entries.get(key)
+            if entry is not None:
+                chain, fetched_at, refreshing = entry
+                # A pinned revision never changes, everything else is refreshed in the background once stale
+                if ChainRegistry.is_pinned(prompt_ref) or refreshing or time.monotonic() - fetched_at < ChainRegistry.ttl_seconds():
+                    return chain
+                entry[2] = True
+
+        if entry is not None:
+            threading.Thread(target=ChainRegistry.refresh, args=(key,), daemon=True, name=f"chain-refresh-{prompt_name}").start()
+            return entry[0]
+
+        with ChainRegistry._pull_lock(key):
+            # Another job may have pulled the chain while we waited
+            with ChainRegistry._lock:
+                entry = ChainRegistry._entries.get(key)
+            if entry is not None:
+                return entry[0]
+
+            logging.info(f"Pulling prompt {prompt_ref} from the hub")
+            chain = hub.pull(prompt_ref, include_model=True, api_key=api_key)
+            with ChainRegistry._lock:
+                ChainRegistry._entries[key] = [chain, time.monotonic(), False]
+            return chain
+
+    @staticmethod
+    def refresh(key):
+        prompt_ref, api_key = key
+        try:
+            chain = hub.pull(prompt_ref, include_model=True, api_key=api_key)
+            with ChainRegistry._lock:
+                ChainRegistry._entries[key] = [chain, time.monotonic(), False]
+            logging.debug(f"Refreshed prompt {prompt_ref}")
+        except Exception as e:
+            # Keep serving the chain we have, a hub outage shouldn't stall transformations
+            logging.error(f"Failed to refresh prompt {prompt_ref}, keeping cached version: {e}")
+            with ChainRegistry._lock:
+                entry = ChainRegistry._entries.get(key)
+                if entry is not None:
+                    entry[1] = time.monotonic()
+                    entry[2] = False
+
+    @staticmethod
+    def clear():
+        with ChainRegistry._lock:
+            ChainRegistry._entries.clear()
+
+    @staticmethod
+    def ttl_seconds() -> int:
+        return int(os.getenv("PROMPT_CACHE_TTL_SECONDS", 3600))
+
+    @staticmethod
+    def resolve_reference(prompt_name: str) -> str:
+        # PROMPT_REVISIONS pins prompts to a hub commit, e.g. "scribe-ai-summary=1a2b3c4d,scribe-ai-format-for-keywords=5e6f7a8b"
+        pins = {}
+        for pin in (os.getenv("PROMPT_REVISIONS") or "").split(","):
+            if "=" in pin:
+                name, revision = pin.split("=", 1)
+                pins[name.strip()] = revision.strip()
+
+        revision = pins.get(prompt_name)
+        return f"{prompt_name}:{revision}" if revision else prompt_name
+
+    @staticmethod
+    def is_pinned(prompt_ref: str) -> bool:
+        return ":" in prompt_ref
+
+    @staticmethod
+    def _pull_lock(key) -> threading.Lock:
+        with ChainRegistry._lock:
+            return ChainRegistry._pull_locks.setdefault(key, threading.Lock())
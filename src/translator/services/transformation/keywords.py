@@ -1,13 +1,11 @@
-from openai import OpenAI
-from langchain import hub
+from .chain_registry import ChainRegistry
+from .map_reduce import TranscriptMapReduce
 from .transformation_service import TransformationService
 
 class FormattingForKeywordsTransformation(TransformationService):
-    def __init__(self, openai_api_key: str, lang_smith_api_key: str):
+    def __init__(self, lang_smith_api_key: str):
         self.llmOpsKey = lang_smith_api_key
-        self.client = OpenAI(api_key=openai_api_key)
         
     def transform(self, transcript: str, metadata: dict) -> str:
-        chain = hub.pull("scribe-ai-format-for-keywords", include_model=True, api_key=self.llmOpsKey)
-        summary = chain.invoke({"transcript": transcript})
-        return summary.content
\ No newline at end of file
+        chain = ChainRegistry.get("scribe-ai-format-for-keywords", self.llmOpsKey)
+        return TranscriptMapReduce.invoke(chain, transcript, lambda text: {"transcript": text})
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import logging
+from typing import Callable, List
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+class TranscriptMapReduce:
+    CHARS_PER_TOKEN = 4  # close enough for English transcripts, and errs towards smaller chunks
+
+    @staticmethod
+    def invoke(chain, transcript: str, build_inputs: Callable[[str], dict]) -> str:
+        max_input_tokens = int(os.getenv("TRANSFORM_MAX_INPUT_TOKENS", 12000))
+        if TranscriptMapReduce.estimate_tokens(transcript) <= max_input_tokens:
+            return chain.invoke(build_inputs(transcript)).content
+
+        chunk_tokens = int(os.getenv("TRANSFORM_CHUNK_TOKENS", 6000))
+        concurrency = int(os.getenv("TRANSFORM_MAP_CONCURRENCY", 4))
+
+        # Map: the prompt runs over every chunk concurrently
+        chunks = TranscriptMapReduce.split(transcript, chunk_tokens)
+        logging.info(f"Transcript of ~{TranscriptMapReduce.estimate_tokens(transcript)} tokens mapped over {len(chunks)} chunks")
+        results = TranscriptMapReduce.batch(chain, chunks, build_inputs, concurrency)
+
+        # Reduce: partial results are combined level by level until they fit one final call
+        level = 1
+        while TranscriptMapReduce.estimate_tokens("\n\n".join(results)) > max_input_tokens and len(results) > 1:
+            groups = TranscriptMapReduce.group(results, chunk_tokens)
+            if len(groups) == len(results):
+                break  # every partial result is already a chunk on its own, collapsing further won't converge
+            logging.info(f"Reducing {len(results)} partial results into {len(groups)} at level {level}")
+            results = TranscriptMapReduce.batch(chain, groups, build_inputs, concurrency)
+            level += 1
+
+        return chain.invoke(build_inputs("\n\n".join(results))).content
+
+    @staticmethod
+    def batch(chain, texts: List[str], build_inputs: Callable[[str], dict], concurrency: int) -> List[str]:
+        outputs = chain.batch([build_inputs(text) for text in texts], config={"max_concurrency": concurrency})
+        return [output.content for output in outputs]
+
+    @staticmethod
+    def split(transcript: str, chunk_tokens: int) -> List[str]:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens,
+            chunk_overlap=0,
+            length_function=TranscriptMapReduce.estimate_tokens,
+            separators=["\n\n", "\n", ". ", "? ", "! ", " ", ""],
+            keep_separator="end"
+        )
+        return splitter.split_text(transcript)
+
+    @staticmethod
+    def group(texts: List[str], chunk_tokens: int) -> List[str]:
+        groups = []
+        current = []
+        current_tokens = 0
+        for text in texts:
+            tokens = TranscriptMapReduce.estimate_tokens(text)
+            if current and current_tokens + tokens > chunk_tokens:
+                groups.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return (len(text) + TranscriptMapReduce.CHARS_PER_TOKEN - 1) // TranscriptMapReduce.CHARS_PER_TOKEN
@@ -1,4 +1,5 @@
 import os
+import threading
 
 from .formatting import FormattingForReadabilityTransformation
 from .keywords import FormattingForKeywordsTransformation
@@ -13,15 +14,18 @@ from enums.transcription_transformation import TranscriptionTransformation
 
 class TransformationFactory:
     _service_map = {
-        TranscriptionTransformation.NONE: (NoneTransformation, None, None),
-        TranscriptionTransformation.SUMMARIZE: (SummarizeTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
-        TranscriptionTransformation.FORMATTING: (FormattingForReadabilityTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
-        TranscriptionTransformation.PARAGRAPHS: (FormattingForParagraphsTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
-        TranscriptionTransformation.REMOVEFILLERWORDS: (FormattingForFillerWordsTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
-        TranscriptionTransformation.KEYWORDS: (FormattingForKeywordsTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
-        TranscriptionTransformation.YOUTUBEHIGHLIGHTS : (FormattingForYoutubeHighlightsTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
-        TranscriptionTransformation.YOUTUBESUMMARY : (FormattingForYoutubeSummaryTransformation, "OPENAI_API_KEY", "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.NONE: (NoneTransformation, None),
+        TranscriptionTransformation.SUMMARIZE: (SummarizeTransformation, "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.FORMATTING: (FormattingForReadabilityTransformation, "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.PARAGRAPHS: (FormattingForParagraphsTransformation, "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.REMOVEFILLERWORDS: (FormattingForFillerWordsTransformation, "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.KEYWORDS: (FormattingForKeywordsTransformation, "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.YOUTUBEHIGHLIGHTS : (FormattingForYoutubeHighlightsTransformation, "LANGCHAIN_API_KEY"),
+        TranscriptionTransformation.YOUTUBESUMMARY : (FormattingForYoutubeSummaryTransformation, "LANGCHAIN_API_KEY"),
     }
+    # Transformations are stateless, one instance per service and key set is shared by every job
+    _instances = {}
+    _lock = threading.Lock()
 
     @staticmethod
     def get_transformation_service(service_name: TranscriptionTransformation) -> TransformationService:
@@ -34,5 +38,9 @@ class TransformationFactory:
             missing_keys = [key for key, value in zip(api_key_envs, api_keys) if value is None]
             raise ValueError(f"API keys missing: {', '.join(missing_keys)}")
 
-        return service_class(*api_keys)
+        instance_key = (service_name, *api_keys)
+        with TransformationFactory._lock:
+            if instance_key not in TransformationFactory._instances:
+                TransformationFactory._instances[instance_key] = service_class(*api_keys)
+            return TransformationFactory._instances[instance_key]
 
@@ -0,0 +1,81 @@
+import os
+import logging
+from typing import List, Optional, Union
+from .transformation_factory import TransformationFactory
+from enums.job_status import JobStatus
+from enums.transcription_transformation import TranscriptionTransformation
+from messages.transcription_result import TranscriptionResult
+from services.metrics.pipeline_metrics import PipelineMetrics
+
+class TransformationRunner:
+    # The threaded and asyncio workers only differ in how transformations are scheduled,
+    # running one and folding the results into the job's outcome is shared
+
+    @staticmethod
+    def unique(transforms: Union[TranscriptionTransformation, List[TranscriptionTransformation]]) -> List[TranscriptionTransformation]:
+        if isinstance(transforms, TranscriptionTransformation):
+            return [transforms]
+        return list(dict.fromkeys(transforms))
+
+    @staticmethod
+    def concurrency(count: int) -> int:
+        return max(1, min(count, int(os.getenv("TRANSFORM_CONCURRENCY", 4))))
+
+    @staticmethod
+    def metadata(video_info: dict) -> dict:
+        return {
+            "duration" : video_info.get("duration", 0), # used for youtube highlights
+            "length" : 3000, # used for youtube summary
+        }
+
+    @staticmethod
+    def run(transform: TranscriptionTransformation, transcript: str, metadata: dict, job_id: str) -> TranscriptionResult:
+        logging.info(f"Running transformation {transform} with metadata {metadata}")
+        try:
+            transformation = TransformationFactory.get_transformation_service(transform)
+            with PipelineMetrics.track_stage(f"transform_{transform.value}"):
+                transformed_transcript = transformation.transform(transcript, metadata=metadata)
+        except Exception as e:
+            logging.error(f"An error occurred during transformation {transform}: {str(e)}")
+            return TranscriptionResult(
+                jobId=job_id,
+                transcript=transcript,
+                transform=transform.value,
+                status=JobStatus.FAILED.value,
+                error=str(e)
+            )
+        return TranscriptionResult(
+            jobId=job_id,
+            transcript=transcript,
+            transformed=transformed_transcript,
+            transform=transform.value,
+            status=JobStatus.FINISHED.value
+        )
+
+class TransformationResults:
+    # With several transformations each one is published as soon as it's ready, marked transformed so it
+    # doesn't end the job, and the job ends with exactly one finished or failed result once all of them are done
+    def __init__(self, transcript: str, job_id: str):
+        self.transcript = transcript
+        self.job_id = job_id
+        self.failed = []
+
+    def add(self, result: TranscriptionResult) -> Optional[TranscriptionResult]:
+        # Returns the result to publish now
+        if result.status == JobStatus.FAILED.value:
+            self.failed.append(result)
+            return None
+        return result.model_copy(update={"status": JobStatus.TRANSFORMED.value})
+
+    def outcome(self) -> TranscriptionResult:
+        if not self.failed:
+            return TranscriptionResult(jobId=self.job_id, transcript=self.transcript, status=JobStatus.FINISHED.value)
+
+        # The transformations that succeeded are already recorded, the job itself is reported as failed
+        return TranscriptionResult(
+            jobId=self.job_id,
+            transcript=self.transcript,
+            transform=",".join(result.transform for result in self.failed),
+            status=JobStatus.FAILED.value,
+            error="; ".join(f"{result.transform}: {result.error}" for result in self.failed)
+        )
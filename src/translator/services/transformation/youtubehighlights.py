@@ -1,17 +1,15 @@
-from openai import OpenAI
-from langsmith import Client
-from langchain import hub
+from .chain_registry import ChainRegistry
+from .map_reduce import TranscriptMapReduce
 from .transformation_service import TransformationService
 
 class FormattingForYoutubeHighlightsTransformation(TransformationService):
-    def __init__(self, openai_api_key: str, lang_smith_api_key: str):
+    def __init__(self, lang_smith_api_key: str):
         self.llmOpsKey = lang_smith_api_key
-        self.client = OpenAI(api_key=openai_api_key)
         
     def transform(self, transcript: str, metadata: dict) -> str:
-        chain = hub.pull("scribe-ai-format-youtube-highlights-v2", include_model=True, api_key=self.llmOpsKey)
-        summary = chain.invoke({"transcript": transcript, "duration": self.format_duration(metadata.get("duration", 0))})
-        return summary.content
+        chain = ChainRegistry.get("scribe-ai-format-youtube-highlights-v2", self.llmOpsKey)
+        duration = self.format_duration(metadata.get("duration", 0))
+        return TranscriptMapReduce.invoke(chain, transcript, lambda text: {"transcript": text, "duration": duration})
     
     def format_duration(self, seconds: int) -> str:
         h = seconds // 3600
@@ -1,13 +1,12 @@
-from openai import OpenAI
-from langchain import hub
+from .chain_registry import ChainRegistry
+from .map_reduce import TranscriptMapReduce
 from .transformation_service import TransformationService
 
 class FormattingForYoutubeSummaryTransformation(TransformationService):
-    def __init__(self, openai_api_key: str, lang_smith_api_key: str):
+    def __init__(self, lang_smith_api_key: str):
         self.llmOpsKey = lang_smith_api_key
-        self.client = OpenAI(api_key=openai_api_key)
         
     def transform(self, transcript: str, metadata: dict) -> str:
-        chain = hub.pull("scribe-ai-format-3000char-summary", include_model=True, api_key=self.llmOpsKey)
-        summary = chain.invoke({"transcript": transcript, "length": metadata.get("length", 3000)})
-        return summary.content
\ No newline at end of file
+        chain = ChainRegistry.get("scribe-ai-format-3000char-summary", self.llmOpsKey)
+        length = metadata.get("length", 3000)
+        return TranscriptMapReduce.invoke(chain, transcript, lambda text: {"transcript": text, "length": length})
\ No newline at end of file
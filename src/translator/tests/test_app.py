@@ -4,9 +4,12 @@ import sys
 import json
 from app import main
 
-def test_main_with_youtube_url(mocker):
-    mock_get_video_info = mocker.patch('services.audio.audio_downloader.AudioDownloader.get_video_info', return_value={"title": "Test Video", "duration": 120})
-    mock_download_audio = mocker.patch('services.audio.audio_downloader.AudioDownloader.download_audio', return_value="path/to/audio.m4a")
+def test_main_with_youtube_url(mocker, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # transcripts and logs are written relative to the working directory
+    mock_service = MagicMock()
+    mock_service.file_name_extension.return_value = ".txt"
+    mocker.patch('services.transcription.transcription_factory.TranscriptionFactory.get_transcription_service', return_value=mock_service)
+    mock_download_audio = mocker.patch('services.audio.audio_downloader.AudioDownloader.download_audio_with_info', return_value=({"title": "Test Video", "duration": 120}, "path/to/audio.m4a"))
     mock_transcribe_audio = mocker.patch('services.audio.audio_service.AudioService.transcribe_audio', return_value="Transcribed text")
     mock_remove = mocker.patch('os.remove')
     
@@ -16,7 +19,9 @@ def test_main_with_youtube_url(mocker):
         "duration": 120,
         "service": "groq",
         "transcription_file_path": "path/to/audio_transcript.txt",
-        "transcript": "Transcribed text"
+        "transcript": "Transcribed text",
+        "transformed_transcript": "Transcribed text",
+        "transform": "none"
     }
     
     test_args = ["app.py", "https://www.youtube.com/watch?v=abc123", "--path", "/fake/path"]
@@ -26,7 +31,6 @@ def test_main_with_youtube_url(mocker):
 
             mock_print.assert_called_once_with(json.dumps(expected_output))
     
-    mock_get_video_info.assert_called_once()
     mock_download_audio.assert_called_once()
     mock_transcribe_audio.assert_called_once()
     mock_remove.assert_called_once_with("path/to/audio.m4a")
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from enums.job_status import JobStatus
+from enums.transcription_transformation import TranscriptionTransformation
+from services.audio.async_audio_service import AsyncAudioService
+from services.transcription.provider_scheduler import ProviderScheduler
+from services.transcription.transcription_service import TranscriptionService
+
+@pytest.fixture
+def handler(mocker, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("METRICS_PORT", "0")
+    listener = mocker.patch('async_transcription_handler.AsyncRabbitMQListener').return_value
+    listener.publish_job_update = AsyncMock()
+    from async_transcription_handler import AsyncTranscriptionHandler
+    return AsyncTranscriptionHandler()
+
+def test_jobs_download_transcribe_and_transform_without_blocking(handler, mocker, tmp_path):
+    audio_path = tmp_path / "audio" / "video.m4a"
+    audio_path.parent.mkdir()
+    audio_path.write_bytes(b"audio")
+    download = mocker.patch('async_transcription_handler.AudioDownloader.download_audio_with_info_async', AsyncMock(return_value=({"title": "Video", "duration": 5}, str(audio_path))))
+    mocker.patch('async_transcription_handler.AsyncAudioService.transcribe_audio', AsyncMock(return_value="hello"))
+    mocker.patch('async_transcription_handler.TranscriptionFactory.get_transcription_service', return_value=MagicMock(**{"file_name_extension.return_value": ".txt"}))
+    transformation = MagicMock()
+    transformation.transform.side_effect = lambda transcript, metadata: transcript.upper()
+    mocker.patch('services.transformation.transformation_runner.TransformationFactory.get_transformation_service', return_value=transformation)
+
+    transforms = [TranscriptionTransformation.SUMMARIZE, TranscriptionTransformation.KEYWORDS]
+    result = asyncio.run(handler.process_audio("https://youtube.com/watch?v=1", transforms, str(tmp_path), None, None, MagicMock(), "job1"))
+
+    assert result.status == JobStatus.FINISHED.value
+    assert download.call_args.kwargs == {"downloads": handler.downloads, "ffmpeg": handler.ffmpeg}
+    published = [call.args[0] for call in handler.listener.publish_job_update.call_args_list]
+    assert published[0]["status"] == JobStatus.IN_PROGRESS.value
+    assert sorted(update["transform"] for update in published[1:]) == ["keywords", "summarize"]
+    assert all(update["status"] == JobStatus.TRANSFORMED.value and update["transformed"] == "HELLO" for update in published[1:])
+    assert not audio_path.exists()
+
+def test_cached_sources_skip_the_download(handler, mocker, tmp_path):
+    audio_path = tmp_path / "audio" / "video.m4a"
+    audio_path.parent.mkdir()
+    audio_path.write_bytes(b"audio")
+    download = mocker.patch('async_transcription_handler.AudioDownloader.download_audio_with_info_async', AsyncMock(return_value=({"title": "Video", "duration": 5}, str(audio_path))))
+    transcribe = mocker.patch('async_transcription_handler.AsyncAudioService.transcribe_audio', AsyncMock(return_value="hello"))
+    mocker.patch('async_transcription_handler.TranscriptionFactory.get_transcription_service', return_value=MagicMock(**{"file_name_extension.return_value": ".txt"}))
+    mocker.patch('services.transformation.transformation_runner.TransformationFactory.get_transformation_service', return_value=MagicMock(**{"transform.return_value": "HELLO"}))
+    service = MagicMock(value="groq")
+
+    for _ in range(2):
+        result = asyncio.run(handler.process_audio("https://youtube.com/watch?v=1", [TranscriptionTransformation.NONE], str(tmp_path), None, None, service, "job1"))
+        assert result.transcript == "hello"
+
+    assert download.call_count == 1
+    assert transcribe.call_count == 1
+    media = [call.args[0] for call in handler.listener.publish_job_update.call_args_list]
+    assert [update["title"] for update in media] == ["Video", "Video"]
+
+def test_failed_downloads_fail_the_job(handler, mocker, tmp_path):
+    mocker.patch('async_transcription_handler.AudioDownloader.download_audio_with_info_async', AsyncMock(return_value=({"title": "Unknown Title", "duration": 0}, None)))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(handler.process_audio("https://youtube.com/watch?v=1", [TranscriptionTransformation.NONE], str(tmp_path), None, None, MagicMock(), "job1"))
+
+def test_segments_share_the_provider_scheduler(mocker, tmp_path):
+    scheduler = ProviderScheduler("fake", max_concurrency=2)
+    mocker.patch('services.transcription.transcription_service.ProviderScheduler.for_provider', return_value=scheduler)
+    in_flight = []
+    peak = []
+
+    class FakeService(TranscriptionService):
+        def transcribe(self, audio_file_path, prompt):
+            raise NotImplementedError
+
+        async def transcribe_async(self, audio_file_path, prompt):
+            in_flight.append(audio_file_path)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(audio_file_path)
+            return audio_file_path.rsplit("/", 1)[-1]
+
+        def file_name_extension(self):
+            return ".txt"
+
+    service = FakeService()
+    segments = [str(tmp_path / f"part{i}.m4a") for i in range(5)]
+    for segment in segments:
+        open(segment, "wb").close()
+    mocker.patch('services.audio.async_audio_service.os.path.getsize', return_value=10 ** 9)
+    mocker.patch('services.audio.async_audio_service.AudioService.segment_length_for', return_value=600000)
+    mocker.patch('services.audio.async_audio_service.AudioSegmenter.segment_async', AsyncMock(return_value=segments))
+    mocker.patch.dict('os.environ', {"SEGMENT_SILENCE_AWARE": "false"})
+
+    result = asyncio.run(AsyncAudioService.transcribe_audio("audio.m4a", service, None))
+
+    assert result == "part0.m4a part1.m4a part2.m4a part3.m4a part4.m4a"
+    assert max(peak) == 2
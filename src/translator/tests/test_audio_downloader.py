@@ -1,77 +1,150 @@
 import pytest
+import subprocess
 from unittest.mock import patch, MagicMock, call
 from services.audio.audio_downloader import AudioDownloader
 
-def test_get_video_info(mocker):
-    mock_subprocess = mocker.patch('subprocess.run')
-    mock_subprocess.return_value.stdout = '{"title": "Test Video", "duration": 120}'
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), (" ", None), ("0", None), (" 30 ", 30), ("thirty", None)])
+def test_max_length_minutes_ignores_unset_and_invalid_values(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("MAX_LENGTH_MINUTES", raising=False)
+    else:
+        monkeypatch.setenv("MAX_LENGTH_MINUTES", value)
 
-    result = AudioDownloader.get_video_info('https://www.youtube.com/watch?v=abc123')
-    
-    assert result['title'] == "Test Video"
-    assert result['duration'] == 120
+    assert AudioDownloader.max_length_minutes() == expected
 
-def test_download_audio(mocker):
+def test_download_google_drive_video(mocker, monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
     mock_subprocess = mocker.patch('subprocess.run')
-    mock_subprocess.return_value.stdout = 'Destination: /fake/path/to/audio.m4a'
-    mocker.patch('os.makedirs')  # Mock os.makedirs to avoid filesystem access
-    mocker.patch('os.path.exists', return_value=True)  # Mock os.path.exists to always return True
-
-    result = AudioDownloader.download_audio('https://www.youtube.com/watch?v=abc123', '/fake/path')
-    
-    assert result == '/fake/path/to/audio.m4a'
-    mock_subprocess.assert_called_once_with(
+    mock_subprocess.side_effect = [
+        mocker.Mock(stdout='{"id": "abc123", "title": "video", "duration": 120, "filepath": "/fake/path/google/video.mp4"}\n'),
+        mocker.Mock()  # ffmpeg
+    ]
+    mocker.patch('os.makedirs')
+    mocker.patch('os.remove')
+
+    video_info, result = AudioDownloader.download_google_drive_video_with_info('https://drive.google.com/file/d/abc123/view', '/fake/path')
+
+    assert result == "/fake/path/audio/video_audio.m4a"
+    assert video_info["title"] == "video"
+    assert video_info["duration"] == 120
+    yt_dlp_command = mock_subprocess.call_args_list[0][0][0]
+    assert yt_dlp_command[:5] == ['yt-dlp', '--output', '/fake/path/google/%(title)s.%(ext)s', '--format', 'bestaudio/best']
+    assert yt_dlp_command[-1] == 'https://drive.google.com/uc?export=download&id=abc123'
+    mock_subprocess.assert_called_with(
         [
-            'yt-dlp',
-            '-x',  # Extract audio
-            '--audio-format', 'm4a',  # Specify audio format
-            '--output', '/fake/path/%(title)s.%(ext)s',  # Naming convention
-            '--format', 'bestaudio',
-            '-N', '4',  # use 4 connections
-            'https://www.youtube.com/watch?v=abc123'
+            'ffmpeg',
+            '-i', '/fake/path/google/video.mp4',
+            '-vn', '-ar', '16000',
+            '-ac', '1', '-ab', '128k',
+            '-f', 'ipod', '/fake/path/audio/video_audio.m4a'
         ],
-        check=True, capture_output=True, text=True
+        check=True
     )
 
-def test_download_google_drive_video(mocker):
+def test_download_google_drive_video_extracts_the_file_yt_dlp_reports(mocker, monkeypatch, tmp_path):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    google_dir = tmp_path / "google"
+    google_dir.mkdir()
+    (google_dir / "leftover.part").write_bytes(b"")
+    (google_dir / "video.mp4").write_bytes(b"")
     mock_subprocess = mocker.patch('subprocess.run')
-    
-    # Mock the first subprocess call for yt-dlp
     mock_subprocess.side_effect = [
-        mocker.Mock(stdout='Destination: /fake/path/google/video.mp4'),
-        mocker.Mock()  # Mock for the second call (ffmpeg)
+        mocker.Mock(stdout=f'{{"id": "abc123", "title": "video", "duration": 900, "filepath": "{google_dir / "video.mp4"}"}}\n'),
+        mocker.Mock()
     ]
-    
-    # Mock all relevant file system operations
-    mocker.patch('os.makedirs')  # Mock directory creation
-    mocker.patch('os.path.exists', return_value=True)  # Mock path existence checks
-    mocker.patch('os.listdir', return_value=['video.mp4'])  # Mock file listing
-    mocker.patch('os.remove')  # Mock os.remove to prevent actual file deletion
-    
-    result = AudioDownloader.download_google_drive_video('https://drive.google.com/file/d/abc123/view', '/fake/path')
-
-    # Verify the expected output
-    assert result == "/fake/path/audio/video_audio.m4a"
-    
-    # Verify both subprocess calls
-    mock_subprocess.assert_has_calls([
-        mocker.call(
-            [
-                'yt-dlp',
-                '--output', '/fake/path/google/%(title)s.%(ext)s',  # Naming convention
-                '--format', 'bestvideo+bestaudio/best',  # Download best video and audio format available
-                'https://drive.google.com/uc?export=download&id=abc123'
-            ],
-            check=True, capture_output=True, text=True
-        ),
-        mocker.call(
-            [
-                'ffmpeg',
-                '-i', '/fake/path/google/video.mp4',
-                '-vn', '-ar', '16000',
-                '-ac', '1', '-ab', '128k',
-                '-f', 'mp4', '/fake/path/audio/video_audio.m4a'
-            ],
-            check=True
-        )
+
+    video_info, result = AudioDownloader.download_google_drive_video_with_info('https://drive.google.com/file/d/abc123/view', str(tmp_path), max_length_minutes=10)
+
+    assert result == str(tmp_path / "audio" / "video_audio.m4a")
+    yt_dlp_command = mock_subprocess.call_args_list[0][0][0]
+    assert yt_dlp_command[yt_dlp_command.index('--download-sections') + 1] == '*0-600'
+    # one ffmpeg pass that extracts, resamples and trims together
+    ffmpeg_command = mock_subprocess.call_args_list[1][0][0]
+    assert ffmpeg_command[ffmpeg_command.index('-i') + 1] == str(google_dir / "video.mp4")
+    assert ffmpeg_command[ffmpeg_command.index('-t') + 1] == '600'
+    assert not (google_dir / "video.mp4").exists()
+
+def test_invalid_google_drive_links_are_not_downloaded(mocker):
+    mock_subprocess = mocker.patch('subprocess.run')
+
+    video_info, result = AudioDownloader.download_google_drive_video_with_info('https://drive.google.com/drive/folders', '/fake/path')
+
+    assert result is None
+    assert video_info["title"] == "Unknown Title"
+    mock_subprocess.assert_not_called()
+
+def test_download_audio_with_info_uses_one_yt_dlp_run(mocker, monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    mock_subprocess = mocker.patch('subprocess.run')
+    mock_subprocess.return_value.stdout = '[youtube] abc123: Downloading webpage\n{"id": "abc123", "title": "Test Video", "duration": 120.4, "filepath": "/fake/path/Test Video.m4a"}\n'
+    mocker.patch('os.makedirs')
+
+    video_info, file_path = AudioDownloader.download_audio_with_info('https://www.youtube.com/watch?v=abc123', '/fake/path')
+
+    assert file_path == '/fake/path/Test Video.m4a'
+    assert video_info["title"] == "Test Video"
+    assert video_info["duration"] == 120
+    command = mock_subprocess.call_args[0][0]
+    assert mock_subprocess.call_count == 1
+    assert command[command.index('--print') + 1] == 'after_move:' + AudioDownloader.INFO_TEMPLATE
+    assert '--no-simulate' in command
+    assert command[-1] == 'https://www.youtube.com/watch?v=abc123'
+
+def test_download_audio_with_info_fetches_only_the_allowed_section(mocker, monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    mock_subprocess = mocker.patch('subprocess.run')
+    mock_subprocess.return_value.stdout = '{"id": "abc123", "title": "Test Video", "duration": 10800, "filepath": "/fake/path/Test Video.m4a"}\n'
+    mocker.patch('os.makedirs')
+    mocker.patch('services.audio.audio_downloader.MediaProbe.probe', return_value=mocker.Mock(duration_seconds=600.2))
+
+    video_info, file_path = AudioDownloader.download_audio_with_info('https://www.youtube.com/watch?v=abc123', '/fake/path', max_length_minutes=10)
+
+    assert file_path == '/fake/path/Test Video.m4a'
+    command = mock_subprocess.call_args[0][0]
+    assert mock_subprocess.call_count == 1
+    assert command[command.index('--download-sections') + 1] == '*0-600'
+
+def test_download_audio_with_info_falls_back_to_a_full_fetch_and_a_stream_copy_trim(mocker, monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    mock_subprocess = mocker.patch('subprocess.run')
+    mock_subprocess.side_effect = [
+        subprocess.CalledProcessError(1, 'yt-dlp', stderr='This format cannot be partially downloaded'),
+        mocker.Mock(stdout='{"id": "abc123", "title": "Test Video", "duration": 10800, "filepath": "/fake/path/Test Video.m4a"}\n'),
+        mocker.Mock()
+    ]
+    mocker.patch('os.makedirs')
+    mocker.patch('os.remove')
+    mocker.patch('services.audio.audio_downloader.MediaProbe.probe', return_value=mocker.Mock(duration_seconds=10800))
+
+    video_info, file_path = AudioDownloader.download_audio_with_info('https://www.youtube.com/watch?v=abc123', '/fake/path', max_length_minutes=10)
+
+    assert file_path == '/fake/path/Test Video_trimmed.m4a'
+    assert '--download-sections' not in mock_subprocess.call_args_list[1][0][0]
+    trim_command = mock_subprocess.call_args_list[2][0][0]
+    assert trim_command[trim_command.index('-t') + 1] == '600'
+    assert trim_command[trim_command.index('-c') + 1] == 'copy'
+
+def test_other_download_errors_are_not_retried_without_the_section(mocker, monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    mock_subprocess = mocker.patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, 'yt-dlp', stderr='ERROR: [youtube] abc123: Video unavailable'))
+    mocker.patch('os.makedirs')
+
+    video_info, file_path = AudioDownloader.download_audio_with_info('https://www.youtube.com/watch?v=abc123', '/fake/path', max_length_minutes=10)
+
+    assert file_path is None
+    assert video_info["title"] == "Unknown Title"
+    assert mock_subprocess.call_count == 1
+
+def test_the_embedded_engine_falls_back_only_when_sections_are_unsupported(mocker):
+    import yt_dlp
+    fetch_once = mocker.patch('services.audio.audio_downloader.AudioDownloader._fetch_once', side_effect=[
+        yt_dlp.utils.DownloadError('ERROR: This format cannot be partially downloaded. Aborting'),
+        ({"title": "Video", "duration": 900}, "/fake/path/Video.m4a"),
     ])
+
+    assert AudioDownloader._fetch_with_info('https://vimeo.com/1', '/fake/path', "media", 10) == ({"title": "Video", "duration": 900}, "/fake/path/Video.m4a")
+    assert fetch_once.call_args_list[1] == call('https://vimeo.com/1', '/fake/path', "media")
+
+    fetch_once.side_effect = yt_dlp.utils.DownloadError('ERROR: Unable to download webpage: HTTP Error 403: Forbidden')
+    with pytest.raises(yt_dlp.utils.DownloadError):
+        AudioDownloader._fetch_with_info('https://vimeo.com/1', '/fake/path', "media", 10)
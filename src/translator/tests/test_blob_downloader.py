@@ -0,0 +1,64 @@
+import io
+import os
+import json
+import base64
+import pytest
+from unittest.mock import MagicMock
+from services.storage.blob_downloader import BlobDownloader, Base64EnvelopeDecoder
+
+def envelope(content: bytes, **fields) -> bytes:
+    return json.dumps({**fields, "content": base64.b64encode(content).decode()}).encode()
+
+def split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 100000])
+def test_envelope_is_decoded_across_chunk_boundaries(chunk_size):
+    content = bytes(range(256)) * 5
+    data = envelope(content, fileName="talk.mp4", mimeType="video/mp4", size=1280)
+    output = io.BytesIO()
+
+    file_name = BlobDownloader.write_chunks(split(data, chunk_size), output, "fallback.json")
+
+    assert output.getvalue() == content
+    assert file_name == "talk.mp4"
+
+def test_envelope_handles_escaped_slashes_and_trailing_fields():
+    content = b"\xff\xfe\xfd" * 100
+    encoded = base64.b64encode(content).decode().replace("/", "\\/")
+    data = ('{"content": "' + encoded + '", "fileName": "caf\\u00e9.m4a", "meta": {"a": [1, "}"]}}').encode()
+    output = io.BytesIO()
+
+    file_name = BlobDownloader.write_chunks(split(data, 5), output, "fallback.json")
+
+    assert output.getvalue() == content
+    assert file_name == "café.m4a"
+
+def test_truncated_envelope_is_rejected():
+    decoder = Base64EnvelopeDecoder(io.BytesIO())
+    decoder.feed(b'{"fileName": "talk.mp4", "content": "AAAA')
+
+    with pytest.raises(ValueError):
+        decoder.close()
+
+def test_raw_blob_is_streamed_as_is():
+    content = b"\x00\x00\x00\x20ftypisom" + b"\x01" * 1000
+    output = io.BytesIO()
+
+    file_name = BlobDownloader.write_chunks(split(content, 64), output, "talk.mp4")
+
+    assert output.getvalue() == content
+    assert file_name == "talk.mp4"
+
+def test_download_to_local_uses_metadata_file_name(tmp_path):
+    blob_client = MagicMock()
+    blob_client.blob_name = "0-job.json"
+    blob_client.get_blob_properties.return_value.metadata = {"fileName": "../talk.mp4"}
+    blob_client.download_blob.return_value.chunks.return_value = [b"raw", b"bytes"]
+
+    content_path = BlobDownloader.download_to_local(blob_client, str(tmp_path))
+
+    assert content_path == os.path.join(str(tmp_path), "talk.mp4")
+    with open(content_path, "rb") as file:
+        assert file.read() == b"rawbytes"
+    assert os.listdir(tmp_path) == ["talk.mp4"]
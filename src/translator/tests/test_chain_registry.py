@@ -0,0 +1,41 @@
+import pytest
+from services.transformation.chain_registry import ChainRegistry
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    ChainRegistry.clear()
+    yield
+    ChainRegistry.clear()
+
+def test_chain_is_pulled_once_and_reused(mocker):
+    mock_pull = mocker.patch('services.transformation.chain_registry.hub.pull', return_value="chain")
+
+    first = ChainRegistry.get("scribe-ai-summary", "key")
+    second = ChainRegistry.get("scribe-ai-summary", "key")
+
+    assert first == second == "chain"
+    mock_pull.assert_called_once_with("scribe-ai-summary", include_model=True, api_key="key")
+
+def test_stale_chain_is_served_while_refreshing(mocker, monkeypatch):
+    monkeypatch.setenv("PROMPT_CACHE_TTL_SECONDS", "0")
+    mock_pull = mocker.patch('services.transformation.chain_registry.hub.pull', side_effect=["old", "new"])
+    mock_thread = mocker.patch('services.transformation.chain_registry.threading.Thread')
+
+    assert ChainRegistry.get("scribe-ai-summary", "key") == "old"
+    assert ChainRegistry.get("scribe-ai-summary", "key") == "old"
+
+    # run the background refresh inline
+    refresh_args = mock_thread.call_args.kwargs["args"]
+    ChainRegistry.refresh(*refresh_args)
+    monkeypatch.setenv("PROMPT_CACHE_TTL_SECONDS", "3600")
+
+    assert ChainRegistry.get("scribe-ai-summary", "key") == "new"
+    assert mock_pull.call_count == 2
+
+def test_pinned_revision_is_pulled_by_commit(mocker, monkeypatch):
+    monkeypatch.setenv("PROMPT_REVISIONS", "scribe-ai-summary=abc123, scribe-ai-format-for-keywords=def456")
+    mock_pull = mocker.patch('services.transformation.chain_registry.hub.pull', return_value="chain")
+
+    ChainRegistry.get("scribe-ai-summary", "key")
+
+    mock_pull.assert_called_once_with("scribe-ai-summary:abc123", include_model=True, api_key="key")
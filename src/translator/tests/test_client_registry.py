@@ -0,0 +1,76 @@
+import pytest
+import httpx
+from unittest.mock import MagicMock
+from services.transcription.client_registry import ClientRegistry
+from services.transcription.groq_transcription_service import GroqTranscriptionService
+from services.transcription.provider_scheduler import ProviderScheduler
+
+@pytest.fixture(autouse=True)
+def clear_clients():
+    ClientRegistry.close()
+    yield
+    ClientRegistry.close()
+
+def test_clients_are_shared_per_provider_and_key(mocker, monkeypatch):
+    monkeypatch.setenv("SEGMENT_CONCURRENCY", "3")
+    monkeypatch.setenv("WORKER_CONCURRENCY", "2")
+    create_http_client = mocker.spy(ClientRegistry, 'create_http_client')
+
+    first = ClientRegistry.groq("key")
+
+    assert ClientRegistry.groq("key") is first
+    assert ClientRegistry.groq("other-key") is not first
+    assert ClientRegistry.openai("key") is not first
+    assert create_http_client.call_count == 3
+    create_http_client.assert_any_call(6, False)
+
+def test_the_pool_holds_a_connection_per_concurrent_segment(mocker, monkeypatch):
+    monkeypatch.setenv("PROVIDER_KEEPALIVE_SECONDS", "30")
+    client = mocker.patch('services.transcription.client_registry.httpx.Client')
+    async_client = mocker.patch('services.transcription.client_registry.httpx.AsyncClient')
+
+    assert ClientRegistry.create_http_client(6) is client.return_value
+    assert ClientRegistry.create_http_client(6, asynchronous=True) is async_client.return_value
+
+    limits = client.call_args.kwargs["limits"]
+    assert limits == httpx.Limits(max_connections=6, max_keepalive_connections=6, keepalive_expiry=30.0)
+    assert async_client.call_args.kwargs["limits"] == limits
+
+def test_clients_leave_retries_to_the_provider_scheduler():
+    assert ClientRegistry.openai("key").max_retries == 0
+    assert ClientRegistry.groq("key").max_retries == 0
+    assert ClientRegistry.async_openai("key").max_retries == 0
+    assert ClientRegistry.async_groq("key").max_retries == 0
+
+def test_a_rate_limited_request_reaches_the_scheduler(mocker):
+    mock_sleep = mocker.patch('services.transcription.provider_scheduler.time.sleep')
+    requests = []
+    def respond(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"}, json={"error": {"message": "rate limited"}})
+        return httpx.Response(200, json={"text": "hello"})
+    mocker.patch.object(ClientRegistry, 'create_http_client', return_value=httpx.Client(transport=httpx.MockTransport(respond)))
+    client = ClientRegistry.groq("key")
+    scheduler = ProviderScheduler("groq", max_concurrency=4)
+
+    result = scheduler.run(client.audio.transcriptions.create, file=("part0.m4a", b"audio"), model="whisper-large-v3")
+
+    assert result.text == "hello"
+    assert len(requests) == 2  # one attempt from the SDK per scheduler try
+    mock_sleep.assert_called_once_with(0.0)
+    assert scheduler.limit < 4
+
+def test_groq_streams_the_segment_file(mocker, tmp_path):
+    client = MagicMock()
+    client.audio.transcriptions.create.return_value.text = "hello"
+    mocker.patch('services.transcription.groq_transcription_service.ClientRegistry.groq', return_value=client)
+    segment = tmp_path / "part0.m4a"
+    segment.write_bytes(b"audio")
+
+    result = GroqTranscriptionService("key").transcribe(str(segment), None)
+
+    assert result == "hello"
+    name, body = client.audio.transcriptions.create.call_args.kwargs["file"]
+    assert name == "part0.m4a"
+    assert hasattr(body, "read")  # the open file, not its contents
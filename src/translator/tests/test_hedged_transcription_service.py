@@ -0,0 +1,121 @@
+import time
+import asyncio
+import pytest
+from services.transcription.hedged_transcription_service import HedgedTranscriptionService
+from services.transcription.transcription_factory import TranscriptionFactory
+from services.transcription.transcription_service import TranscriptionService
+from enums.transcription_service_type import TranscriptionServiceType
+
+class FakeService(TranscriptionService):
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def transcribe(self, audio_file_path, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"{self.name} transcript"
+
+    async def transcribe_async(self, audio_file_path, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"{self.name} transcript"
+
+    def file_name_extension(self):
+        return ".txt"
+
+    def provider_name(self):
+        return self.name
+
+@pytest.fixture
+def segment(tmp_path):
+    path = tmp_path / "part0.m4a"
+    path.write_bytes(b"0" * 1024 * 1024)
+    HedgedTranscriptionService._latencies.clear()
+    return str(path)
+
+def test_fast_primary_answers_without_hedging(segment):
+    primary, secondary = FakeService("fast"), FakeService("backup")
+    service = HedgedTranscriptionService(primary, secondary, initial_delay=1.0)
+
+    assert service.transcribe_scheduled(segment, None) == "fast transcript"
+    assert secondary.calls == 0
+    assert len(HedgedTranscriptionService._latencies["fast"]) == 1
+
+def test_hard_failures_fall_back_to_the_secondary(segment):
+    primary, secondary = FakeService("broken", error=RuntimeError("bad request")), FakeService("backup")
+    service = HedgedTranscriptionService(primary, secondary, initial_delay=1.0)
+
+    assert service.transcribe_scheduled(segment, None) == "backup transcript"
+
+def test_slow_primary_is_raced_against_the_secondary(segment):
+    primary, secondary = FakeService("slow", delay=0.5), FakeService("backup")
+    service = HedgedTranscriptionService(primary, secondary, initial_delay=0.05)
+
+    started = time.monotonic()
+    assert service.transcribe_scheduled(segment, None) == "backup transcript"
+    assert time.monotonic() - started < 0.4
+
+def test_the_primary_latency_is_kept_when_it_loses(segment):
+    primary, secondary = FakeService("slow-loser", delay=0.3), FakeService("backup")
+    service = HedgedTranscriptionService(primary, secondary, initial_delay=0.05)
+
+    assert service.transcribe_scheduled(segment, None) == "backup transcript"
+    time.sleep(0.4)
+
+    samples = HedgedTranscriptionService._latencies["slow-loser"]
+    assert len(samples) == 1 and samples[0] >= 0.3
+
+def test_waiting_for_a_thread_does_not_count_towards_the_hedge_delay(segment, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(HedgedTranscriptionService, "_executor", executor)
+    primary, secondary = FakeService("queued"), FakeService("backup")
+    service = HedgedTranscriptionService(primary, secondary, initial_delay=0.1)
+    executor.submit(time.sleep, 0.3)
+
+    assert service.transcribe_scheduled(segment, None) == "queued transcript"
+    assert secondary.calls == 0
+    assert HedgedTranscriptionService._latencies["queued"][0] < 0.1
+
+def test_hedge_delay_follows_the_latency_percentile(segment):
+    service = HedgedTranscriptionService(FakeService("groq"), FakeService("openai"), percentile=90, min_samples=10, initial_delay=30)
+    assert service.hedge_delay(segment) == 30
+
+    for seconds in range(1, 11):
+        service.record_latency(segment, float(seconds))
+
+    assert service.hedge_delay(segment) == 10.0
+
+def test_async_hedge_cancels_the_losing_request(segment):
+    primary, secondary = FakeService("slow-async", delay=5), FakeService("backup")
+    service = HedgedTranscriptionService(primary, secondary, initial_delay=0.05)
+
+    async def run():
+        started = time.monotonic()
+        result = await service.transcribe_scheduled_async(segment, None)
+        return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "backup transcript"
+    assert elapsed < 1
+    # the cancelled primary still leaves a sample of at least the time it ran
+    assert HedgedTranscriptionService._latencies["slow-async"][0] >= 0.05
+
+def test_factory_only_hedges_services_with_the_same_output_format(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "groq-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "openai-key")
+    monkeypatch.setenv("TRANSCRIPTION_HEDGE_SERVICE", "openai")
+
+    hedged = TranscriptionFactory.get_transcription_service(TranscriptionServiceType.GROQ)
+    subtitles = TranscriptionFactory.get_transcription_service(TranscriptionServiceType.OPENAI_SRT)
+
+    assert isinstance(hedged, HedgedTranscriptionService)
+    assert hedged.provider_name() == "groq+openai"
+    assert not isinstance(subtitles, HedgedTranscriptionService)
@@ -0,0 +1,53 @@
+import os
+import json
+import pytest
+from services.storage.job_workspace import JobWorkspace, WorkspaceQuotaExceeded
+
+def test_each_job_gets_its_own_directory_removed_on_exit(tmp_path):
+    with JobWorkspace.create("job/1", str(tmp_path)) as first, JobWorkspace.create("job/1", str(tmp_path)) as second:
+        assert first.path != second.path
+        assert os.path.dirname(first.path) == str(tmp_path / "jobs")
+        (open(os.path.join(first.subdir("audio"), "video.m4a"), "wb")).close()
+
+    assert os.listdir(tmp_path / "jobs") == []
+
+def test_usage_over_the_quota_fails_the_job(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKSPACE_QUOTA_MB", "0.001")
+    workspace = JobWorkspace.create("job1", str(tmp_path))
+    with open(os.path.join(workspace.subdir("audio"), "video.m4a"), "wb") as file:
+        file.write(b"x" * 2048)
+
+    with pytest.raises(WorkspaceQuotaExceeded):
+        workspace.check_quota("download")
+    workspace.cleanup()
+    assert not os.path.exists(workspace.path)
+
+def test_small_jobs_use_tmpfs_when_configured(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKSPACE_TMPFS_PATH", str(tmp_path / "shm"))
+    monkeypatch.setenv("WORKSPACE_TMPFS_MAX_MB", "1")
+
+    small = JobWorkspace.create("small", str(tmp_path / "disk"), expected_bytes=1024)
+    large = JobWorkspace.create("large", str(tmp_path / "disk"), expected_bytes=10 * 1024 * 1024)
+    unknown = JobWorkspace.create("unknown", str(tmp_path / "disk"))
+
+    assert small.path.startswith(str(tmp_path / "shm"))
+    assert small.quota_bytes == 1024 * 1024
+    assert large.path.startswith(str(tmp_path / "disk"))
+    assert unknown.path.startswith(str(tmp_path / "disk"))
+
+def test_recovery_removes_workspaces_of_dead_workers_only(tmp_path):
+    running = JobWorkspace.create("running", str(tmp_path))
+    crashed = JobWorkspace.create("crashed", str(tmp_path))
+    restarted = JobWorkspace.create("restarted", str(tmp_path))
+    for workspace, pid in ((running, os.getppid()), (crashed, 2 ** 22 + 1)):
+        owner_path = os.path.join(workspace.path, JobWorkspace.OWNER_FILE)
+        with open(owner_path) as file:
+            owner = json.load(file)
+        owner["pid"] = pid
+        with open(owner_path, "w") as file:
+            json.dump(owner, file)
+
+    removed = JobWorkspace.recover(str(tmp_path))
+
+    assert sorted(removed) == sorted([crashed.path, restarted.path])
+    assert os.path.exists(running.path)
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+from services.transformation.map_reduce import TranscriptMapReduce
+
+class FakeChain:
+    # "summarizes" by keeping the first word of the first and last sentence it is given
+    def __init__(self):
+        self.invoked = []
+        self.batched = []
+
+    def summarize(self, inputs):
+        sentences = [sentence for sentence in inputs["transcript"].split(".") if sentence.strip()]
+        words = [sentence.split()[0] for sentence in sentences]
+        return SimpleNamespace(content=". ".join(dict.fromkeys([words[0], words[-1]])) + ".")
+
+    def invoke(self, inputs):
+        self.invoked.append(inputs)
+        return self.summarize(inputs)
+
+    def batch(self, inputs, config=None):
+        self.batched.append((inputs, config))
+        return [self.summarize(item) for item in inputs]
+
+def test_short_transcripts_use_a_single_call(monkeypatch):
+    monkeypatch.setenv("TRANSFORM_MAX_INPUT_TOKENS", "1000")
+    chain = FakeChain()
+
+    result = TranscriptMapReduce.invoke(chain, "Hello there friend. General Kenobi.", lambda text: {"transcript": text})
+
+    assert result == "Hello. General."
+    assert chain.batched == []
+    assert len(chain.invoked) == 1
+
+def test_long_transcripts_are_mapped_concurrently_then_reduced(monkeypatch):
+    monkeypatch.setenv("TRANSFORM_MAX_INPUT_TOKENS", "100")
+    monkeypatch.setenv("TRANSFORM_CHUNK_TOKENS", "50")
+    monkeypatch.setenv("TRANSFORM_MAP_CONCURRENCY", "3")
+    chain = FakeChain()
+    transcript = " ".join(f"Sentence{i} has several more words in it." for i in range(100))
+
+    result = TranscriptMapReduce.invoke(chain, transcript, lambda text: {"transcript": text, "length": 3000})
+
+    map_inputs, config = chain.batched[0]
+    assert len(map_inputs) > 20
+    assert config == {"max_concurrency": 3}
+    assert all(item["length"] == 3000 for item in map_inputs)
+    assert all(TranscriptMapReduce.estimate_tokens(item["transcript"]) <= 50 for item in map_inputs)
+    # the final call sees reduced partial results, not the raw transcript
+    assert len(chain.batched) > 1
+    assert len(chain.invoked) == 1
+    assert TranscriptMapReduce.estimate_tokens(chain.invoked[0]["transcript"]) <= 100
+    assert result == "Sentence0. Sentence99."
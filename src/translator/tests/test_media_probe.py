@@ -0,0 +1,40 @@
+import json
+from services.audio.media_probe import MediaProbe
+
+def test_probe_with_ffprobe_reads_stream_headers(mocker):
+    mock_subprocess = mocker.patch('subprocess.run')
+    mock_subprocess.return_value.stdout = json.dumps({
+        "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "3725.480000", "bit_rate": "129000"},
+        "streams": [
+            {"codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}},
+            {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2}
+        ]
+    })
+
+    info = MediaProbe.probe_with_ffprobe('talk.m4a')
+
+    assert info.duration_seconds == 3725.48
+    assert info.duration_ms == 3725480
+    assert info.bit_rate == 129000
+    assert info.audio_codec == "aac"
+    assert info.sample_rate == 44100
+    assert info.channels == 2
+    assert info.has_video is False  # cover art isn't a video track
+
+def test_probe_with_ffmpeg_parses_header_summary(mocker):
+    mock_subprocess = mocker.patch('subprocess.run')
+    mock_subprocess.return_value.stderr = (
+        "Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'talk.mp4':\n"
+        "  Duration: 01:02:05.48, start: 0.000000, bitrate: 1523 kb/s\n"
+        "  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p, 1280x720, 1390 kb/s, 25 fps\n"
+        "  Stream #0:1[0x2](und): Audio: aac (LC) (mp4a / 0x6134706D), 48000 Hz, stereo, fltp, 128 kb/s (default)\n"
+    )
+
+    info = MediaProbe.probe_with_ffmpeg('talk.mp4')
+
+    assert info.duration_seconds == 3725.48
+    assert info.bit_rate == 1523000
+    assert info.audio_codec == "aac"
+    assert info.sample_rate == 48000
+    assert info.channels == 2
+    assert info.has_video is True
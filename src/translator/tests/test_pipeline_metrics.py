@@ -0,0 +1,76 @@
+import pytest
+from prometheus_client import REGISTRY
+from services.metrics.pipeline_metrics import PipelineMetrics
+from services.audio.srt_adjuster import SrtAdjuster
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_track_stage_times_the_stage(mocker):
+    mocker.patch('services.metrics.pipeline_metrics.time.perf_counter', side_effect=[10.0, 12.5])
+    count = sample('scribe_stage_duration_seconds_count', stage='test_track')
+    total = sample('scribe_stage_duration_seconds_sum', stage='test_track')
+
+    with PipelineMetrics.track_stage("test_track"):
+        pass
+
+    assert sample('scribe_stage_duration_seconds_count', stage='test_track') == count + 1
+    assert sample('scribe_stage_duration_seconds_sum', stage='test_track') == total + 2.5
+    assert sample('scribe_stage_duration_seconds_bucket', stage='test_track', le='1.0') == 0
+
+def test_failed_stages_are_counted_and_still_timed():
+    errors = sample('scribe_stage_errors_total', stage='test_failing')
+    count = sample('scribe_stage_duration_seconds_count', stage='test_failing')
+
+    @PipelineMetrics.timed("test_failing")
+    def fail():
+        raise RuntimeError("ffmpeg exited with 1")
+
+    with pytest.raises(RuntimeError):
+        fail()
+
+    assert sample('scribe_stage_errors_total', stage='test_failing') == errors + 1
+    assert sample('scribe_stage_duration_seconds_count', stage='test_failing') == count + 1
+
+def test_timed_returns_the_result_and_keeps_the_name():
+    @PipelineMetrics.timed("test_timed")
+    def download(url):
+        return f"/tmp/{url}"
+
+    assert download("a") == "/tmp/a"
+    assert download.__name__ == "download"
+    assert sample('scribe_stage_errors_total', stage='test_timed') == 0
+
+def test_counters_and_job_status():
+    bytes_before = sample('scribe_stage_bytes_total', stage='test_bytes')
+    jobs_before = sample('scribe_jobs_total', status='finished')
+
+    PipelineMetrics.record_bytes("test_bytes", 1024)
+    PipelineMetrics.record_job("finished")
+
+    assert sample('scribe_stage_bytes_total', stage='test_bytes') == bytes_before + 1024
+    assert sample('scribe_jobs_total', status='finished') == jobs_before + 1
+
+def test_subtitle_merging_is_reported_as_the_adjust_stage():
+    count = sample('scribe_stage_duration_seconds_count', stage='adjust')
+
+    SrtAdjuster.merge([(0, "1\n00:00:01,000 --> 00:00:02,000\nhello\n")])
+
+    assert sample('scribe_stage_duration_seconds_count', stage='adjust') == count + 1
+
+def test_the_server_is_only_started_on_a_positive_port(mocker, monkeypatch):
+    start_http_server = mocker.patch('services.metrics.pipeline_metrics.start_http_server')
+
+    monkeypatch.setenv("METRICS_PORT", "0")
+    PipelineMetrics.start_server()
+    start_http_server.assert_not_called()
+
+    monkeypatch.setenv("METRICS_PORT", "9200")
+    PipelineMetrics.start_server()
+    start_http_server.assert_called_once_with(9200)
+
+def test_a_port_in_use_does_not_stop_the_worker(mocker, monkeypatch):
+    mocker.patch('services.metrics.pipeline_metrics.start_http_server', side_effect=OSError("Address already in use"))
+    monkeypatch.setenv("METRICS_PORT", "9200")
+
+    PipelineMetrics.start_server()
@@ -0,0 +1,73 @@
+import json
+import pytest
+from services.audio.playlist_expander import PlaylistExpander
+from messages.transcription_message import TranscriptionMessage
+
+@pytest.mark.parametrize("url,expected", [
+    ("https://www.youtube.com/playlist?list=PL123", True),
+    ("https://www.youtube.com/@somechannel", True),
+    ("https://www.youtube.com/channel/UC123/videos", True),
+    ("https://vimeo.com/showcase/123", True),
+    ("https://www.youtube.com/watch?v=abc123&list=PL123", False),
+    ("https://vimeo.com/123456", False),
+    ("https://drive.google.com/file/d/abc123/view", False),
+])
+def test_is_collection(url, expected):
+    assert PlaylistExpander.is_collection(url) == expected
+
+def test_a_channel_home_page_is_listed_from_its_videos_tab():
+    assert PlaylistExpander.listing_url("https://www.youtube.com/@somechannel") == "https://www.youtube.com/@somechannel/videos"
+    assert PlaylistExpander.listing_url("https://www.youtube.com/@somechannel/streams") == "https://www.youtube.com/@somechannel/streams"
+    assert PlaylistExpander.listing_url("https://www.youtube.com/playlist?list=PL123") == "https://www.youtube.com/playlist?list=PL123"
+
+def test_entries_are_flattened_and_deduplicated(monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    info = {
+        "title": "Back catalog",
+        "entries": [
+            {"id": "a", "title": "First", "url": "https://www.youtube.com/watch?v=a", "duration": 61.5},
+            None,
+            {"_type": "playlist", "entries": [
+                {"id": "b", "title": "Second", "url": "https://www.youtube.com/watch?v=b"},
+                {"id": "a", "title": "First again", "url": "https://www.youtube.com/watch?v=a"},
+            ]},
+            {"id": "c", "title": "Private video", "url": None},
+        ]
+    }
+
+    title, entries = PlaylistExpander._parse(info, "https://www.youtube.com/playlist?list=PL123")
+
+    assert title == "Back catalog"
+    assert entries == [
+        {"id": "a", "title": "First", "url": "https://www.youtube.com/watch?v=a", "duration": 61},
+        {"id": "b", "title": "Second", "url": "https://www.youtube.com/watch?v=b", "duration": 0},
+    ]
+
+def test_the_subprocess_lists_entries_without_resolving_videos(mocker, monkeypatch):
+    monkeypatch.setenv("YTDLP_ENGINE", "subprocess")
+    monkeypatch.setenv("PLAYLIST_MAX_ENTRIES", "50")
+    mock_subprocess = mocker.patch('subprocess.run')
+    mock_subprocess.return_value.stdout = '{"title": "Channel", "entries": [{"id": "a", "url": "https://www.youtube.com/watch?v=a"}]}'
+
+    title, entries = PlaylistExpander.expand("https://www.youtube.com/@somechannel")
+
+    assert [entry["id"] for entry in entries] == ["a"]
+    mock_subprocess.assert_called_once_with(
+        ['yt-dlp', '--flat-playlist', '--dump-single-json', '--playlist-end', '50', 'https://www.youtube.com/@somechannel/videos'],
+        check=True, capture_output=True, text=True
+    )
+
+def test_the_batch_carries_what_the_api_needs_to_queue_the_children():
+    message = TranscriptionMessage(jobId="parent", transcriptionType="groq", transform="summarize", transforms=["summarize", "keywords"],
+                                   isFile=False, content="https://www.youtube.com/playlist?list=PL123", userId="user1")
+    entries = [{"id": "a", "title": "First", "url": "https://www.youtube.com/watch?v=a", "duration": 61}]
+
+    update = PlaylistExpander.batch(message, "Back catalog", entries).dict()
+
+    json.dumps(update)  # published as is
+    assert update["childCount"] == 1
+    assert update["children"][0] == {"jobId": PlaylistExpander.child_job_id("parent", "a"), "videoId": "a", "title": "First",
+                                     "url": "https://www.youtube.com/watch?v=a", "duration": 61}
+    assert update["children"][0]["jobId"] != "parent"
+    assert (update["userId"], update["transcriptionType"], update["transform"]) == ("user1", "groq", "summarize")
+    assert update["transforms"] == ["summarize", "keywords"]
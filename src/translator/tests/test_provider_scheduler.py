@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import MagicMock
+from services.transcription.provider_scheduler import ProviderScheduler
+
+class FakeApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(status_code=status_code, headers=headers or {})
+
+class APIConnectionError(Exception):
+    pass
+
+def test_rate_limited_requests_are_retried(mocker):
+    mock_sleep = mocker.patch('services.transcription.provider_scheduler.time.sleep')
+    scheduler = ProviderScheduler("test", max_concurrency=4)
+    func = MagicMock(side_effect=[FakeApiError(429, {"retry-after": "2"}), "transcript"])
+
+    assert scheduler.run(func, "segment.m4a", None) == "transcript"
+
+    assert func.call_count == 2
+    mock_sleep.assert_called_once_with(2.0)
+    assert scheduler.limit < 4  # concurrency backs off after a 429
+
+def test_connection_errors_are_retried_with_jittered_backoff(mocker):
+    mock_sleep = mocker.patch('services.transcription.provider_scheduler.time.sleep')
+    scheduler = ProviderScheduler("test", base_delay=1.0)
+    func = MagicMock(side_effect=[APIConnectionError(), FakeApiError(503), "transcript"])
+
+    assert scheduler.run(func) == "transcript"
+
+    assert mock_sleep.call_count == 2
+    assert 0 <= mock_sleep.call_args_list[0][0][0] <= 1.0
+    assert 0 <= mock_sleep.call_args_list[1][0][0] <= 2.0
+
+def test_non_retryable_errors_are_raised_immediately(mocker):
+    mocker.patch('services.transcription.provider_scheduler.time.sleep')
+    scheduler = ProviderScheduler("test")
+    func = MagicMock(side_effect=FakeApiError(400))
+
+    with pytest.raises(FakeApiError):
+        scheduler.run(func)
+
+    assert func.call_count == 1
+    assert scheduler.in_flight == 0
+
+def test_retries_are_bounded(mocker):
+    mocker.patch('services.transcription.provider_scheduler.time.sleep')
+    scheduler = ProviderScheduler("test", max_retries=2)
+    func = MagicMock(side_effect=FakeApiError(500))
+
+    with pytest.raises(FakeApiError):
+        scheduler.run(func)
+
+    assert func.call_count == 3
+
+def test_schedulers_are_shared_per_provider():
+    assert ProviderScheduler.for_provider("groq") is ProviderScheduler.for_provider("groq")
+    assert ProviderScheduler.for_provider("groq") is not ProviderScheduler.for_provider("openai")
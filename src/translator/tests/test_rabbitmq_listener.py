@@ -0,0 +1,121 @@
+import logging
+import threading
+import pika
+import pytest
+from unittest.mock import MagicMock
+from concurrent.futures import ThreadPoolExecutor
+from listeners.rabbitmq_listener import RabbitMQListener
+
+BODY = b'{"jobId": "job1", "transcriptionType": "groq", "transform": "none", "isFile": false, "content": "https://example.com/a", "userId": "1"}'
+
+@pytest.fixture
+def listener(mocker):
+    mocker.patch.object(RabbitMQListener, 'establish_connection')
+    mocker.patch('listeners.rabbitmq_listener.time.sleep')
+    listener = RabbitMQListener()
+    listener.connection = MagicMock()
+    listener.channel = MagicMock()
+    listener.channel.is_closed = False
+    listener.connection_thread = threading.current_thread()
+    return listener
+
+def run_on_worker(target, *args):
+    worker = threading.Thread(target=target, args=args)
+    worker.start()
+    worker.join()
+
+def test_ack_and_publish_from_a_worker_are_handed_to_the_connection_thread(listener):
+    listener.handler = lambda message: {"jobId": message.jobId, "status": "finished"}
+    ch = MagicMock()
+
+    run_on_worker(listener.process_message, ch, MagicMock(delivery_tag=7), MagicMock(headers=None), BODY)
+
+    ch.basic_ack.assert_not_called()
+    listener.channel.basic_publish.assert_not_called()
+    listener.connection.add_callback_threadsafe.assert_called_once()
+
+    listener.connection.add_callback_threadsafe.call_args.args[0]()  # the I/O loop runs it
+
+    listener.channel.basic_publish.assert_called_once()
+    assert b'"finished"' in listener.channel.basic_publish.call_args.kwargs["body"].encode()
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+
+def test_a_failed_job_is_retried_on_the_connection_thread(listener):
+    listener.handler = MagicMock(side_effect=RuntimeError("download failed"))
+    ch = MagicMock()
+
+    run_on_worker(listener.process_message, ch, MagicMock(delivery_tag=7), MagicMock(headers=None), BODY)
+
+    ch.basic_publish.assert_not_called()
+    listener.connection.add_callback_threadsafe.call_args.args[0]()
+
+    ch.basic_publish.assert_called_once()
+    assert ch.basic_publish.call_args.kwargs["properties"].headers == {"x-retry-count": 1}
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+
+def test_updates_published_from_a_worker_are_handed_to_the_connection_thread(listener):
+    run_on_worker(listener.publish_job_update, {"jobId": "job1", "status": "in_progress"})
+
+    listener.channel.basic_publish.assert_not_called()
+    listener.connection.add_callback_threadsafe.call_args.args[0]()
+    listener.channel.basic_publish.assert_called_once()
+
+def test_a_second_job_is_consumed_while_the_first_is_running(listener):
+    started = [threading.Event(), threading.Event()]
+    release = threading.Event()
+
+    def handler(message):
+        started[int(message.jobId[-1]) - 1].set()
+        release.wait(5)
+        return {"jobId": message.jobId, "status": "finished"}
+
+    listener.handler = handler
+    listener.executor = ThreadPoolExecutor(max_workers=2)
+    listener.callback(MagicMock(), MagicMock(delivery_tag=1), MagicMock(headers=None), BODY)
+    listener.callback(MagicMock(), MagicMock(delivery_tag=2), MagicMock(headers=None), BODY.replace(b'job1', b'job2'))
+
+    try:
+        assert started[0].wait(5)
+        assert started[1].wait(5)  # the first job is still blocked
+    finally:
+        release.set()
+        listener.executor.shutdown(wait=True)
+    assert listener.connection.add_callback_threadsafe.call_count == 2
+
+def test_a_failed_publish_while_consuming_ends_consuming_instead_of_reconnecting(listener):
+    listener.channel.basic_publish.side_effect = pika.exceptions.StreamLostError("connection reset")
+    RabbitMQListener.establish_connection.reset_mock()
+    ch = MagicMock()
+
+    with pytest.raises(pika.exceptions.AMQPError):
+        listener.complete_message(ch, 7, {"jobId": "job1", "status": "finished"})
+
+    RabbitMQListener.establish_connection.assert_not_called()
+    ch.basic_ack.assert_not_called()
+
+def test_listen_consumes_again_on_a_new_connection_after_it_drops(listener, mocker):
+    channels = [MagicMock(), MagicMock()]
+    channels[0].start_consuming.side_effect = pika.exceptions.StreamLostError("connection reset")
+    def connect():
+        listener.channel = channels.pop(0) if channels else listener.channel
+        listener.connection = MagicMock()
+    RabbitMQListener.establish_connection.side_effect = connect
+    RabbitMQListener.establish_connection.reset_mock()
+    first = channels[0]
+
+    listener.listen(MagicMock())
+
+    assert RabbitMQListener.establish_connection.call_count == 2
+    first.basic_consume.assert_called_once()
+    listener.channel.basic_consume.assert_called_once()
+    listener.channel.start_consuming.assert_called_once()
+
+def test_a_failed_hand_off_from_a_worker_is_logged(listener, caplog):
+    listener.handler = lambda message: {"jobId": message.jobId, "status": "finished"}
+    listener.connection.add_callback_threadsafe.side_effect = pika.exceptions.ConnectionWrongStateError("connection closed")
+
+    with caplog.at_level(logging.ERROR):
+        run_on_worker(listener.process_message, MagicMock(), MagicMock(delivery_tag=7), MagicMock(headers=None), BODY)
+
+    listener.connection.add_callback_threadsafe.assert_called_once()  # the result isn't turned into a retry
+    assert "Failed to hand the result of" in caplog.text
@@ -0,0 +1,46 @@
+from services.audio.segment_progress import SegmentProgress
+from services.audio.srt_adjuster import SrtAdjuster
+from services.audio.vtt_adjuster import VttAdjuster
+
+def test_segments_are_released_in_order_as_the_gaps_fill():
+    published = []
+    progress = SegmentProgress(3, publish=published.append)
+
+    assert progress.complete(2, 1200, 1800, "third") == []
+    assert progress.complete(1, 600, 1200, "second") == []
+    progress.complete(0, 0, 600, "first")
+
+    assert [(update.index, update.text) for update in published] == [(0, "first"), (1, "second"), (2, "third")]
+    assert [update.final for update in published] == [False, False, True]
+    assert (published[1].start_ms, published[1].end_ms) == (600, 1200)
+
+def test_overlapping_segments_only_send_the_new_words():
+    progress = SegmentProgress(2, overlapping=True)
+
+    progress.complete(0, 0, 602000, "we should ship the release on friday after the final review")
+    updates = progress.complete(1, 600000, 900000, "after the final review we will announce it")
+
+    assert updates[0].text == "we will announce it"
+    assert updates[0].final
+
+def test_subtitle_updates_are_shifted_to_the_start_of_their_segment():
+    published = []
+    progress = SegmentProgress(2, publish=published.append, adjuster=SrtAdjuster)
+
+    progress.complete(1, 600000, 900000, "1\n00:00:01,000 --> 00:00:02,500\nsecond\n")
+    progress.complete(0, 0, 600000, "1\n00:00:01,000 --> 00:00:02,000\nfirst\n")
+
+    assert published[0].text == "1\n00:00:01,000 --> 00:00:02,000\nfirst\n"
+    # numbered on from the first update, so the updates concatenate into one file
+    assert published[1].text == "\n2\n00:10:01,000 --> 00:10:02,500\nsecond\n"
+    merged = SrtAdjuster.parse("".join(update.text for update in published))
+    assert [(cue.start_ms, cue.text) for cue in merged] == [(1000, "first"), (601000, "second")]
+
+def test_only_the_first_vtt_update_carries_the_header():
+    progress = SegmentProgress(2, adjuster=VttAdjuster)
+
+    first = progress.complete(0, 0, 600000, "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nfirst\n")
+    second = progress.complete(1, 600000, 900000, "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nsecond\n")
+
+    assert first[0].text.startswith("WEBVTT")
+    assert second[0].text == "\n00:10:01.000 --> 00:10:02.000\nsecond\n"
@@ -0,0 +1,26 @@
+import numpy as np
+from services.audio.split_planner import SplitPlanner
+
+def test_plan_from_envelope_cuts_in_nearest_pause():
+    # 30 seconds of speech at 50ms frames with a one second pause starting at 11s
+    envelope = np.full(600, 1000.0)
+    envelope[220:240] = 5.0
+
+    ranges = SplitPlanner.plan_from_envelope(envelope, frame_ms=50, segment_length_ms=10000, search_window_ms=3000)
+
+    assert ranges[0][0] == 0
+    assert 11000 <= ranges[0][1] <= 12000
+    assert ranges[-1][1] == 30000
+    assert all(start < end for start, end in ranges)
+
+def test_plan_from_envelope_overlaps_following_segments():
+    envelope = np.full(600, 1000.0)
+
+    ranges = SplitPlanner.plan_from_envelope(envelope, frame_ms=50, segment_length_ms=10000, search_window_ms=1000, overlap_ms=2000)
+
+    assert ranges == [(0, 10000), (8000, 20000), (18000, 30000)]
+
+def test_plan_from_envelope_keeps_short_audio_whole():
+    ranges = SplitPlanner.plan_from_envelope(np.ones(100), frame_ms=50, segment_length_ms=10000, search_window_ms=1000)
+
+    assert ranges == [(0, 5000)]
@@ -0,0 +1,51 @@
+from services.audio.srt_adjuster import SrtAdjuster
+from services.audio.vtt_adjuster import VttAdjuster
+
+FIRST_SRT = """1
+00:00:01,000 --> 00:00:04,500
+Hello there.
+
+2
+00:00:05,000 --> 00:09:58,250
+General Kenobi.
+"""
+
+# The second segment starts with silence, its first cue begins well after the previous segment's last cue ended
+SECOND_SRT = """1
+00:00:12,000 --> 00:00:15,000
+You are a bold one.
+"""
+
+def test_srt_cues_are_shifted_by_their_segment_offset_and_renumbered():
+    merged = SrtAdjuster.merge([(0, FIRST_SRT), (600000, SECOND_SRT)])
+
+    assert merged == """1
+00:00:01,000 --> 00:00:04,500
+Hello there.
+
+2
+00:00:05,000 --> 00:09:58,250
+General Kenobi.
+
+3
+00:10:12,000 --> 00:10:15,000
+You are a bold one.
+"""
+
+def test_vtt_keeps_the_header_and_cue_settings():
+    first = "WEBVTT\n\n00:00:01.000 --> 00:00:02.000 align:start\nHello there.\n"
+    second = "WEBVTT\n\nNOTE generated\n\n00:01.500 --> 00:03.000\nGeneral Kenobi.\n"
+
+    merged = VttAdjuster.merge([(0, first), (3723000, second)])
+
+    assert merged == """WEBVTT
+
+00:00:01.000 --> 00:00:02.000 align:start
+Hello there.
+
+01:02:04.500 --> 01:02:06.000
+General Kenobi.
+"""
+
+def test_empty_segments_are_skipped():
+    assert SrtAdjuster.merge([(0, ""), (1000, "1\n00:00:00,000 --> 00:00:01,000\nHi\n")]) == "1\n00:00:01,000 --> 00:00:02,000\nHi\n"
@@ -0,0 +1,54 @@
+from services.cache.transcript_cache import TranscriptCache
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"), max_bytes=1024)
+    key = TranscriptCache.build_key("abc", "groq", None)
+
+    cache.put(key, "hello world")
+
+    assert cache.get(key) == "hello world"
+    assert cache.get(TranscriptCache.build_key("abc", "openai", None)) is None
+
+def test_empty_transcripts_are_not_cached(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"), max_bytes=1024)
+
+    cache.put("key", "")
+
+    assert cache.get("key") is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path, mocker):
+    mocker.patch('services.cache.transcript_cache.time.time', side_effect=range(100))
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"), max_bytes=20)
+
+    cache.put("first", "a" * 8)
+    cache.put("second", "b" * 8)
+    cache.get("first")  # first is now more recent than second
+    cache.put("third", "c" * 8)
+
+    assert cache.get("first") == "a" * 8
+    assert cache.get("second") is None
+    assert cache.get("third") == "c" * 8
+
+def test_hash_file_depends_on_content(tmp_path):
+    first = tmp_path / "first.m4a"
+    second = tmp_path / "second.m4a"
+    first.write_bytes(b"audio")
+    second.write_bytes(b"audio")
+
+    assert TranscriptCache.hash_file(str(first)) == TranscriptCache.hash_file(str(second))
+
+    second.write_bytes(b"other audio")
+
+    assert TranscriptCache.hash_file(str(first)) != TranscriptCache.hash_file(str(second))
+
+def test_sources_point_at_the_audio_transcript(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"), max_bytes=1024)
+    source_key = TranscriptCache.source_key("https://youtube.com/watch?v=1", "groq", None, None)
+    audio_key = TranscriptCache.build_key("abc", "groq", None)
+
+    cache.put_source(source_key, {"title": "Video", "duration": 5, "formats": []}, audio_key)
+    assert cache.get_source(source_key) is None  # the transcript itself isn't cached yet
+
+    cache.put(audio_key, "hello world")
+    assert cache.get_source(source_key) == ({"title": "Video", "duration": 5}, "hello world")
+    assert TranscriptCache.source_key("incoming/blob.mp4", "groq", None, None) is None
@@ -0,0 +1,31 @@
+from services.audio.transcript_stitcher import TranscriptStitcher
+
+def test_stitch_removes_duplicated_overlap_words():
+    first = "we should ship the release on friday after the final review"
+    second = "after the final review we will announce it"
+
+    result = TranscriptStitcher.stitch([first, second])
+
+    assert result == "we should ship the release on friday after the final review we will announce it"
+
+def test_stitch_drops_words_mangled_at_the_cut():
+    # the overlap starts mid-word in the second segment and ends mid-word in the first
+    first = "the quarterly numbers were better than expec"
+    second = "bers were better than expected across every region"
+
+    result = TranscriptStitcher.stitch([first, second])
+
+    assert result == "the quarterly numbers were better than expected across every region"
+
+def test_stitch_matches_across_punctuation_and_case():
+    first = "Thanks everyone. Let's get started."
+    second = "let's get started, first item is hiring"
+
+    result = TranscriptStitcher.stitch([first, second])
+
+    assert result == "Thanks everyone. Let's get started. first item is hiring"
+
+def test_stitch_joins_without_overlap_and_skips_missing_segments():
+    result = TranscriptStitcher.stitch(["hello there", None, "", "general kenobi"])
+
+    assert result == "hello there general kenobi"
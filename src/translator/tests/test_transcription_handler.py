@@ -0,0 +1,122 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from enums.job_status import JobStatus
+from enums.transcription_transformation import TranscriptionTransformation
+
+@pytest.fixture
+def handler(mocker, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TRANSCRIPT_CACHE_MAX_MB", "0")
+    monkeypatch.setenv("METRICS_PORT", "0")
+    mocker.patch('transcription_handler.RabbitMQListener')
+    from transcription_handler import TranscriptionHandler
+    return TranscriptionHandler()
+
+def fake_transformations(mocker, failing=()):
+    def get_transformation_service(transform):
+        service = MagicMock()
+        if transform in failing:
+            service.transform.side_effect = RuntimeError("model unavailable")
+        else:
+            service.transform.side_effect = lambda transcript, metadata: f"{transform.value}: {transcript}"
+        return service
+    mocker.patch('services.transformation.transformation_runner.TransformationFactory.get_transformation_service', side_effect=get_transformation_service)
+
+def test_single_transform_is_returned_without_publishing(handler, mocker):
+    fake_transformations(mocker)
+
+    result = handler.run_transformations([TranscriptionTransformation.SUMMARIZE], "hello", {}, "job1")
+
+    assert result.status == JobStatus.FINISHED.value
+    assert result.transformed == "summarize: hello"
+    assert result.transform == "summarize"
+    handler.listener.publish_job_update.assert_not_called()
+
+def test_every_transform_result_is_published_once_and_the_job_finishes_once(handler, mocker):
+    fake_transformations(mocker)
+    transforms = [TranscriptionTransformation.SUMMARIZE, TranscriptionTransformation.KEYWORDS, TranscriptionTransformation.YOUTUBEHIGHLIGHTS]
+
+    result = handler.run_transformations(transforms, "hello", {}, "job1")
+
+    published = [call.args[0] for call in handler.listener.publish_job_update.call_args_list]
+    assert sorted(update["transform"] for update in published) == ["keywords", "summarize", "youtubehighlights"]
+    assert all(update["status"] == JobStatus.TRANSFORMED.value for update in published)
+    assert {update["transform"]: update["transformed"] for update in published}["keywords"] == "keywords: hello"
+    assert result.status == JobStatus.FINISHED.value
+    assert result.transform is None and result.transformed is None
+
+def test_failed_transforms_fail_the_job_after_publishing_the_rest(handler, mocker):
+    fake_transformations(mocker, failing=[TranscriptionTransformation.KEYWORDS])
+    transforms = [TranscriptionTransformation.SUMMARIZE, TranscriptionTransformation.KEYWORDS]
+
+    result = handler.run_transformations(transforms, "hello", {}, "job1")
+
+    published = [call.args[0] for call in handler.listener.publish_job_update.call_args_list]
+    assert [(update["transform"], update["status"]) for update in published] == [("summarize", JobStatus.TRANSFORMED.value)]
+    assert result.status == JobStatus.FAILED.value
+    assert result.transform == "keywords"
+    assert "model unavailable" in result.error
+
+def test_transcripts_are_only_written_when_persisting_is_enabled(handler, mocker, monkeypatch, tmp_path):
+    fake_transformations(mocker)
+    audio_path = tmp_path / "audio" / "video.m4a"
+    audio_path.parent.mkdir()
+    audio_path.write_bytes(b"audio")
+    mocker.patch('transcription_handler.AudioDownloader.download_audio_with_info', return_value=({"title": "Video", "duration": 5}, str(audio_path)))
+    mocker.patch('transcription_handler.AudioService.transcribe_audio', return_value="hello")
+    service = MagicMock()
+    service.file_name_extension.return_value = ".txt"
+    mocker.patch('transcription_handler.TranscriptionFactory.get_transcription_service', return_value=service)
+
+    result = handler.process_audio("https://youtube.com/watch?v=1", TranscriptionTransformation.NONE, str(tmp_path), None, None, MagicMock(), "job1")
+    assert result.transformed == "none: hello"
+    assert not (tmp_path / "transcript").exists()
+
+    audio_path.write_bytes(b"audio")
+    monkeypatch.setenv("PERSIST_TRANSCRIPTS", "true")
+    handler.process_audio("https://youtube.com/watch?v=1", TranscriptionTransformation.NONE, str(tmp_path), None, None, MagicMock(), "job1")
+    assert (tmp_path / "transcript" / "video_transcript.txt").read_text() == "hello"
+
+def test_jobs_run_in_their_own_workspace_which_is_removed_when_they_fail(handler, mocker, monkeypatch, tmp_path):
+    from messages.transcription_message import TranscriptionMessage
+    monkeypatch.setenv("PROCESSING_PATH", str(tmp_path / "incoming"))
+    download_paths = []
+
+    def download_audio_with_info(url, path, max_length_minutes=None):
+        download_paths.append(path)
+        os.makedirs(path, exist_ok=True)
+        audio_path = os.path.join(path, "video.m4a")
+        open(audio_path, "wb").close()
+        return {"title": "Video", "duration": 5}, audio_path
+    mocker.patch('transcription_handler.AudioDownloader.download_audio_with_info', side_effect=download_audio_with_info)
+    mocker.patch('transcription_handler.AudioService.transcribe_audio', side_effect=RuntimeError("provider down"))
+    mocker.patch('transcription_handler.TranscriptionFactory.get_transcription_service')
+    message = TranscriptionMessage(jobId="job1", transcriptionType="groq", transform="none", isFile=False, content="https://youtube.com/watch?v=1", userId="user1")
+
+    with pytest.raises(RuntimeError):
+        handler.process_transcription_message(message)
+
+    assert download_paths[0].startswith(str(tmp_path / "incoming" / "jobs" / "job1-"))
+    assert os.listdir(tmp_path / "incoming" / "jobs") == []
+
+def test_playlists_expand_into_one_child_job_per_video(handler, mocker):
+    from messages.transcription_message import TranscriptionMessage
+    mocker.patch('transcription_handler.PlaylistExpander.expand', return_value=("Back catalog", [
+        {"id": "a", "title": "First", "url": "https://www.youtube.com/watch?v=a", "duration": 60},
+        {"id": "b", "title": "Second", "url": "https://www.youtube.com/watch?v=b", "duration": 90},
+    ]))
+    process_audio = mocker.patch.object(handler, 'process_audio')
+    message = TranscriptionMessage(jobId="parent", transcriptionType="groq", transform="summarize", isFile=False,
+                                   content="https://www.youtube.com/playlist?list=PL123", userId="user1")
+
+    batch = handler.process_transcription_message(message)
+
+    process_audio.assert_not_called()
+    assert batch.status == JobStatus.EXPANDED.value
+    assert [child.videoId for child in batch.children] == ["a", "b"]
+    assert batch.childCount == 2
+    assert batch.userId == "user1"
+    # a redelivered parent lists the same child jobs, the API creates and queues them once
+    again = handler.process_transcription_message(message)
+    assert [child.jobId for child in again.children] == [child.jobId for child in batch.children]
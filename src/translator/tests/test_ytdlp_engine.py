@@ -0,0 +1,68 @@
+import pytest
+import yt_dlp
+from services.audio.ytdlp_engine import YtDlpEngine
+
+class FakeYoutubeDL:
+    created = []
+
+    def __init__(self, params):
+        self.params = params
+        self.hooks = []
+        self.closed = False
+        self.fail = False
+        FakeYoutubeDL.created.append(self)
+
+    def add_progress_hook(self, hook):
+        self.hooks.append(hook)
+
+    def extract_info(self, url, download):
+        if self.fail:
+            raise yt_dlp.utils.DownloadError("Video unavailable")
+        for hook in self.hooks:
+            hook({"status": "finished", "downloaded_bytes": 10})
+        output = self.params["outtmpl"]["default"].replace("%(title)s.%(ext)s", "Test Video.webm")
+        return {"id": "abc123", "title": "Test Video", "duration": 120, "formats": [{}] * 40,
+                "requested_downloads": [{"filepath": output.replace(".webm", ".m4a")}]}
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def engine(mocker):
+    FakeYoutubeDL.created = []
+    mocker.patch('services.audio.ytdlp_engine.yt_dlp.YoutubeDL', FakeYoutubeDL)
+    yield YtDlpEngine
+    YtDlpEngine.close()
+
+def test_downloads_reuse_a_warm_instance_and_return_the_final_path(engine, tmp_path):
+    progress = []
+
+    first = engine.submit("https://www.youtube.com/watch?v=abc123", str(tmp_path / "1"), on_progress=progress.append).result()
+    second = engine.download("https://www.youtube.com/watch?v=abc123", str(tmp_path / "2"))
+
+    assert first == ({"id": "abc123", "title": "Test Video", "duration": 120, "webpage_url": None, "url": "https://www.youtube.com/watch?v=abc123"}, str(tmp_path / "1" / "Test Video.m4a"))
+    assert second[1] == str(tmp_path / "2" / "Test Video.m4a")
+    assert len(FakeYoutubeDL.created) == 1
+    assert progress == [{"status": "finished", "downloaded_bytes": 10}]
+
+def test_an_instance_that_failed_is_closed_instead_of_reused(engine, tmp_path):
+    failing = engine.create("audio")
+    failing.fail = True
+    engine.release("audio", failing)
+
+    with pytest.raises(yt_dlp.utils.DownloadError):
+        engine.download("https://www.youtube.com/watch?v=gone", str(tmp_path))
+
+    assert failing.closed
+    engine.download("https://www.youtube.com/watch?v=abc123", str(tmp_path))
+    assert len(FakeYoutubeDL.created) == 2
+
+def test_a_section_limit_is_only_applied_to_the_download_that_asked_for_it(engine, tmp_path):
+    engine.download("https://www.youtube.com/watch?v=abc123", str(tmp_path), max_seconds=600)
+    ydl = FakeYoutubeDL.created[0]
+    assert list(ydl.params["download_ranges"]({}, ydl)) == [{"start_time": 0, "end_time": 600}]
+
+    engine.download("https://www.youtube.com/watch?v=abc123", str(tmp_path))
+
+    assert len(FakeYoutubeDL.created) == 1
+    assert "download_ranges" not in ydl.params
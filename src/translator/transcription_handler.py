@@ -1,21 +1,30 @@
 from datetime import datetime
-import json
 import logging
 import os
-from typing import Optional
-from pydub import AudioSegment
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Union
 from dotenv import load_dotenv
 from services.audio.audio_downloader import AudioDownloader
 from services.audio.audio_service import AudioService
 from services.transcription.transcription_factory import TranscriptionFactory
-from services.transformation.transformation_factory import TransformationFactory
+from services.transformation.transformation_runner import TransformationRunner, TransformationResults
 from services.audio.file_handler import FileHandler
+from services.audio.media_probe import MediaProbe
+from services.audio.segment_progress import SegmentProgress, SegmentUpdate
+from services.audio.playlist_expander import PlaylistExpander
+from services.cache.transcript_cache import TranscriptCache
+from services.storage.blob_downloader import BlobDownloader
+from services.storage.transcript_sink import TranscriptSink
+from services.storage.job_workspace import JobWorkspace
+from services.transcription.transcript import Transcript
+from services.metrics.pipeline_metrics import PipelineMetrics
 from listeners.rabbitmq_listener import RabbitMQListener
 from azure.storage.blob import BlobServiceClient
-import base64
 from enums.job_status import JobStatus
 from messages.transcription_message import TranscriptionMessage
 from messages.media_message import MediaMessage
+from messages.batch_message import BatchMessage
+from messages.partial_transcript_message import PartialTranscriptMessage
 from messages.transcription_result import TranscriptionResult
 from enums.transcription_service_type import TranscriptionServiceType
 from enums.transcription_transformation import TranscriptionTransformation
@@ -31,6 +40,9 @@ class TranscriptionHandler:
         logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
 
         self.listener = RabbitMQListener()
+        self.transcript_cache = TranscriptCache.from_env(os.getenv("PROCESSING_PATH") or "./incoming")
+        JobWorkspace.recover(os.getenv("PROCESSING_PATH") or "./incoming")
+        PipelineMetrics.start_server()
 
     def start_listening(self):
         try:
@@ -45,9 +57,7 @@ class TranscriptionHandler:
                 logging.info("Connection to RabbitMQ closed")
 
     def process_transcription_message(self, message: TranscriptionMessage):
-        max_length_minutes = os.getenv("MAX_LENGTH_MINUTES")
-        if max_length_minutes == "0":
-            max_length_minutes = None
+        max_length_minutes = AudioDownloader.max_length_minutes()
         
         path = os.getenv("PROCESSING_PATH")
         if path is None:
@@ -55,27 +65,46 @@ class TranscriptionHandler:
 
         url = message.content # url or blob name
         is_file = message.isFile
-        transform = message.transform 
+        # one transcript can feed several transformations, the single transform is kept for older producers
+        transforms = message.transforms or [message.transform]
         prompt = None
         service = message.transcriptionType
         job_id = message.jobId
 
-        if is_file:
-            logging.info(f"Downloading blob {url}")
-            local_file_path = os.path.join(path, "blobs")
-            url = self.download_blob_to_local(url, local_file_path)
-        else:
-            logging.info(f"Processing url {url}")
-
-        return self.process_audio(url, 
-                                  transform, 
-                                  path, 
-                                  max_length_minutes, 
-                                  prompt, 
-                                  service,
-                                  job_id)
-
-    def download_blob_to_local(self, blob_name: str, download_path: str) -> str:
+        # A playlist or channel is never downloaded itself, it's expanded into a job per video
+        if not is_file and PlaylistExpander.is_collection(url):
+            return self.expand_collection(message)
+
+        # Everything the job downloads or converts lives in its own workspace, removed however the job ends
+        with JobWorkspace.create(job_id, path, JobWorkspace.estimate_bytes(max_length_minutes)) as workspace:
+            if is_file:
+                logging.info(f"Downloading blob {url}")
+                url = self.download_blob_to_local(url, workspace.subdir("blobs"), message.fileName)
+                workspace.check_quota("blob_download")
+            else:
+                logging.info(f"Processing url {url}")
+
+            with PipelineMetrics.track_stage("job"):
+                result = self.process_audio(url, 
+                                            transforms, 
+                                            workspace.path, 
+                                            max_length_minutes, 
+                                            prompt, 
+                                            service,
+                                            job_id,
+                                            workspace)
+        return result
+
+    def expand_collection(self, message: TranscriptionMessage) -> BatchMessage:
+        logging.info(f"Expanding playlist {message.content}")
+        with PipelineMetrics.track_stage("expand"):
+            title, entries = PlaylistExpander.expand(message.content)
+
+        batch = PlaylistExpander.batch(message, title, entries)
+        logging.info(f"Expanded {message.content} into {batch.childCount} videos")
+        return batch
+
+    def download_blob_to_local(self, blob_name: str, download_path: str, file_name: Optional[str] = None) -> str:
         connect_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
         
         logging.info(f"Connecting to Azure Storage {connect_str}")
@@ -83,114 +112,136 @@ class TranscriptionHandler:
         blob_service_client = BlobServiceClient.from_connection_string(connect_str)
         blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
 
-        # Download the blob content to memory
-        blob_data = blob_client.download_blob().readall()
-
-        # Read the JSON content from the blob data
-        data = json.loads(blob_data)
-        content = data.get("content")
-        file_name = data.get("fileName")
-        
-        # Decode the base64 content
-        decoded_content = base64.b64decode(content)
-        
-        # Save the decoded content to the file system
-        os.makedirs(download_path, exist_ok=True)
-        content_path = os.path.join(download_path, file_name)
-        with open(content_path, "wb") as content_file:
-            content_file.write(decoded_content)
-        
-        logging.info(f"Extracted content saved to {content_path}")
-
+        # Stream the blob to disk, base64 envelopes are decoded chunk by chunk and raw uploads are written as-is
+        with PipelineMetrics.track_stage("blob_download"):
+            content_path = BlobDownloader.download_to_local(blob_client, download_path, file_name)
+        PipelineMetrics.record_file_bytes("blob_download", content_path)
         return content_path
 
+    def transcribe_with_cache(self, audio_file_path: str, transcription_service, prompt: Optional[str], audio_key: Optional[str],
+                              on_segment: Optional[Callable[[SegmentUpdate], None]] = None) -> str:
+        if audio_key is None:
+            return AudioService.transcribe_audio(audio_file_path, transcription_service, prompt, on_segment=on_segment)
+
+        combined_transcription = self.transcript_cache.get(audio_key)
+        if combined_transcription is not None:
+            logging.info(f"Transcript cache hit for {audio_file_path}")
+            self.publish_whole_transcript(on_segment, combined_transcription, self.get_audio_duration(audio_file_path))
+            return combined_transcription
+
+        logging.info(f"Running transcription on {audio_file_path}")
+        combined_transcription = AudioService.transcribe_audio(audio_file_path, transcription_service, prompt, cache=self.transcript_cache, on_segment=on_segment)
+        self.transcript_cache.put(audio_key, combined_transcription)
+        return combined_transcription
+
+    def partial_transcript_publisher(self, job_id: str) -> Optional[Callable[[SegmentUpdate], None]]:
+        # Segments are published in order as they finish, the last one is marked final so consumers know the text is complete
+        if os.getenv("PUBLISH_PARTIAL_TRANSCRIPTS", "false").lower() != "true":
+            return None
+
+        def publish(update: SegmentUpdate):
+            self.listener.publish_job_update(PartialTranscriptMessage.from_update(job_id, update).dict())
+        return publish
+
+    @staticmethod
+    def publish_whole_transcript(on_segment: Optional[Callable[[SegmentUpdate], None]], transcript: str, duration_seconds: int):
+        # A cached transcript has no segments to stream, it goes out as a single final one
+        if on_segment is not None:
+            SegmentProgress(1, publish=on_segment).complete(0, 0, duration_seconds * 1000, transcript)
+
     def get_audio_duration(self, file_path: str) -> int:
-        audio = AudioSegment.from_file(file_path)
-        duration_seconds = int(len(audio) / 1000)  # pydub returns length in milliseconds
-        return duration_seconds
+        return int(MediaProbe.probe(file_path).duration_seconds)  # read from the container header, no decode
+
+    def run_transformations(self, transforms: List[TranscriptionTransformation], transcript: str, metadata: dict, job_id: str) -> TranscriptionResult:
+        transforms = TransformationRunner.unique(transforms)
+        if len(transforms) == 1:
+            return TransformationRunner.run(transforms[0], transcript, metadata, job_id)
+
+        # Every transformation shares the transcript
+        results = TransformationResults(transcript, job_id)
+        with ThreadPoolExecutor(max_workers=TransformationRunner.concurrency(len(transforms)), thread_name_prefix="transform") as executor:
+            futures = [executor.submit(TransformationRunner.run, transform, transcript, metadata, job_id) for transform in transforms]
+            for future in as_completed(futures):
+                ready = results.add(future.result())
+                if ready is not None:
+                    self.listener.publish_job_update(ready.dict())
+
+        return results.outcome()
 
     def process_audio(self, url: str, 
-                            transform: TranscriptionTransformation, 
+                            transforms: Union[TranscriptionTransformation, List[TranscriptionTransformation]], 
                             path: str, 
                             max_length_minutes: 
                             Optional[int], 
                             prompt: Optional[str], 
                             service: TranscriptionServiceType, 
-                            job_id: str) -> TranscriptionResult:
+                            job_id: str,
+                            workspace: Optional[JobWorkspace] = None) -> TranscriptionResult:
         logging.info("Processing audio...")
-
-        if url.startswith("https://drive.google.com"):
-            audio_file_path = AudioDownloader.download_google_drive_video(url, path, max_length_minutes=max_length_minutes)
-            video_info = {"title": "Google Drive Video", "duration": self.get_audio_duration(audio_file_path)}  # Google Drive doesn't give video info easily
+        # Persisted transcripts outlive the workspace, they're written under the processing path
+        output_path = workspace.base_path if workspace is not None else path
+
+        audio_file_path = None
+        combined_transcription = None
+        source_key = TranscriptCache.source_key(url, service.value, prompt, max_length_minutes) if self.transcript_cache is not None else None
+        cached_source = self.transcript_cache.get_source(source_key) if source_key is not None else None
+        if cached_source is not None:
+            logging.info(f"Transcript cache hit for {url}, skipping download")
+            video_info, combined_transcription = cached_source
+        elif url.startswith("https://drive.google.com"):
+            video_info, audio_file_path = AudioDownloader.download_google_drive_video_with_info(url, path, max_length_minutes=max_length_minutes)
         elif "vimeo.com" in url:
-            video_info = AudioDownloader.get_video_info(url)
-            audio_file_path = AudioDownloader.download_vimeo_video(url, f'{path}/audio', max_length_minutes=max_length_minutes)
+            video_info, audio_file_path = AudioDownloader.download_vimeo_video_with_info(url, f'{path}/audio', max_length_minutes=max_length_minutes)
         elif url.startswith("https://"):
-            video_info = AudioDownloader.get_video_info(url)
-            audio_file_path = AudioDownloader.download_audio(url, f'{path}/audio', max_length_minutes=max_length_minutes)
+            video_info, audio_file_path = AudioDownloader.download_audio_with_info(url, f'{path}/audio', max_length_minutes=max_length_minutes)
         else:
             logging.info("Processing file...")
-            audio_file_path = FileHandler.handle_local_file(url, path)
+            with PipelineMetrics.track_stage("convert"):
+                audio_file_path = FileHandler.handle_local_file(url, path, max_length_minutes)
             os.remove(url) # remove the tmp file after audio is extracted
             video_info = {"title": os.path.basename(url), "duration": self.get_audio_duration(audio_file_path)}
 
-        media_message = MediaMessage(
-            jobId=job_id,
-            title=os.path.splitext(video_info.get("title", "Unknown Title"))[0],  # Trim the file extension
-            duration=video_info.get("duration", 0),
-            blobUrl="todo://save.to.blob.storage",
-            status=JobStatus.IN_PROGRESS.value
-        )
+        if audio_file_path is not None:
+            PipelineMetrics.record_file_bytes("audio", audio_file_path)
+            if workspace is not None:
+                workspace.check_quota("download")
+        elif combined_transcription is None:
+            PipelineMetrics.record_error("download")
 
         # send media message to rabbit mq (title, duration updates)
-        self.listener.publish_job_update(media_message.dict())
+        self.listener.publish_job_update(MediaMessage.from_video_info(job_id, video_info).dict())
 
         logging.info(f"Audio file is ready at {audio_file_path}")
 
-        if audio_file_path is not None:
-            logging.info(f"Running transcription on {audio_file_path}")
+        if audio_file_path is not None or combined_transcription is not None:
             transcription_service = TranscriptionFactory.get_transcription_service(service) 
-            combined_transcription = AudioService.transcribe_audio(audio_file_path, transcription_service, prompt)
+            on_segment = self.partial_transcript_publisher(job_id)
+            if combined_transcription is None:
+                audio_key = TranscriptCache.audio_key(audio_file_path, service.value, prompt) if self.transcript_cache is not None else None
+                combined_transcription = self.transcribe_with_cache(audio_file_path, transcription_service, prompt, audio_key, on_segment)
+                if source_key is not None:
+                    self.transcript_cache.put_source(source_key, video_info, audio_key)
+            else:
+                self.publish_whole_transcript(on_segment, combined_transcription, video_info.get("duration", 0))
             
-            transcription_file_path = f'{os.path.splitext(audio_file_path)[0]}_transcript{transcription_service.file_name_extension()}'.replace("audio/", "transcript/")
-            os.makedirs(os.path.dirname(transcription_file_path), exist_ok=True)
-            
-            logging.info(f"Writing transcript to {transcription_file_path}")
-            with open(transcription_file_path, 'w', encoding='utf-8') as file:
-                file.write(combined_transcription)
-            try:
-                # Adjust transcript if necessary
-                logging.info("Adjusting transcript timings if needed...")
-                combined_transcription, transcription_file_path = AudioService.adjust_transcript_if_needed(transcription_file_path, service)
-
-                # Run the transformation
-                logging.info(f"Running transformation {transform}")
-                # build metadata
-                metadata = {
-                    "duration" : video_info.get("duration", 0), # used for youtube highlights
-                    "length" : 3000, # used for youtube summary
-                }
-                logging.info(f"Metadata: {metadata} for transformation {transform}")
-                transformation = TransformationFactory.get_transformation_service(transform)
-                transformed_transcript = transformation.transform(combined_transcription, metadata=metadata)
-            except Exception as e:
-                logging.error(f"An error occurred during transcript adjustment or transformation: {str(e)}")
-                result = TranscriptionResult(
-                    jobId=job_id,
-                    transcript=combined_transcription,
-                    status=JobStatus.FAILED.value,
-                    error=str(e)
-                )
-                return result
-            finally:
-                os.remove(audio_file_path)
-            result = TranscriptionResult(
-                jobId=job_id,
-                transcript=combined_transcription,
-                transformed=transformed_transcript,
-                status=JobStatus.FINISHED.value
+            transcript = Transcript(
+                text=combined_transcription,
+                file_name_extension=transcription_service.file_name_extension(),
+                source_path=os.path.join(output_path, "audio", os.path.basename(audio_file_path) if audio_file_path else job_id)
             )
 
+            # The transcript stays in memory from here on, subtitle cues were already merged by the transcription
+            if audio_file_path is not None:
+                os.remove(audio_file_path)
+
+            result = self.run_transformations(transforms, transcript.text, TransformationRunner.metadata(video_info), job_id)
+            PipelineMetrics.record_job(result.status)
+
+            try:
+                TranscriptSink.persist(transcript)
+            except OSError as e:
+                logging.error(f"Failed to persist transcript for job {job_id}: {e}")
+
             return result
 
 if __name__ == "__main__":